@@ -1,47 +1,74 @@
 #ifndef CUSTOM_STACK_H
 #define CUSTOM_STACK_H
 
-#include <string>
+#include <cstdint>
 #include <vector>
-#include <stdexcept>
 
-using std::string;
 using std::vector;
 
+// Bounded stack of interned path ids on a ring buffer: once full, each push
+// overwrites the oldest entry, so memory stays fixed however long the session
 class CustomStack {
 private:
-    vector<string> data;
+    vector<uint32_t> data;
+    size_t head = 0;  // slot of the next push
+    size_t count = 0;
 
 public:
-    CustomStack() = default;
+    static constexpr uint32_t NONE = UINT32_MAX;
 
-    void push(const string& value) {
-        data.push_back(value);
+    explicit CustomStack(size_t capacity = 1000) : data(capacity > 0 ? capacity : 1) {}
+
+    void push(uint32_t value) {
+        data[head] = value;
+        head = (head + 1) % data.size();
+        if (count < data.size()) {
+            count++;
+        }
     }
 
     void pop() {
-        if (!data.empty()) {
-            data.pop_back();
+        if (count > 0) {
+            head = (head + data.size() - 1) % data.size();
+            count--;
         }
     }
 
-    string top() const {
-        if (data.empty()) {
-            return "";
+    uint32_t top() const {
+        return at(0);
+    }
+
+    // Entry `depth` places below the top (0 is the top); NONE past the bottom
+    uint32_t at(size_t depth) const {
+        if (depth >= count) {
+            return NONE;
         }
-        return data.back();
+        return data[(head + data.size() - 1 - depth) % data.size()];
     }
 
     bool empty() const {
-        return data.empty();
+        return count == 0;
     }
 
     size_t size() const {
+        return count;
+    }
+
+    size_t capacity() const {
         return data.size();
     }
-    
+
     void clear() {
-        data.clear();
+        head = 0;
+        count = 0;
+    }
+
+    // Renumbers every entry after the path table was compacted
+    void remap(const vector<uint32_t>& ids) {
+        for (size_t depth = 0; depth < count; depth++) {
+            uint32_t& value = data[(head + data.size() - 1 - depth) % data.size()];
+            value = ids[value];
+        }
     }
 };
 
@@ -0,0 +1,165 @@
+#ifndef DIRECTORY_CACHE_H
+#define DIRECTORY_CACHE_H
+
+#include "directory_listing.h"
+#include <filesystem>
+#include <list>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <chrono>
+
+using std::string;
+using std::shared_ptr;
+
+struct CacheStats {
+    size_t hits = 0;
+    size_t misses = 0;
+    size_t evictions = 0;
+    size_t invalidations = 0;
+    size_t directories = 0;
+    size_t entries = 0;
+};
+
+// Bounded LRU cache of directory listings, validated against the directory mtime
+class DirectoryCache {
+private:
+    struct Entry {
+        shared_ptr<DirectoryListing> listing;
+        std::filesystem::file_time_type mtime;
+        std::list<string>::iterator lru_pos;
+    };
+
+    std::list<string> lru;  // most recently used at the front
+    std::unordered_map<string, Entry> entries;
+    size_t max_directories;
+    size_t max_entries;
+    size_t total_entries = 0;
+    CacheStats stats;
+    mutable std::mutex mtx;
+
+    // Directories can change twice within one mtime tick, so listings taken
+    // right after a modification are not trusted (same idea as "racy git")
+    static constexpr std::chrono::seconds racy_window{2};
+
+    void erase(std::unordered_map<string, Entry>::iterator it) {
+        total_entries -= it->second.listing->size();
+        lru.erase(it->second.lru_pos);
+        entries.erase(it);
+    }
+
+    void evict_to_fit() {
+        while (entries.size() > 1 &&
+               (entries.size() > max_directories || total_entries > max_entries)) {
+            erase(entries.find(lru.back()));
+            stats.evictions++;
+        }
+    }
+
+public:
+    explicit DirectoryCache(size_t max_dirs = 64, size_t max_total_entries = 1000000)
+        : max_directories(max_dirs), max_entries(max_total_entries) {}
+
+    // Cache keys are lexically normalised paths without a trailing separator
+    static string normalize(const string& p) {
+        std::filesystem::path norm = std::filesystem::path(p).lexically_normal();
+        if (!norm.has_filename() && norm != norm.root_path()) {
+            norm = norm.parent_path();
+        }
+        return norm.string();
+    }
+
+    shared_ptr<DirectoryListing> get(const string& key, std::filesystem::file_time_type mtime) {
+        std::lock_guard<std::mutex> lock(mtx);
+        auto it = entries.find(key);
+        if (it == entries.end() || it->second.mtime != mtime) {
+            stats.misses++;
+            return nullptr;
+        }
+        lru.splice(lru.begin(), lru, it->second.lru_pos);
+        stats.hits++;
+        return it->second.listing;
+    }
+
+    void put(const string& key, const shared_ptr<DirectoryListing>& listing,
+             std::filesystem::file_time_type mtime,
+             std::filesystem::file_time_type scanned_at) {
+        if (mtime + racy_window >= scanned_at) {
+            return;
+        }
+
+        std::lock_guard<std::mutex> lock(mtx);
+        auto it = entries.find(key);
+        if (it != entries.end()) {
+            erase(it);
+        }
+        lru.push_front(key);
+        entries[key] = Entry{listing, mtime, lru.begin()};
+        total_entries += listing->size();
+        evict_to_fit();
+    }
+
+    // Swaps in another view (e.g. a re-sort) of a cached listing, keeping its validation mtime
+    void replace(const string& key, const shared_ptr<DirectoryListing>& listing) {
+        std::lock_guard<std::mutex> lock(mtx);
+        auto it = entries.find(key);
+        if (it != entries.end()) {
+            total_entries += listing->size();
+            total_entries -= it->second.listing->size();
+            it->second.listing = listing;
+        }
+    }
+
+    void invalidate(const string& key) {
+        std::lock_guard<std::mutex> lock(mtx);
+        auto it = entries.find(key);
+        if (it != entries.end()) {
+            erase(it);
+            stats.invalidations++;
+        }
+    }
+
+    // Drops the directory itself and every cached directory below it
+    void invalidate_tree(const string& key) {
+        std::lock_guard<std::mutex> lock(mtx);
+        string prefix = key;
+        if (prefix.empty() || prefix.back() != std::filesystem::path::preferred_separator) {
+            prefix += static_cast<char>(std::filesystem::path::preferred_separator);
+        }
+
+        for (auto it = entries.begin(); it != entries.end();) {
+            if (it->first == key || it->first.compare(0, prefix.size(), prefix) == 0) {
+                auto next = std::next(it);
+                erase(it);
+                stats.invalidations++;
+                it = next;
+            } else {
+                ++it;
+            }
+        }
+    }
+
+    void clear() {
+        std::lock_guard<std::mutex> lock(mtx);
+        lru.clear();
+        entries.clear();
+        total_entries = 0;
+    }
+
+    void set_capacity(size_t max_dirs, size_t max_total_entries) {
+        std::lock_guard<std::mutex> lock(mtx);
+        max_directories = max_dirs > 0 ? max_dirs : 1;
+        max_entries = max_total_entries;
+        evict_to_fit();
+    }
+
+    CacheStats get_stats() const {
+        std::lock_guard<std::mutex> lock(mtx);
+        CacheStats result = stats;
+        result.directories = entries.size();
+        result.entries = total_entries;
+        return result;
+    }
+};
+
+#endif
@@ -0,0 +1,212 @@
+#ifndef DIRECTORY_LISTING_H
+#define DIRECTORY_LISTING_H
+
+#include "file_node.h"
+#include <cctype>
+#include <cstdint>
+#include <filesystem>
+#include <string>
+#include <string_view>
+#include <unordered_map>
+#include <vector>
+
+using std::string;
+using std::string_view;
+using std::vector;
+using std::shared_ptr;
+
+enum EntryFlags : uint8_t {
+    ENTRY_DIRECTORY = 1 << 0,
+    ENTRY_REGULAR   = 1 << 1,
+    ENTRY_SYMLINK   = 1 << 2,
+};
+
+// How much is read per entry, cheapest first
+enum class ListingMode : uint8_t {
+    FAST,      // names and types from readdir alone; sizes and mtimes are 0
+    STANDARD,  // plus size, mtime and inode from one stat per entry
+    FULL,      // plus permissions, owner and symlink targets
+};
+
+enum class SortKey : uint8_t {
+    NAME,
+    SIZE,
+    MTIME,
+    EXTENSION,
+};
+
+// Entry columns of one directory level stored as a struct of arrays: all names
+// live in a single arena and every column is indexed by scan row. The data is
+// immutable once scanned and shared by every sort order of the listing.
+struct ListingData {
+    string names;                   // name arena
+    vector<uint32_t> name_offsets;  // row i spans [name_offsets[i], name_offsets[i + 1])
+    vector<uint8_t> flags;          // EntryFlags
+    vector<uint64_t> sizes;         // bytes, 0 for directories
+    vector<int64_t> mtimes;         // nanoseconds since the Unix epoch
+    vector<uint64_t> inodes;        // 0 where the platform has none
+    vector<uint8_t> kinds;          // FileKind, filled in once the directory has been read
+    // FULL mode only; empty otherwise
+    vector<uint32_t> modes;         // st_mode: type and permission bits
+    vector<uint32_t> uids;
+    vector<uint32_t> gids;
+    std::unordered_map<uint32_t, string> link_targets;  // row -> readlink() of each symlink
+
+    ListingMode mode = ListingMode::STANDARD;
+    uint64_t syscalls = 0;          // filesystem calls made to read the listing
+
+    ListingData() {
+        name_offsets.push_back(0);
+    }
+
+    size_t rows() const {
+        return flags.size();
+    }
+
+    void add(const string& name, uint8_t entry_flags, uint64_t size, int64_t mtime, uint64_t inode = 0) {
+        names += name;
+        name_offsets.push_back(static_cast<uint32_t>(names.size()));
+        flags.push_back(entry_flags);
+        sizes.push_back(size);
+        mtimes.push_back(mtime);
+        inodes.push_back(inode);
+        kinds.push_back(static_cast<uint8_t>(FileKind::UNKNOWN));
+    }
+
+    void add_details(uint32_t st_mode, uint32_t uid, uint32_t gid) {
+        modes.push_back(st_mode);
+        uids.push_back(uid);
+        gids.push_back(gid);
+    }
+
+    string_view row_name(uint32_t row) const {
+        return string_view(names).substr(name_offsets[row], name_offsets[row + 1] - name_offsets[row]);
+    }
+
+    bool row_is_directory(uint32_t row) const {
+        return flags[row] & ENTRY_DIRECTORY;
+    }
+
+    size_t memory_usage() const {
+        return sizeof(*this) + names.capacity() +
+               name_offsets.capacity() * sizeof(uint32_t) +
+               flags.capacity() * sizeof(uint8_t) +
+               sizes.capacity() * sizeof(uint64_t) +
+               mtimes.capacity() * sizeof(int64_t) +
+               inodes.capacity() * sizeof(uint64_t) +
+               kinds.capacity() * sizeof(uint8_t) +
+               (modes.capacity() + uids.capacity() + gids.capacity()) * sizeof(uint32_t) +
+               link_targets.size() * (sizeof(string) + sizeof(uint32_t));
+    }
+
+    void shrink_to_fit() {
+        names.shrink_to_fit();
+        name_offsets.shrink_to_fit();
+        flags.shrink_to_fit();
+        sizes.shrink_to_fit();
+        mtimes.shrink_to_fit();
+        inodes.shrink_to_fit();
+        kinds.shrink_to_fit();
+        modes.shrink_to_fit();
+        uids.shrink_to_fit();
+        gids.shrink_to_fit();
+    }
+};
+
+// Differences between two listings of the same directory, matched by name and inode
+struct ListingDiff {
+    vector<uint32_t> removed;  // display positions in the old listing, ascending
+    vector<uint32_t> added;    // display positions in the new listing, ascending
+    vector<uint32_t> changed;  // display positions in the new listing of entries updated in place
+    bool comparable = true;    // false for different directories or sort orders
+};
+
+// One sorted view of a directory: `order` maps display position to scan row,
+// so sorting never moves the entries themselves.
+struct DirectoryListing {
+    string path;
+    bool is_directory = false;
+    shared_ptr<ListingData> data = std::make_shared<ListingData>();
+    vector<uint32_t> order;
+    SortKey sort_key = SortKey::NAME;
+    bool descending = false;
+
+    size_t size() const {
+        return order.size();
+    }
+
+    size_t rows() const {
+        return data->rows();
+    }
+
+    string_view row_name(uint32_t row) const {
+        return data->row_name(row);
+    }
+
+    bool row_is_directory(uint32_t row) const {
+        return data->row_is_directory(row);
+    }
+
+    string_view name(size_t index) const {
+        return row_name(order[index]);
+    }
+
+    bool entry_is_directory(size_t index) const {
+        return row_is_directory(order[index]);
+    }
+
+    FileKind entry_kind(size_t index) const {
+        return static_cast<FileKind>(data->kinds[order[index]]);
+    }
+
+    string entry_path(size_t index) const {
+        return (std::filesystem::path(path) / std::filesystem::path(string(name(index)))).string();
+    }
+
+    // Display position of the entry with this name, or -1
+    long find(const string& entry_name) const {
+        for (size_t i = 0; i < order.size(); i++) {
+            if (name(i) == entry_name) {
+                return static_cast<long>(i);
+            }
+        }
+        return -1;
+    }
+
+    // Materializes a single entry on demand
+    shared_ptr<FileNode> entry(size_t index) const {
+        uint32_t row = order[index];
+        auto node = std::make_shared<FileNode>();
+        node->name = string(row_name(row));
+        node->path = entry_path(index);
+        node->is_directory = row_is_directory(row);
+        node->size = data->sizes[row];
+        node->mtime = data->mtimes[row] / 1e9;
+        node->kind = static_cast<FileKind>(data->kinds[row]);
+        if (row < data->modes.size()) {
+            node->mode = data->modes[row];
+            node->uid = data->uids[row];
+            node->gid = data->gids[row];
+        }
+        auto link = data->link_targets.find(row);
+        if (link != data->link_targets.end()) {
+            node->link_target = link->second;
+        }
+        string_view ext = name_extension(node->name);
+        if (!ext.empty()) {
+            node->extension.reserve(ext.size() + 1);
+            node->extension.push_back('.');
+            for (unsigned char c : ext) {
+                node->extension.push_back(static_cast<char>(std::tolower(c)));
+            }
+        }
+        return node;
+    }
+
+    size_t memory_usage() const {
+        return sizeof(*this) + path.capacity() + data->memory_usage() +
+               order.capacity() * sizeof(uint32_t);
+    }
+};
+
+#endif
@@ -0,0 +1,82 @@
+#ifndef DISK_USAGE_CACHE_H
+#define DISK_USAGE_CACHE_H
+
+#include <cstdint>
+#include <filesystem>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+using std::string;
+
+// Directories remembered before the cache starts over
+constexpr size_t MAX_USAGE_DIRECTORIES = 500000;
+
+struct LinkedFile {
+    uint64_t device = 0;
+    uint64_t inode = 0;
+    uint64_t bytes = 0;
+};
+
+// What one directory holds directly, as of its mtime: the files' sizes (hard-linked
+// files apart, so they are still counted once per scan) and the subdirectories to visit
+struct DirectoryUsage {
+    int64_t mtime = 0;
+    uint64_t bytes = 0;
+    uint64_t files = 0;
+    std::vector<LinkedFile> links;
+    std::vector<string> subdirectories;
+};
+
+// Per-directory totals keyed by path, reused while that directory's mtime is unchanged.
+// Every directory of a subtree is checked on its own, so a change anywhere below is
+// picked up; only a file rewritten in place changes no mtime, and keeps its old size
+// until something else in its directory changes. Changes made through the backend
+// drop the entries of every ancestor.
+class DiskUsageCache {
+private:
+    std::unordered_map<string, DirectoryUsage> directories;
+    std::mutex mtx;
+
+public:
+    bool lookup(const string& key, int64_t mtime, DirectoryUsage& out) {
+        std::lock_guard<std::mutex> lock(mtx);
+        auto it = directories.find(key);
+        if (it == directories.end() || it->second.mtime != mtime) {
+            return false;
+        }
+        out = it->second;
+        return true;
+    }
+
+    void store(const string& key, DirectoryUsage value) {
+        std::lock_guard<std::mutex> lock(mtx);
+        if (directories.size() >= MAX_USAGE_DIRECTORIES && directories.find(key) == directories.end()) {
+            directories.clear();
+        }
+        directories[key] = std::move(value);
+    }
+
+    void invalidate_ancestors(const string& key) {
+        std::lock_guard<std::mutex> lock(mtx);
+        for (std::filesystem::path p(key); ; p = p.parent_path()) {
+            directories.erase(p.string());
+            if (!p.has_relative_path()) {
+                break;
+            }
+        }
+    }
+
+    void clear() {
+        std::lock_guard<std::mutex> lock(mtx);
+        directories.clear();
+    }
+};
+
+inline DiskUsageCache& disk_usage_cache() {
+    static DiskUsageCache cache;
+    return cache;
+}
+
+#endif
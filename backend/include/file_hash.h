@@ -0,0 +1,159 @@
+#ifndef FILE_HASH_H
+#define FILE_HASH_H
+
+#include <cstdint>
+#include <cstring>
+#include <mutex>
+#include <unordered_map>
+
+// XXH64: a fast non-cryptographic 64-bit hash, good enough to tell files apart
+namespace xxh {
+constexpr uint64_t P1 = 11400714785074694791ULL;
+constexpr uint64_t P2 = 14029467366897019727ULL;
+constexpr uint64_t P3 = 1609587929392839161ULL;
+constexpr uint64_t P4 = 9650029242287828579ULL;
+constexpr uint64_t P5 = 2870177450012600261ULL;
+
+inline uint64_t rotl(uint64_t x, int r) {
+    return (x << r) | (x >> (64 - r));
+}
+
+inline uint64_t read64(const unsigned char* p) {
+    uint64_t v;
+    std::memcpy(&v, p, sizeof(v));
+    return v;
+}
+
+inline uint32_t read32(const unsigned char* p) {
+    uint32_t v;
+    std::memcpy(&v, p, sizeof(v));
+    return v;
+}
+
+inline uint64_t round(uint64_t acc, uint64_t input) {
+    acc += input * P2;
+    return rotl(acc, 31) * P1;
+}
+
+inline uint64_t merge(uint64_t acc, uint64_t value) {
+    acc ^= round(0, value);
+    return acc * P1 + P4;
+}
+}  // namespace xxh
+
+inline uint64_t xxh64(const void* data, size_t length, uint64_t seed = 0) {
+    using namespace xxh;
+    const unsigned char* p = static_cast<const unsigned char*>(data);
+    const unsigned char* end = p + length;
+    uint64_t h;
+
+    if (length >= 32) {
+        uint64_t v1 = seed + P1 + P2;
+        uint64_t v2 = seed + P2;
+        uint64_t v3 = seed;
+        uint64_t v4 = seed - P1;
+        const unsigned char* limit = end - 32;
+        do {
+            v1 = round(v1, read64(p));
+            v2 = round(v2, read64(p + 8));
+            v3 = round(v3, read64(p + 16));
+            v4 = round(v4, read64(p + 24));
+            p += 32;
+        } while (p <= limit);
+        h = rotl(v1, 1) + rotl(v2, 7) + rotl(v3, 12) + rotl(v4, 18);
+        h = merge(merge(merge(merge(h, v1), v2), v3), v4);
+    } else {
+        h = seed + P5;
+    }
+    h += length;
+
+    for (; p + 8 <= end; p += 8) {
+        h ^= round(0, read64(p));
+        h = rotl(h, 27) * P1 + P4;
+    }
+    if (p + 4 <= end) {
+        h ^= static_cast<uint64_t>(read32(p)) * P1;
+        h = rotl(h, 23) * P2 + P3;
+        p += 4;
+    }
+    for (; p < end; p++) {
+        h ^= *p * P5;
+        h = rotl(h, 11) * P1;
+    }
+
+    h ^= h >> 33;
+    h *= P2;
+    h ^= h >> 29;
+    h *= P3;
+    h ^= h >> 32;
+    return h;
+}
+
+struct FileHashes {
+    uint64_t partial = 0;  // first and last block
+    uint64_t full = 0;
+    bool has_full = false;
+};
+
+// Hashes keyed by device, inode, size and mtime, so files unchanged since an
+// earlier duplicate search are not read again. Dropped wholesale once full.
+class FileHashCache {
+private:
+    struct Key {
+        uint64_t device;
+        uint64_t inode;
+        uint64_t size;
+        int64_t mtime;
+        bool operator==(const Key& other) const {
+            return device == other.device && inode == other.inode && size == other.size && mtime == other.mtime;
+        }
+    };
+    struct KeyHash {
+        size_t operator()(const Key& key) const {
+            return std::hash<uint64_t>()((key.inode * 0x9e3779b97f4a7c15ULL) ^ key.device ^
+                                         static_cast<uint64_t>(key.mtime) ^ (key.size << 17));
+        }
+    };
+
+    std::unordered_map<Key, FileHashes, KeyHash> entries;
+    size_t capacity;
+    std::mutex mtx;
+
+public:
+    explicit FileHashCache(size_t max_entries = 1000000) : capacity(max_entries) {}
+
+    bool lookup(uint64_t device, uint64_t inode, uint64_t size, int64_t mtime, FileHashes& out) {
+        std::lock_guard<std::mutex> lock(mtx);
+        auto it = entries.find(Key{device, inode, size, mtime});
+        if (it == entries.end()) {
+            return false;
+        }
+        out = it->second;
+        return true;
+    }
+
+    void store(uint64_t device, uint64_t inode, uint64_t size, int64_t mtime, const FileHashes& hashes) {
+        std::lock_guard<std::mutex> lock(mtx);
+        if (entries.size() >= capacity) {
+            entries.clear();
+        }
+        entries[Key{device, inode, size, mtime}] = hashes;
+    }
+
+    size_t size() {
+        std::lock_guard<std::mutex> lock(mtx);
+        return entries.size();
+    }
+
+    void clear() {
+        std::lock_guard<std::mutex> lock(mtx);
+        entries.clear();
+    }
+};
+
+inline FileHashCache& file_hash_cache() {
+    static FileHashCache cache;
+    return cache;
+}
+
+#endif
@@ -0,0 +1,202 @@
+#ifndef FILE_KIND_H
+#define FILE_KIND_H
+
+#include <cstdint>
+#include <cstring>
+#include <list>
+#include <mutex>
+#include <string>
+#include <string_view>
+#include <unordered_map>
+
+#ifndef _WIN32
+#include <fcntl.h>
+#include <unistd.h>
+#else
+#include <fstream>
+#endif
+
+using std::string;
+using std::string_view;
+
+// What a listing entry is, as far as icons and the previewer care
+enum class FileKind : uint8_t {
+    UNKNOWN,     // not classified (yet): use the extension, or sniff when previewing
+    DIRECTORY,
+    EMPTY,
+    TEXT,
+    BINARY,
+    EXECUTABLE,
+    IMAGE,
+    AUDIO,
+    VIDEO,
+    ARCHIVE,
+    DOCUMENT,
+};
+
+// Bytes read from the start of a file to recognise it
+constexpr size_t KIND_SNIFF_BYTES = 4096;
+
+// Extension (after the dot, lowercase) of a name; dotfiles such as ".bashrc" have none
+inline string_view name_extension(string_view name) {
+    size_t dot = name.rfind('.');
+    return (dot == string_view::npos || dot == 0) ? string_view() : name.substr(dot + 1);
+}
+
+inline FileKind kind_from_extension(string_view lower_ext) {
+    static const std::unordered_map<string_view, FileKind> table = {
+        {"txt", FileKind::TEXT}, {"md", FileKind::TEXT}, {"rst", FileKind::TEXT}, {"log", FileKind::TEXT},
+        {"csv", FileKind::TEXT}, {"tsv", FileKind::TEXT}, {"json", FileKind::TEXT}, {"yml", FileKind::TEXT},
+        {"yaml", FileKind::TEXT}, {"toml", FileKind::TEXT}, {"ini", FileKind::TEXT}, {"cfg", FileKind::TEXT},
+        {"conf", FileKind::TEXT}, {"xml", FileKind::TEXT}, {"html", FileKind::TEXT}, {"htm", FileKind::TEXT},
+        {"css", FileKind::TEXT}, {"py", FileKind::TEXT}, {"pyi", FileKind::TEXT}, {"c", FileKind::TEXT},
+        {"h", FileKind::TEXT}, {"cc", FileKind::TEXT}, {"cpp", FileKind::TEXT}, {"cxx", FileKind::TEXT},
+        {"hpp", FileKind::TEXT}, {"js", FileKind::TEXT}, {"ts", FileKind::TEXT}, {"jsx", FileKind::TEXT},
+        {"tsx", FileKind::TEXT}, {"java", FileKind::TEXT}, {"go", FileKind::TEXT}, {"rs", FileKind::TEXT},
+        {"php", FileKind::TEXT}, {"rb", FileKind::TEXT}, {"sh", FileKind::TEXT}, {"bash", FileKind::TEXT},
+        {"zsh", FileKind::TEXT}, {"sql", FileKind::TEXT}, {"cmake", FileKind::TEXT}, {"svg", FileKind::IMAGE},
+        {"png", FileKind::IMAGE}, {"jpg", FileKind::IMAGE}, {"jpeg", FileKind::IMAGE}, {"gif", FileKind::IMAGE},
+        {"bmp", FileKind::IMAGE}, {"ico", FileKind::IMAGE}, {"webp", FileKind::IMAGE}, {"tiff", FileKind::IMAGE},
+        {"mp3", FileKind::AUDIO}, {"wav", FileKind::AUDIO}, {"flac", FileKind::AUDIO}, {"ogg", FileKind::AUDIO},
+        {"m4a", FileKind::AUDIO}, {"mp4", FileKind::VIDEO}, {"mkv", FileKind::VIDEO}, {"mov", FileKind::VIDEO},
+        {"avi", FileKind::VIDEO}, {"webm", FileKind::VIDEO}, {"zip", FileKind::ARCHIVE}, {"tar", FileKind::ARCHIVE},
+        {"gz", FileKind::ARCHIVE}, {"tgz", FileKind::ARCHIVE}, {"bz2", FileKind::ARCHIVE}, {"xz", FileKind::ARCHIVE},
+        {"zst", FileKind::ARCHIVE}, {"7z", FileKind::ARCHIVE}, {"rar", FileKind::ARCHIVE}, {"jar", FileKind::ARCHIVE},
+        {"whl", FileKind::ARCHIVE}, {"pdf", FileKind::DOCUMENT}, {"doc", FileKind::DOCUMENT},
+        {"docx", FileKind::DOCUMENT}, {"xls", FileKind::DOCUMENT}, {"xlsx", FileKind::DOCUMENT},
+        {"ppt", FileKind::DOCUMENT}, {"pptx", FileKind::DOCUMENT}, {"odt", FileKind::DOCUMENT},
+        {"so", FileKind::BINARY}, {"o", FileKind::BINARY}, {"a", FileKind::BINARY}, {"pyc", FileKind::BINARY},
+        {"dll", FileKind::EXECUTABLE}, {"exe", FileKind::EXECUTABLE}, {"bin", FileKind::BINARY},
+    };
+    auto it = table.find(lower_ext);
+    return it == table.end() ? FileKind::UNKNOWN : it->second;
+}
+
+// Magic numbers first, then a NUL anywhere in the block means binary
+inline FileKind kind_from_content(const unsigned char* data, size_t n) {
+    auto starts = [&](const char* magic, size_t len, size_t at = 0) {
+        return n >= at + len && std::memcmp(data + at, magic, len) == 0;
+    };
+    if (n == 0) return FileKind::EMPTY;
+    // Scripts stay TEXT so they are previewed; two-byte magics such as "MZ" or "BM" are
+    // left to the extension since plain text starts with them too
+    if (starts("\x7f" "ELF", 4) || starts("\xcf\xfa\xed\xfe", 4)) {
+        return FileKind::EXECUTABLE;
+    }
+    if (starts("\x89PNG", 4) || starts("\xff\xd8\xff", 3) || starts("GIF8", 4) ||
+        (starts("RIFF", 4) && starts("WEBP", 4, 8))) {
+        return FileKind::IMAGE;
+    }
+    if (starts("ID3", 3) || starts("fLaC", 4) || starts("OggS", 4) || (starts("RIFF", 4) && starts("WAVE", 4, 8))) {
+        return FileKind::AUDIO;
+    }
+    if (starts("ftyp", 4, 4) || starts("\x1a\x45\xdf\xa3", 4)) {
+        return FileKind::VIDEO;
+    }
+    if (starts("PK\x03\x04", 4) || starts("\x1f\x8b", 2) || starts("BZh", 3) || starts("\xfd" "7zXZ", 5) ||
+        starts("7z\xbc\xaf", 4) || starts("\x28\xb5\x2f\xfd", 4) || starts("Rar!", 4) || starts("ustar", 5, 257)) {
+        return FileKind::ARCHIVE;
+    }
+    if (starts("%PDF", 4)) {
+        return FileKind::DOCUMENT;
+    }
+    return std::memchr(data, 0, n) ? FileKind::BINARY : FileKind::TEXT;
+}
+
+// Reads the first block of a file; UNKNOWN if it cannot be opened
+inline FileKind sniff_file_kind(const string& file_path) {
+    unsigned char block[KIND_SNIFF_BYTES];
+    long long n;
+#ifndef _WIN32
+    int fd = ::open(file_path.c_str(), O_RDONLY | O_CLOEXEC | O_NOCTTY | O_NONBLOCK);
+    if (fd < 0) {
+        return FileKind::UNKNOWN;
+    }
+    n = pread(fd, block, sizeof(block), 0);
+    ::close(fd);
+#else
+    std::ifstream in(file_path, std::ios::binary);
+    if (!in) {
+        return FileKind::UNKNOWN;
+    }
+    in.read(reinterpret_cast<char*>(block), sizeof(block));
+    n = in.gcount();
+#endif
+    return n < 0 ? FileKind::UNKNOWN : kind_from_content(block, static_cast<size_t>(n));
+}
+
+// Bounded LRU of sniffed kinds keyed by inode and mtime, so a re-listed directory
+// only opens files that are new or were modified since they were last classified
+class FileKindCache {
+private:
+    struct Key {
+        uint64_t inode;
+        int64_t mtime;
+        bool operator==(const Key& other) const {
+            return inode == other.inode && mtime == other.mtime;
+        }
+    };
+    struct KeyHash {
+        size_t operator()(const Key& key) const {
+            return std::hash<uint64_t>()(key.inode * 0x9e3779b97f4a7c15ULL ^ static_cast<uint64_t>(key.mtime));
+        }
+    };
+    struct Entry {
+        FileKind kind;
+        std::list<Key>::iterator lru_pos;
+    };
+
+    std::list<Key> lru;  // most recently used at the front
+    std::unordered_map<Key, Entry, KeyHash> entries;
+    size_t capacity;
+    std::mutex mtx;
+
+public:
+    explicit FileKindCache(size_t max_entries = 200000) : capacity(max_entries) {}
+
+    bool lookup(uint64_t inode, int64_t mtime, FileKind& out) {
+        std::lock_guard<std::mutex> lock(mtx);
+        auto it = entries.find(Key{inode, mtime});
+        if (it == entries.end()) {
+            return false;
+        }
+        lru.splice(lru.begin(), lru, it->second.lru_pos);
+        out = it->second.kind;
+        return true;
+    }
+
+    void store(uint64_t inode, int64_t mtime, FileKind kind) {
+        std::lock_guard<std::mutex> lock(mtx);
+        Key key{inode, mtime};
+        auto it = entries.find(key);
+        if (it != entries.end()) {
+            it->second.kind = kind;
+            lru.splice(lru.begin(), lru, it->second.lru_pos);
+            return;
+        }
+        lru.push_front(key);
+        entries.emplace(key, Entry{kind, lru.begin()});
+        while (entries.size() > capacity) {
+            entries.erase(lru.back());
+            lru.pop_back();
+        }
+    }
+
+    size_t size() {
+        std::lock_guard<std::mutex> lock(mtx);
+        return entries.size();
+    }
+
+    void clear() {
+        std::lock_guard<std::mutex> lock(mtx);
+        entries.clear();
+        lru.clear();
+    }
+};
+
+inline FileKindCache& file_kind_cache() {
+    static FileKindCache cache;
+    return cache;
+}
+
+#endif
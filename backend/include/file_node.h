@@ -5,6 +5,7 @@
 #include<vector>
 #include<string>
 #include<memory>
+#include "file_kind.h"
 
 using std::string;
 using std::vector;
@@ -16,6 +17,14 @@ struct FileNode {
     string path;
     bool is_directory;
     size_t size;
+    double mtime;  // seconds since the Unix epoch
+    FileKind kind = FileKind::UNKNOWN;
+    string extension;  // lowercase with the dot, "" if none
+    // Filled by ListingMode::FULL
+    uint32_t mode = 0;
+    uint32_t uid = 0;
+    uint32_t gid = 0;
+    string link_target;
     vector<shared_ptr<FileNode>> children;  
 };
 
@@ -2,60 +2,394 @@
 #define HISTORY_MANAGER_H
 
 #include "custom_stack.h"
+#include <algorithm>
+#include <cctype>
+#include <chrono>
+#include <deque>
+#include <filesystem>
+#include <fstream>
+#include <sstream>
 #include <string>
+#include <string_view>
+#include <unordered_map>
+#include <vector>
 
 using std::string;
+using std::string_view;
+using std::vector;
+
+// Each distinct path is stored once; the stacks and the frecency table hold ids
+class PathTable {
+private:
+    std::deque<string> paths;  // stable addresses for the views in `ids`
+    std::unordered_map<string_view, uint32_t> ids;
+
+public:
+    uint32_t intern(const string& path) {
+        auto it = ids.find(path);
+        if (it != ids.end()) {
+            return it->second;
+        }
+        uint32_t id = static_cast<uint32_t>(paths.size());
+        paths.push_back(path);
+        ids.emplace(paths.back(), id);
+        return id;
+    }
+
+    // CustomStack::NONE if the path was never interned
+    uint32_t find(const string& path) const {
+        auto it = ids.find(path);
+        return it == ids.end() ? CustomStack::NONE : it->second;
+    }
+
+    const string& get(uint32_t id) const {
+        return paths[id];
+    }
+
+    // Drops the paths not marked in `keep` and renumbers the rest in order;
+    // returns the new id of each old one (NONE for dropped ones)
+    vector<uint32_t> compact(const vector<bool>& keep) {
+        vector<uint32_t> remap(paths.size(), CustomStack::NONE);
+        std::deque<string> kept;
+        ids.clear();
+        for (uint32_t id = 0; id < paths.size(); id++) {
+            if (keep[id]) {
+                remap[id] = static_cast<uint32_t>(kept.size());
+                kept.push_back(std::move(paths[id]));
+            }
+        }
+        paths = std::move(kept);
+        for (uint32_t id = 0; id < paths.size(); id++) {
+            ids.emplace(paths[id], id);
+        }
+        return remap;
+    }
+
+    size_t size() const {
+        return paths.size();
+    }
+};
+
+// A directory offered by the jump dialog
+struct JumpCandidate {
+    string path;
+    double score;
+    double rank;
+    int64_t last_access;
+};
+
+// Frecency as in zoxide: each visit adds 1 to a directory's rank, the score weighs the rank by
+// how recently it was visited, and once the ranks add up to more than max_age they are all
+// scaled down and the ones that fall below 1 are forgotten
+constexpr double FRECENCY_MAX_AGE = 10000;
+constexpr int64_t HOUR = 3600;
+constexpr int64_t DAY = 24 * HOUR;
+constexpr int64_t WEEK = 7 * DAY;
+
+// Interned paths kept before ids that nothing refers to any more are dropped
+constexpr size_t HISTORY_COMPACT_MIN = 4096;
+
+inline int64_t unix_now() {
+    return std::chrono::duration_cast<std::chrono::seconds>(
+        std::chrono::system_clock::now().time_since_epoch()).count();
+}
+
+inline double frecency(double rank, int64_t last_access, int64_t now) {
+    int64_t age = now - last_access;
+    if (age < HOUR) return rank * 4;
+    if (age < DAY) return rank * 2;
+    if (age < WEEK) return rank / 2;
+    return rank / 4;
+}
+
+inline string lower_copy(string_view s) {
+    string out(s);
+    std::transform(out.begin(), out.end(), out.begin(), [](unsigned char c) { return std::tolower(c); });
+    return out;
+}
+
+// Keywords must appear in the path in order and the last one in its final component,
+// so "src back" finds ".../src/file_ranger/backend" but not ".../backend/src"
+inline bool jump_matches(const string& lower_path, const vector<string>& keywords) {
+    if (keywords.empty()) {
+        return true;
+    }
+    size_t pos = 0;
+    for (size_t i = 0; i + 1 < keywords.size(); i++) {
+        size_t found = lower_path.find(keywords[i], pos);
+        if (found == string::npos) {
+            return false;
+        }
+        pos = found + keywords[i].size();
+    }
+#ifdef _WIN32
+    size_t separator = lower_path.find_last_of("/\\");
+#else
+    size_t separator = lower_path.rfind('/');
+#endif
+    size_t last_component = separator == string::npos ? 0 : separator + 1;
+    return lower_path.find(keywords.back(), std::max(pos, last_component)) != string::npos;
+}
 
 class HistoryManager {
 private:
+    PathTable table;
     CustomStack back_stack;
     CustomStack forward_stack;
+    // Frecency columns indexed by path id; a rank of 0 means never visited (or forgotten)
+    vector<double> ranks;
+    vector<int64_t> last_access;
+    double rank_total = 0;
+    size_t compact_at = HISTORY_COMPACT_MIN;
+
+    // Ids off both stacks and with no rank are dropped, so the table does not keep
+    // every directory ever visited
+    void compact() {
+        vector<bool> live(table.size(), false);
+        for (const CustomStack* stack : {&back_stack, &forward_stack}) {
+            for (size_t depth = 0; depth < stack->size(); depth++) {
+                live[stack->at(depth)] = true;
+            }
+        }
+        for (uint32_t id = 0; id < ranks.size(); id++) {
+            if (ranks[id] > 0) {
+                live[id] = true;
+            }
+        }
+
+        vector<uint32_t> remap = table.compact(live);
+        back_stack.remap(remap);
+        forward_stack.remap(remap);
+        vector<double> kept_ranks(table.size(), 0);
+        vector<int64_t> kept_access(table.size(), 0);
+        for (uint32_t id = 0; id < ranks.size(); id++) {
+            if (live[id]) {
+                kept_ranks[remap[id]] = ranks[id];
+                kept_access[remap[id]] = last_access[id];
+            }
+        }
+        ranks = std::move(kept_ranks);
+        last_access = std::move(kept_access);
+        compact_at = std::max(HISTORY_COMPACT_MIN, 2 * table.size());
+    }
+
+    void visit(uint32_t id) {
+        if (id >= ranks.size()) {
+            ranks.resize(table.size(), 0);
+            last_access.resize(table.size(), 0);
+        }
+        ranks[id] += 1;
+        rank_total += 1;
+        last_access[id] = unix_now();
+        if (rank_total > FRECENCY_MAX_AGE) {
+            age();
+        }
+    }
+
+    void age() {
+        double factor = 0.9 * FRECENCY_MAX_AGE / rank_total;
+        rank_total = 0;
+        for (double& rank : ranks) {
+            rank *= factor;
+            if (rank < 1) {
+                rank = 0;
+            }
+            rank_total += rank;
+        }
+    }
+
+    const string& path_of(uint32_t id) const {
+        static const string empty;
+        return id == CustomStack::NONE ? empty : table.get(id);
+    }
+
+    vector<string> stack_paths(const CustomStack& stack, size_t from, size_t limit) const {
+        vector<string> result;
+        for (size_t depth = from; depth < stack.size() && result.size() < limit; depth++) {
+            result.push_back(table.get(stack.at(depth)));
+        }
+        return result;
+    }
 
 public:
-    HistoryManager() = default;
+    explicit HistoryManager(size_t capacity = 1000) : back_stack(capacity), forward_stack(capacity) {}
 
-    // Initialize with the starting path
+    // Start a session at `path`; history loaded from an earlier session stays reachable with go_back
     void init(const string& path) {
-        back_stack.clear();
         forward_stack.clear();
-        back_stack.push(path);
+        push(path);
     }
 
     void push(const string& path) {
-        if (!back_stack.empty() && back_stack.top() == path) {
+        uint32_t id = table.intern(path);
+        visit(id);
+        if (!back_stack.empty() && back_stack.top() == id) {
             return;
         }
-        
-        back_stack.push(path);
+
+        back_stack.push(id);
         forward_stack.clear();
+        if (table.size() >= compact_at) {
+            compact();
+        }
     }
 
-    string go_back() {
-        if (back_stack.size() <= 1) {
+    // Moves `steps` entries back at once; "" if there is no history that far back
+    string go_back(size_t steps = 1) {
+        if (steps == 0 || back_stack.size() <= steps) {
             return "";
         }
 
-        string current = back_stack.top();
-        back_stack.pop();
-        forward_stack.push(current);
-
-        return back_stack.top();
+        for (size_t i = 0; i < steps; i++) {
+            forward_stack.push(back_stack.top());
+            back_stack.pop();
+        }
+        visit(back_stack.top());
+        return table.get(back_stack.top());
     }
 
-    string go_forward() {
-        if (forward_stack.empty()) {
+    string go_forward(size_t steps = 1) {
+        if (steps == 0 || forward_stack.size() < steps) {
             return "";
         }
 
-        string next = forward_stack.top();
-        forward_stack.pop();
-        back_stack.push(next);
-
-        return next;
+        for (size_t i = 0; i < steps; i++) {
+            back_stack.push(forward_stack.top());
+            forward_stack.pop();
+        }
+        visit(back_stack.top());
+        return table.get(back_stack.top());
     }
-    
+
     string current() {
-        return back_stack.top();
+        return path_of(back_stack.top());
+    }
+
+    // Paths go_back(1), go_back(2), ... would return
+    vector<string> back_entries(size_t limit = 50) const {
+        return stack_paths(back_stack, 1, limit);
+    }
+
+    vector<string> forward_entries(size_t limit = 50) const {
+        return stack_paths(forward_stack, 0, limit);
+    }
+
+    // Visited directories matching the space-separated keywords, best frecency first
+    vector<JumpCandidate> jump(const string& query, size_t limit = 50) const {
+        vector<string> keywords;
+        std::istringstream words(lower_copy(query));
+        for (string word; words >> word;) {
+            keywords.push_back(word);
+        }
+
+        int64_t now = unix_now();
+        uint32_t current_id = back_stack.top();
+        vector<JumpCandidate> result;
+        for (uint32_t id = 0; id < ranks.size(); id++) {
+            if (ranks[id] <= 0 || id == current_id) {
+                continue;
+            }
+            const string& path = table.get(id);
+            if (!keywords.empty() && !jump_matches(lower_copy(path), keywords)) {
+                continue;
+            }
+            result.push_back({path, frecency(ranks[id], last_access[id], now), ranks[id], last_access[id]});
+        }
+
+        size_t keep = std::min(limit, result.size());
+        std::partial_sort(result.begin(), result.begin() + keep, result.end(),
+                          [](const JumpCandidate& a, const JumpCandidate& b) { return a.score > b.score; });
+        result.resize(keep);
+        return result;
+    }
+
+    // Drop a directory from the frecency table, e.g. once it no longer exists
+    void forget(const string& path) {
+        uint32_t id = table.find(path);
+        if (id < ranks.size()) {
+            rank_total -= ranks[id];
+            ranks[id] = 0;
+        }
+    }
+
+    size_t size() const {
+        return std::count_if(ranks.begin(), ranks.end(), [](double rank) { return rank > 0; });
+    }
+
+    // Text file, one record per line: "D<TAB>rank<TAB>last access<TAB>path" for the frecency
+    // table, then "B<TAB>path" for the back stack from the oldest entry
+    bool save(const string& file_path) const {
+        string temporary = file_path + ".tmp";
+        {
+            std::ofstream out(temporary, std::ios::trunc);
+            if (!out) {
+                return false;
+            }
+            out << "file_ranger history 1\n";
+            auto storable = [](const string& path) { return path.find_first_of("\t\n") == string::npos; };
+            for (uint32_t id = 0; id < ranks.size(); id++) {
+                if (ranks[id] > 0 && storable(table.get(id))) {
+                    out << "D\t" << ranks[id] << '\t' << last_access[id] << '\t' << table.get(id) << '\n';
+                }
+            }
+            for (size_t depth = back_stack.size(); depth-- > 0;) {
+                const string& path = table.get(back_stack.at(depth));
+                if (storable(path)) {
+                    out << "B\t" << path << '\n';
+                }
+            }
+            if (!out.flush()) {
+                return false;
+            }
+        }
+        std::error_code ec;
+        std::filesystem::rename(temporary, file_path, ec);
+        return !ec;
+    }
+
+    // Replaces the current history with a saved one; false if the file is missing or unreadable
+    bool load(const string& file_path) {
+        std::ifstream in(file_path);
+        string line;
+        if (!in || !std::getline(in, line) || line != "file_ranger history 1") {
+            return false;
+        }
+
+        back_stack.clear();
+        forward_stack.clear();
+        std::fill(ranks.begin(), ranks.end(), 0);
+        rank_total = 0;
+        while (std::getline(in, line)) {
+            if (line.size() < 2 || line[1] != '\t') {
+                continue;
+            }
+            if (line[0] == 'B') {
+                back_stack.push(table.intern(line.substr(2)));
+            } else if (line[0] == 'D') {
+                size_t rank_end = line.find('\t', 2);
+                size_t time_end = rank_end == string::npos ? string::npos : line.find('\t', rank_end + 1);
+                if (time_end == string::npos) {
+                    continue;
+                }
+                try {
+                    double rank = std::stod(line.substr(2, rank_end - 2));
+                    int64_t accessed = std::stoll(line.substr(rank_end + 1, time_end - rank_end - 1));
+                    uint32_t id = table.intern(line.substr(time_end + 1));
+                    if (id >= ranks.size()) {
+                        ranks.resize(table.size(), 0);
+                        last_access.resize(table.size(), 0);
+                    }
+                    rank_total += rank - ranks[id];
+                    ranks[id] = rank;
+                    last_access[id] = accessed;
+                } catch (const std::exception&) {
+                    continue;
+                }
+            }
+        }
+        // Paths of the replaced history are no longer referenced
+        compact();
+        return true;
     }
 };
 
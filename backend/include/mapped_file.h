@@ -0,0 +1,109 @@
+#ifndef MAPPED_FILE_H
+#define MAPPED_FILE_H
+
+#include <cstddef>
+#include <fstream>
+#include <iterator>
+#include <string>
+#include <vector>
+
+#ifndef _WIN32
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+using std::string;
+
+// Read-only view of a whole file: mmap where available, a heap copy otherwise
+class MappedFile {
+private:
+    const char* ptr = nullptr;
+    size_t length = 0;
+    bool mapped = false;
+    bool opened = false;
+    std::vector<char> buffer;
+
+    void release() {
+#ifndef _WIN32
+        if (mapped && ptr) {
+            munmap(const_cast<char*>(ptr), length);
+        }
+#endif
+        ptr = nullptr;
+        length = 0;
+        mapped = false;
+        opened = false;
+        buffer.clear();
+    }
+
+public:
+    MappedFile() = default;
+
+    explicit MappedFile(const string& file_path) {
+        open(file_path);
+    }
+
+    ~MappedFile() {
+        release();
+    }
+
+    MappedFile(const MappedFile&) = delete;
+    MappedFile& operator=(const MappedFile&) = delete;
+
+    bool open(const string& file_path) {
+        release();
+#ifndef _WIN32
+        int fd = ::open(file_path.c_str(), O_RDONLY | O_CLOEXEC);
+        if (fd < 0) {
+            return false;
+        }
+        struct stat st;
+        if (fstat(fd, &st) != 0 || !S_ISREG(st.st_mode)) {
+            ::close(fd);
+            return false;
+        }
+        length = static_cast<size_t>(st.st_size);
+        if (length == 0) {
+            ::close(fd);
+            opened = true;
+            return true;
+        }
+        void* addr = mmap(nullptr, length, PROT_READ, MAP_PRIVATE, fd, 0);
+        ::close(fd);
+        if (addr == MAP_FAILED) {
+            length = 0;
+            return false;
+        }
+        ptr = static_cast<const char*>(addr);
+        mapped = true;
+        opened = true;
+        return true;
+#else
+        std::ifstream in(file_path, std::ios::binary);
+        if (!in) {
+            return false;
+        }
+        buffer.assign(std::istreambuf_iterator<char>(in), std::istreambuf_iterator<char>());
+        ptr = buffer.data();
+        length = buffer.size();
+        opened = true;
+        return true;
+#endif
+    }
+
+    const char* data() const {
+        return ptr;
+    }
+
+    size_t size() const {
+        return length;
+    }
+
+    bool is_open() const {
+        return opened;
+    }
+};
+
+#endif
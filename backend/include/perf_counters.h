@@ -0,0 +1,112 @@
+#ifndef PERF_COUNTERS_H
+#define PERF_COUNTERS_H
+
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+
+// Totals since the last reset, as returned to Python
+struct PerfStats {
+    bool enabled = false;
+    uint64_t listings = 0;
+    uint64_t listing_ns = 0;
+    uint64_t entries_listed = 0;
+    uint64_t listing_syscalls = 0;
+    uint64_t kind_sniffs = 0;
+    uint64_t kind_cache_hits = 0;
+    uint64_t sorts = 0;
+    uint64_t sort_ns = 0;
+    uint64_t entries_sorted = 0;
+    uint64_t previews = 0;
+    uint64_t preview_ns = 0;
+    uint64_t preview_bytes = 0;
+};
+
+// Counters of the backend hot paths. While profiling is off every hook is one relaxed
+// load of `enabled`; nothing is timed or counted.
+class PerfCounters {
+public:
+    std::atomic<bool> enabled{false};
+    std::atomic<uint64_t> listings{0};
+    std::atomic<uint64_t> listing_ns{0};
+    std::atomic<uint64_t> entries_listed{0};
+    std::atomic<uint64_t> listing_syscalls{0};
+    std::atomic<uint64_t> kind_sniffs{0};
+    std::atomic<uint64_t> kind_cache_hits{0};
+    std::atomic<uint64_t> sorts{0};
+    std::atomic<uint64_t> sort_ns{0};
+    std::atomic<uint64_t> entries_sorted{0};
+    std::atomic<uint64_t> previews{0};
+    std::atomic<uint64_t> preview_ns{0};
+    std::atomic<uint64_t> preview_bytes{0};
+
+    bool on() const {
+        return enabled.load(std::memory_order_relaxed);
+    }
+
+    void add(std::atomic<uint64_t>& counter, uint64_t n) {
+        if (on()) {
+            counter.fetch_add(n, std::memory_order_relaxed);
+        }
+    }
+
+    PerfStats snapshot() const {
+        auto get = [](const std::atomic<uint64_t>& c) { return c.load(std::memory_order_relaxed); };
+        PerfStats s;
+        s.enabled = on();
+        s.listings = get(listings);
+        s.listing_ns = get(listing_ns);
+        s.entries_listed = get(entries_listed);
+        s.listing_syscalls = get(listing_syscalls);
+        s.kind_sniffs = get(kind_sniffs);
+        s.kind_cache_hits = get(kind_cache_hits);
+        s.sorts = get(sorts);
+        s.sort_ns = get(sort_ns);
+        s.entries_sorted = get(entries_sorted);
+        s.previews = get(previews);
+        s.preview_ns = get(preview_ns);
+        s.preview_bytes = get(preview_bytes);
+        return s;
+    }
+
+    void reset() {
+        for (auto* c : {&listings, &listing_ns, &entries_listed, &listing_syscalls, &kind_sniffs,
+                        &kind_cache_hits, &sorts, &sort_ns, &entries_sorted, &previews, &preview_ns,
+                        &preview_bytes}) {
+            c->store(0, std::memory_order_relaxed);
+        }
+    }
+};
+
+inline PerfCounters& perf_counters() {
+    static PerfCounters counters;
+    return counters;
+}
+
+// Adds the time until it goes out of scope to a counter, if profiling was on when it started
+class PerfTimer {
+private:
+    std::atomic<uint64_t>* target = nullptr;
+    std::chrono::steady_clock::time_point start;
+
+public:
+    explicit PerfTimer(std::atomic<uint64_t>& counter) {
+        if (perf_counters().on()) {
+            target = &counter;
+            start = std::chrono::steady_clock::now();
+        }
+    }
+
+    ~PerfTimer() {
+        if (target) {
+            auto elapsed = std::chrono::steady_clock::now() - start;
+            target->fetch_add(std::chrono::duration_cast<std::chrono::nanoseconds>(elapsed).count(),
+                              std::memory_order_relaxed);
+        }
+    }
+
+    PerfTimer(const PerfTimer&) = delete;
+    PerfTimer& operator=(const PerfTimer&) = delete;
+};
+
+#endif
@@ -0,0 +1,23 @@
+#ifndef SCAN_TOKEN_H
+#define SCAN_TOKEN_H
+
+#include <atomic>
+
+// Cancellation flag shared between the UI and a running backend scan
+class ScanToken {
+private:
+    std::atomic<bool> cancelled{false};
+
+public:
+    ScanToken() = default;
+
+    void cancel() {
+        cancelled.store(true, std::memory_order_relaxed);
+    }
+
+    bool is_cancelled() const {
+        return cancelled.load(std::memory_order_relaxed);
+    }
+};
+
+#endif
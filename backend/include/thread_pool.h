@@ -0,0 +1,109 @@
+#ifndef THREAD_POOL_H
+#define THREAD_POOL_H
+
+#include <condition_variable>
+#include <deque>
+#include <functional>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+using std::vector;
+
+// Fixed-size pool of worker threads; tasks may submit further tasks
+class ThreadPool {
+private:
+    vector<std::thread> workers;
+    std::deque<std::function<void()>> tasks;
+    std::mutex mtx;
+    std::condition_variable task_ready;
+    std::condition_variable idle;
+    size_t active = 0;
+    bool stopping = false;
+
+    void run() {
+        while (true) {
+            std::function<void()> task;
+            {
+                std::unique_lock<std::mutex> lock(mtx);
+                task_ready.wait(lock, [this] { return stopping || !tasks.empty(); });
+                if (tasks.empty()) {
+                    return;
+                }
+                task = std::move(tasks.front());
+                tasks.pop_front();
+                active++;
+            }
+
+            try {
+                task();
+            } catch (...) {
+                // A failing task must not take the worker down with it
+            }
+
+            std::lock_guard<std::mutex> lock(mtx);
+            active--;
+            if (active == 0 && tasks.empty()) {
+                idle.notify_all();
+            }
+        }
+    }
+
+public:
+    static size_t default_threads() {
+        size_t n = std::thread::hardware_concurrency();
+        return n > 0 ? n : 4;
+    }
+
+    explicit ThreadPool(size_t threads = 0) {
+        if (threads == 0) {
+            threads = default_threads();
+        }
+        for (size_t i = 0; i < threads; i++) {
+            workers.emplace_back([this] { run(); });
+        }
+    }
+
+    ~ThreadPool() {
+        {
+            std::lock_guard<std::mutex> lock(mtx);
+            stopping = true;
+        }
+        task_ready.notify_all();
+        for (auto& worker : workers) {
+            worker.join();
+        }
+    }
+
+    ThreadPool(const ThreadPool&) = delete;
+    ThreadPool& operator=(const ThreadPool&) = delete;
+
+    void submit(std::function<void()> task) {
+        {
+            std::lock_guard<std::mutex> lock(mtx);
+            tasks.push_back(std::move(task));
+        }
+        task_ready.notify_one();
+    }
+
+    // Runs the task before those already queued, so a task's own subtasks go depth-first
+    void submit_front(std::function<void()> task) {
+        {
+            std::lock_guard<std::mutex> lock(mtx);
+            tasks.push_front(std::move(task));
+        }
+        task_ready.notify_one();
+    }
+
+    // Blocks until the queue is empty and no task is running
+    void wait() {
+        std::unique_lock<std::mutex> lock(mtx);
+        idle.wait(lock, [this] { return active == 0 && tasks.empty(); });
+    }
+
+    size_t size() const {
+        return workers.size();
+    }
+};
+
+#endif
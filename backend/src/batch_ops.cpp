@@ -0,0 +1,112 @@
+#include "../include/thread_pool.h"
+#include <algorithm>
+#include <filesystem>
+#include <mutex>
+#include <string>
+#include <system_error>
+#include <utility>
+#include <vector>
+
+namespace fs = std::filesystem;
+using std::string;
+using std::vector;
+
+// Bulk operations on a whole selection: one call, items spread over a pool,
+// one result per item in the order given
+
+// Where an item lands in the destination directory; "dir/" keeps its name too
+static string batch_destination(const string& src, const string& dest_dir) {
+    fs::path p(src);
+    if (!p.has_filename()) {
+        p = p.parent_path();
+    }
+    return (fs::path(dest_dir) / p.filename()).string();
+}
+
+static size_t batch_threads(size_t threads, size_t items) {
+    return std::max<size_t>(1, std::min(threads ? threads : ThreadPool::default_threads(), items));
+}
+
+vector<BatchResult> copy_paths(const vector<string>& srcs, const string& dest_dir, size_t threads = 0) {
+    if (srcs.empty()) {
+        return {};
+    }
+    vector<std::pair<string, string>> pairs;
+    pairs.reserve(srcs.size());
+    for (const string& src : srcs) {
+        pairs.emplace_back(src, batch_destination(src, dest_dir));
+    }
+    CopyJob job(pairs, threads);
+    job.start();
+    job.wait();
+    return job.results();
+}
+
+vector<BatchResult> remove_paths(const vector<string>& paths, size_t threads = 0) {
+    if (paths.empty()) {
+        return {};
+    }
+    DeleteJob job(paths, threads);
+    job.start();
+    job.wait();
+    return job.results();
+}
+
+// Renames within a filesystem; items on another one are copied and their sources removed
+vector<BatchResult> move_paths(const vector<string>& srcs, const string& dest_dir, size_t threads = 0) {
+    vector<BatchResult> results(srcs.size());
+    vector<size_t> cross_device;
+    {
+        std::mutex mtx;
+        ThreadPool pool(batch_threads(threads, srcs.size()));
+        for (size_t i = 0; i < srcs.size(); i++) {
+            pool.submit([&, i] {
+                BatchResult& result = results[i];
+                result.path = srcs[i];
+                result.destination = batch_destination(srcs[i], dest_dir);
+                std::error_code ec;
+                fs::rename(result.path, result.destination, ec);
+                if (ec == std::errc::cross_device_link) {
+                    std::lock_guard<std::mutex> lock(mtx);
+                    cross_device.push_back(i);
+                    return;
+                }
+                result.ok = !ec;
+                result.error = ec ? ec.message() : "";
+            });
+        }
+        pool.wait();
+    }
+
+    if (!cross_device.empty()) {
+        std::sort(cross_device.begin(), cross_device.end());
+        vector<string> copy_sources;
+        for (size_t i : cross_device) {
+            copy_sources.push_back(srcs[i]);
+        }
+        // A source is only removed once every one of its files arrived
+        vector<BatchResult> copied = copy_paths(copy_sources, dest_dir, threads);
+        vector<string> moved;
+        for (size_t k = 0; k < cross_device.size(); k++) {
+            results[cross_device[k]] = copied[k];
+            if (copied[k].ok) {
+                moved.push_back(copied[k].path);
+            }
+        }
+        vector<BatchResult> removed = remove_paths(moved, threads);
+        for (size_t k = 0, m = 0; k < cross_device.size(); k++) {
+            BatchResult& result = results[cross_device[k]];
+            if (result.ok) {
+                result.ok = removed[m].ok;
+                result.error = removed[m].ok ? "" : "copied, but the source could not be removed: " + removed[m].error;
+                m++;
+            }
+        }
+    }
+
+    for (const BatchResult& result : results) {
+        invalidate_path(result.path);
+        invalidate_path(result.destination);
+    }
+    return results;
+}
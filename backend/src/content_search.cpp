@@ -0,0 +1,414 @@
+#include "../include/directory_cache.h"
+#include "../include/mapped_file.h"
+#include "../include/thread_pool.h"
+#include <algorithm>
+#include <atomic>
+#include <cctype>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <functional>
+#include <iterator>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+namespace fs = std::filesystem;
+using std::string;
+using std::vector;
+using std::shared_ptr;
+
+// Files whose first bytes contain a NUL are treated as binary and skipped
+constexpr size_t BINARY_SNIFF_BYTES = 8192;
+// Files handed to one pool task
+constexpr size_t SEARCH_FILE_BATCH = 32;
+// Longest line excerpt kept per match
+constexpr size_t MATCH_LINE_LIMIT = 200;
+
+struct ContentMatch {
+    string path;
+    size_t line_number = 0;
+    size_t column = 0;
+    string line;
+};
+
+// One .gitignore line. Supported subset: * ? and ** globs, leading or inner /
+// anchoring to the .gitignore directory, trailing / for directories, ! negation
+struct IgnoreRule {
+    string pattern;
+    bool negate = false;
+    bool directory_only = false;
+    bool anchored = false;
+};
+
+// Rules of one .gitignore, chained to those of the directories above it
+struct IgnoreRules {
+    shared_ptr<const IgnoreRules> parent;
+    string base;  // directory of the .gitignore relative to the search root, "" for the root
+    vector<IgnoreRule> rules;
+};
+
+bool glob_match(const char* p, const char* s) {
+    while (*p) {
+        if (p[0] == '*' && p[1] == '*') {
+            // "**" crosses directories; "**/" also matches zero of them
+            p += 2;
+            if (*p == '/') {
+                p++;
+            }
+            for (const char* t = s;; t++) {
+                if (glob_match(p, t)) {
+                    return true;
+                }
+                if (!*t) {
+                    return false;
+                }
+            }
+        }
+        if (*p == '*') {
+            p++;
+            for (const char* t = s;; t++) {
+                if (glob_match(p, t)) {
+                    return true;
+                }
+                if (!*t || *t == '/') {
+                    return false;
+                }
+            }
+        }
+        if (!*s || (*p == '?' ? *s == '/' : *p != *s)) {
+            return false;
+        }
+        p++;
+        s++;
+    }
+    return !*s;
+}
+
+vector<IgnoreRule> parse_gitignore(const string& file_path) {
+    vector<IgnoreRule> rules;
+    std::ifstream in(file_path);
+    string line;
+    while (std::getline(in, line)) {
+        while (!line.empty() && (line.back() == '\r' || line.back() == ' ')) {
+            line.pop_back();
+        }
+        if (line.empty() || line[0] == '#') {
+            continue;
+        }
+
+        IgnoreRule rule;
+        if (line[0] == '!') {
+            rule.negate = true;
+            line.erase(0, 1);
+        } else if (line[0] == '\\') {
+            line.erase(0, 1);
+        }
+        if (!line.empty() && line.back() == '/') {
+            rule.directory_only = true;
+            line.pop_back();
+        }
+        if (line.find('/') != string::npos) {
+            rule.anchored = true;
+            if (line[0] == '/') {
+                line.erase(0, 1);
+            }
+        }
+        if (!line.empty()) {
+            rule.pattern = line;
+            rules.push_back(std::move(rule));
+        }
+    }
+    return rules;
+}
+
+// Git semantics: the last matching rule wins, deeper .gitignore files last
+bool is_ignored(const IgnoreRules* rules, const string& rel_path, bool is_directory) {
+    vector<const IgnoreRules*> chain;
+    for (; rules; rules = rules->parent.get()) {
+        chain.push_back(rules);
+    }
+
+    string name = rel_path.substr(rel_path.rfind('/') + 1);
+    bool ignored = false;
+    for (auto it = chain.rbegin(); it != chain.rend(); ++it) {
+        const IgnoreRules& set = **it;
+        string local = set.base.empty() ? rel_path : rel_path.substr(set.base.size() + 1);
+        for (const auto& rule : set.rules) {
+            if (rule.directory_only && !is_directory) {
+                continue;
+            }
+            const string& target = rule.anchored ? local : name;
+            if (glob_match(rule.pattern.c_str(), target.c_str())) {
+                ignored = !rule.negate;
+            }
+        }
+    }
+    return ignored;
+}
+
+// grep-style search for a literal string in every text file under a directory;
+// matches are collected on pool threads and taken in batches while it runs
+class ContentSearch {
+private:
+    using Finder = std::function<const char*(const char*, const char*)>;
+
+    string root;
+    string pattern;
+    bool ignore_case;
+    size_t thread_count;
+    size_t max_results;
+    Finder finder;
+
+    std::thread coordinator;
+    std::atomic<bool> cancelled{false};
+    std::atomic<bool> limit_reached{false};
+    std::atomic<bool> finished{false};
+    std::atomic<uint64_t> files_scanned{0};
+    std::atomic<uint64_t> files_matched{0};
+    std::atomic<uint64_t> matches{0};
+    std::atomic<uint64_t> errors{0};
+
+    vector<ContentMatch> pending;
+    mutable std::mutex pending_mtx;
+
+    bool stopping() const {
+        return cancelled || limit_reached;
+    }
+
+    void make_finder() {
+        if (ignore_case) {
+            auto hash = [](char c) { return std::hash<int>()(std::tolower(static_cast<unsigned char>(c))); };
+            auto equal = [](char a, char b) {
+                return std::tolower(static_cast<unsigned char>(a)) == std::tolower(static_cast<unsigned char>(b));
+            };
+            std::boyer_moore_horspool_searcher<string::const_iterator, decltype(hash), decltype(equal)>
+                searcher(pattern.cbegin(), pattern.cend(), hash, equal);
+            finder = [searcher](const char* first, const char* last) {
+                return std::search(first, last, searcher);
+            };
+        } else {
+            std::boyer_moore_horspool_searcher<string::const_iterator> searcher(pattern.cbegin(), pattern.cend());
+            finder = [searcher](const char* first, const char* last) {
+                return std::search(first, last, searcher);
+            };
+        }
+    }
+
+    static string excerpt(const char* line_start, const char* line_end, const char* hit) {
+        if (line_end > line_start && line_end[-1] == '\r') {
+            line_end--;
+        }
+        // Keep some context before the match on very long lines
+        const char* from = hit - line_start > 40 && line_end - line_start > static_cast<ptrdiff_t>(MATCH_LINE_LIMIT)
+                               ? hit - 40 : line_start;
+        const char* to = std::min(line_end, from + MATCH_LINE_LIMIT);
+        return string(from, to);
+    }
+
+    void publish(vector<ContentMatch>& found) {
+        std::lock_guard<std::mutex> lock(pending_mtx);
+        size_t room = max_results > matches ? max_results - matches : 0;
+        if (found.size() >= room) {
+            found.resize(room);
+            limit_reached = true;
+        }
+        matches += found.size();
+        std::move(found.begin(), found.end(), std::back_inserter(pending));
+    }
+
+    void search_file(const string& file_path) {
+        MappedFile file(file_path);
+        if (!file.is_open()) {
+            errors++;
+            return;
+        }
+        files_scanned++;
+
+        const char* data = file.data();
+        const char* end = data + file.size();
+        if (!data || std::memchr(data, 0, std::min(file.size(), BINARY_SNIFF_BYTES))) {
+            return;
+        }
+
+        vector<ContentMatch> found;
+        size_t line_number = 1;
+        const char* counted = data;
+        const char* pos = data;
+        while (pos < end && !stopping()) {
+            const char* hit = finder(pos, end);
+            if (hit == end) {
+                break;
+            }
+            line_number += std::count(counted, hit, '\n');
+            counted = hit;
+
+            const char* line_start = hit;
+            while (line_start > data && line_start[-1] != '\n') {
+                line_start--;
+            }
+            const char* line_end = static_cast<const char*>(std::memchr(hit, '\n', end - hit));
+            if (!line_end) {
+                line_end = end;
+            }
+
+            found.push_back(ContentMatch{file_path, line_number, static_cast<size_t>(hit - line_start) + 1,
+                                         excerpt(line_start, line_end, hit)});
+            // One match per line, like grep
+            pos = line_end;
+        }
+
+        if (!found.empty()) {
+            files_matched++;
+            publish(found);
+        }
+    }
+
+    void search_files(const vector<string>& paths) {
+        for (const auto& file_path : paths) {
+            if (stopping()) {
+                break;
+            }
+            search_file(file_path);
+        }
+    }
+
+    void submit_files(ThreadPool& pool, vector<string>& paths) {
+        pool.submit([this, paths = std::move(paths)] { search_files(paths); });
+        paths.clear();
+    }
+
+    void submit_directory(ThreadPool& pool, string dir, string rel, shared_ptr<const IgnoreRules> rules) {
+        pool.submit([this, &pool, dir = std::move(dir), rel = std::move(rel), rules = std::move(rules)] {
+            walk(pool, dir, rel, rules);
+        });
+    }
+
+    void walk(ThreadPool& pool, const string& dir, const string& rel, shared_ptr<const IgnoreRules> rules) {
+        if (stopping()) {
+            return;
+        }
+
+        std::error_code ec;
+        fs::path gitignore = fs::path(dir) / ".gitignore";
+        if (fs::is_regular_file(gitignore, ec)) {
+            auto local = std::make_shared<IgnoreRules>();
+            local->parent = rules;
+            local->base = rel;
+            local->rules = parse_gitignore(gitignore.string());
+            rules = local;
+        }
+
+        vector<string> files;
+        for (const auto& entry : fs::directory_iterator(dir, fs::directory_options::skip_permission_denied, ec)) {
+            if (stopping()) {
+                return;
+            }
+            string name = entry.path().filename().string();
+            if (name == ".git") {
+                continue;
+            }
+
+            std::error_code entry_ec;
+            bool is_directory = entry.is_directory(entry_ec) && !entry.is_symlink(entry_ec);
+            string child_rel = rel.empty() ? name : rel + "/" + name;
+            if (rules && is_ignored(rules.get(), child_rel, is_directory)) {
+                continue;
+            }
+
+            if (is_directory) {
+                submit_directory(pool, entry.path().string(), child_rel, rules);
+            } else if (entry.is_regular_file(entry_ec)) {
+                files.push_back(entry.path().string());
+                if (files.size() == SEARCH_FILE_BATCH) {
+                    submit_files(pool, files);
+                }
+            }
+        }
+        if (ec) {
+            errors++;
+        }
+        if (!files.empty()) {
+            submit_files(pool, files);
+        }
+    }
+
+    void run() {
+        ThreadPool pool(thread_count);
+        if (!pattern.empty()) {
+            submit_directory(pool, root, "", nullptr);
+        }
+        pool.wait();
+        finished = true;
+    }
+
+public:
+    ContentSearch(const string& path, const string& query, bool case_insensitive = false,
+                  size_t threads = 0, size_t result_limit = 10000)
+        : root(DirectoryCache::normalize(path)), pattern(query), ignore_case(case_insensitive),
+          thread_count(threads), max_results(result_limit) {
+        make_finder();
+    }
+
+    ~ContentSearch() {
+        cancel();
+        wait();
+    }
+
+    ContentSearch(const ContentSearch&) = delete;
+    ContentSearch& operator=(const ContentSearch&) = delete;
+
+    void start() {
+        if (!coordinator.joinable()) {
+            coordinator = std::thread([this] { run(); });
+        }
+    }
+
+    void cancel() {
+        cancelled = true;
+    }
+
+    void wait() {
+        if (coordinator.joinable()) {
+            coordinator.join();
+        }
+    }
+
+    bool is_done() const {
+        return finished;
+    }
+
+    bool is_cancelled() const {
+        return cancelled;
+    }
+
+    bool is_truncated() const {
+        return limit_reached;
+    }
+
+    uint64_t file_count() const {
+        return files_scanned;
+    }
+
+    uint64_t matched_file_count() const {
+        return files_matched;
+    }
+
+    uint64_t match_count() const {
+        return matches;
+    }
+
+    uint64_t error_count() const {
+        return errors;
+    }
+
+    // Matches found since the previous call, in the order the workers produced them
+    vector<ContentMatch> take_results() {
+        std::lock_guard<std::mutex> lock(pending_mtx);
+        vector<ContentMatch> batch;
+        batch.swap(pending);
+        return batch;
+    }
+};
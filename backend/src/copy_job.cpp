@@ -0,0 +1,532 @@
+#include "../include/thread_pool.h"
+#include <algorithm>
+#include <atomic>
+#include <cerrno>
+#include <chrono>
+#include <cstdlib>
+#include <filesystem>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+#ifndef _WIN32
+#include <dirent.h>
+#include <fcntl.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+#ifdef __linux__
+#include <linux/fs.h>
+#include <sys/ioctl.h>
+#include <sys/sendfile.h>
+#endif
+
+namespace fs = std::filesystem;
+using std::string;
+using std::vector;
+
+// Bytes moved per copy_file_range/sendfile/read call, between cancellation checks
+constexpr size_t COPY_CHUNK = 8 * 1024 * 1024;
+// Userspace fallback buffer, page aligned for the kernel's benefit
+constexpr size_t COPY_BUFFER = 1024 * 1024;
+constexpr size_t COPY_BUFFER_ALIGN = 4096;
+// Copies are mostly I/O bound: run at least this many at once
+constexpr size_t MIN_COPY_THREADS = 4;
+// Error messages kept per job
+constexpr size_t MAX_COPY_ERRORS = 100;
+
+struct CopyProgress {
+    uint64_t bytes_done = 0;
+    uint64_t bytes_total = 0;
+    uint64_t files_done = 0;
+    uint64_t files_total = 0;
+    uint64_t errors = 0;
+    double seconds = 0;
+    double bytes_per_second = 0;  // over the last sampling window
+    bool scanning = true;         // totals still growing while the source is walked
+    bool done = false;
+    bool cancelled = false;
+};
+
+// Outcome of one item of a batch operation
+struct BatchResult {
+    string path;
+    string destination;
+    bool ok = false;
+    string error;
+};
+
+// Copies files or directory trees in the background. Files are written to a
+// hidden ".part" sibling and renamed into place once complete, so a cancelled or
+// failed job never leaves a truncated file under its final name. A job may copy
+// many sources at once; their files share one pool.
+class CopyJob {
+private:
+    struct Directory {
+        string path;
+        unsigned mode;
+    };
+
+    struct Item {
+        string source;
+        string destination;
+    };
+
+    vector<Item> items;
+    size_t thread_count;
+
+    std::thread coordinator;
+    std::atomic<bool> cancelled{false};
+    std::atomic<bool> finished{false};
+    std::atomic<bool> scanning{true};
+    std::atomic<uint64_t> bytes_done{0};
+    std::atomic<uint64_t> bytes_total{0};
+    std::atomic<uint64_t> files_done{0};
+    std::atomic<uint64_t> files_total{0};
+    std::atomic<uint64_t> error_total{0};
+    std::chrono::steady_clock::time_point started;
+    std::chrono::steady_clock::time_point stopped;
+
+    vector<string> messages;
+    vector<string> item_errors;     // first error of each item, "" if none
+    vector<Directory> directories;  // created directories, parents first
+    mutable std::mutex mtx;
+
+    // Throughput sampling state, advanced by progress()
+    mutable std::chrono::steady_clock::time_point sample_time;
+    mutable uint64_t sample_bytes = 0;
+    mutable double rate = 0;
+
+    void fail(const string& what, const string& where, size_t item) {
+        error_total++;
+        std::lock_guard<std::mutex> lock(mtx);
+        if (messages.size() < MAX_COPY_ERRORS) {
+            messages.push_back(what + ": " + where);
+        }
+        if (item_errors[item].empty()) {
+            item_errors[item] = what + ": " + where;
+        }
+    }
+
+    static string part_path(const string& target) {
+        fs::path p(target);
+        return (p.parent_path() / ("." + p.filename().string() + ".part")).string();
+    }
+
+#ifndef _WIN32
+    // Moves the bytes of one open file into another: reflink, then in-kernel copies,
+    // then a userspace buffer. Returns false on error or cancellation.
+    bool copy_contents(int in, int out, uint64_t size) {
+        if (size == 0) {
+            return true;
+        }
+#ifdef __linux__
+        if (ioctl(out, FICLONE, in) == 0) {
+            bytes_done += size;
+            return true;
+        }
+
+        uint64_t copied = 0;
+        bool kernel_copy = true;
+        while (copied < size && !cancelled) {
+            ssize_t n = copy_file_range(in, nullptr, out, nullptr, std::min<uint64_t>(COPY_CHUNK, size - copied), 0);
+            if (n <= 0) {
+                kernel_copy = n == 0 && copied > 0;  // source shrank underneath us
+                break;
+            }
+            copied += n;
+            bytes_done += n;
+        }
+        if (kernel_copy && copied > 0) {
+            return !cancelled;
+        }
+
+        // copy_file_range is refused across some filesystems; sendfile copies file to file too
+        while (copied < size && !cancelled) {
+            off_t offset = static_cast<off_t>(copied);
+            ssize_t n = sendfile(out, in, &offset, std::min<uint64_t>(COPY_CHUNK, size - copied));
+            if (n <= 0) {
+                break;
+            }
+            copied += n;
+            bytes_done += n;
+        }
+        if (copied >= size || cancelled) {
+            return !cancelled;
+        }
+        if (lseek(in, static_cast<off_t>(copied), SEEK_SET) < 0 || lseek(out, static_cast<off_t>(copied), SEEK_SET) < 0) {
+            return false;
+        }
+#endif
+        std::unique_ptr<char, decltype(&std::free)> buffer(
+            static_cast<char*>(std::aligned_alloc(COPY_BUFFER_ALIGN, COPY_BUFFER)), &std::free);
+        if (!buffer) {
+            return false;
+        }
+        while (!cancelled) {
+            ssize_t n = read(in, buffer.get(), COPY_BUFFER);
+            if (n < 0) {
+                return false;
+            }
+            if (n == 0) {
+                return true;
+            }
+            for (ssize_t written = 0; written < n;) {
+                ssize_t w = write(out, buffer.get() + written, n - written);
+                if (w < 0) {
+                    return false;
+                }
+                written += w;
+            }
+            bytes_done += n;
+        }
+        return false;
+    }
+
+    void copy_file(const string& from, const string& to, size_t item) {
+        if (cancelled) {
+            return;
+        }
+        int in = open(from.c_str(), O_RDONLY | O_CLOEXEC);
+        if (in < 0) {
+            fail("cannot open", from, item);
+            return;
+        }
+        struct stat st;
+        if (fstat(in, &st) != 0) {
+            close(in);
+            fail("cannot stat", from, item);
+            return;
+        }
+
+        // An empty file cannot be seen half-written, so it skips the rename
+        string part = st.st_size == 0 ? to : part_path(to);
+        int out = open(part.c_str(), O_WRONLY | O_CREAT | O_TRUNC | O_CLOEXEC, 0600);
+        if (out < 0) {
+            close(in);
+            fail("cannot create", part, item);
+            return;
+        }
+
+        bool ok = copy_contents(in, out, static_cast<uint64_t>(st.st_size));
+        ok = fchmod(out, st.st_mode & 07777) == 0 && ok;
+        ok = close(out) == 0 && ok;
+        close(in);
+
+        if (ok && !cancelled && (part == to || rename(part.c_str(), to.c_str()) == 0)) {
+            files_done++;
+            return;
+        }
+        unlink(part.c_str());
+        if (!cancelled) {
+            fail("copy failed", from, item);
+        }
+    }
+
+    void copy_symlink(const string& from, const string& to, size_t item) {
+        std::error_code ec;
+        fs::path target = fs::read_symlink(from, ec);
+        if (!ec) {
+            fs::remove(to, ec);
+            fs::create_symlink(target, to, ec);
+        }
+        if (ec) {
+            fail("cannot copy link", from, item);
+        } else {
+            files_done++;
+        }
+    }
+
+    bool make_directory(const string& from_dir, const string& to_dir, size_t item) {
+        struct stat st;
+        if (stat(from_dir.c_str(), &st) != 0) {
+            fail("cannot stat", from_dir, item);
+            return false;
+        }
+        // Writable until the files are in; the source mode is applied at the end
+        if (mkdir(to_dir.c_str(), 0700) != 0) {
+            // Merging into an existing directory keeps its mode
+            struct stat existing;
+            if (errno != EEXIST || stat(to_dir.c_str(), &existing) != 0 || !S_ISDIR(existing.st_mode)) {
+                fail("cannot create", to_dir, item);
+                return false;
+            }
+            return true;
+        }
+        std::lock_guard<std::mutex> lock(mtx);
+        directories.push_back(Directory{to_dir, static_cast<unsigned>(st.st_mode & 07777)});
+        return true;
+    }
+
+    // Walks the source on the coordinator thread; files are copied by the pool meanwhile
+    void copy_tree(ThreadPool& pool, const string& from_dir, const string& to_dir, size_t item) {
+        if (!make_directory(from_dir, to_dir, item)) {
+            return;
+        }
+        DIR* handle = opendir(from_dir.c_str());
+        if (!handle) {
+            fail("cannot read", from_dir, item);
+            return;
+        }
+        int fd = dirfd(handle);
+        while (dirent* entry = readdir(handle)) {
+            if (cancelled) {
+                break;
+            }
+            string name = entry->d_name;
+            if (name == "." || name == "..") {
+                continue;
+            }
+            string from = from_dir + "/" + name;
+            string to = to_dir + "/" + name;
+
+            struct stat st;
+            if (fstatat(fd, entry->d_name, &st, AT_SYMLINK_NOFOLLOW) != 0) {
+                fail("cannot stat", from, item);
+                continue;
+            }
+            if (S_ISDIR(st.st_mode)) {
+                copy_tree(pool, from, to, item);
+            } else if (S_ISREG(st.st_mode) || S_ISLNK(st.st_mode)) {
+                files_total++;
+                if (S_ISLNK(st.st_mode)) {
+                    copy_symlink(from, to, item);
+                } else {
+                    bytes_total += static_cast<uint64_t>(st.st_size);
+                    pool.submit([this, from, to, item] { copy_file(from, to, item); });
+                }
+            } else {
+                fail("skipped special file", from, item);
+            }
+        }
+        closedir(handle);
+    }
+
+    void apply_directory_modes() {
+        std::lock_guard<std::mutex> lock(mtx);
+        for (auto it = directories.rbegin(); it != directories.rend(); ++it) {
+            chmod(it->path.c_str(), it->mode);
+        }
+    }
+#else
+    // std::filesystem fallback: each file goes through the OS copy routine in one call
+    void copy_file(const string& from, const string& to, size_t item) {
+        if (cancelled) {
+            return;
+        }
+        std::error_code ec;
+        string part = part_path(to);
+        uint64_t size = fs::file_size(from, ec);
+        fs::copy_file(from, part, fs::copy_options::overwrite_existing, ec);
+        if (!ec && !cancelled) {
+            fs::rename(part, to, ec);
+            if (!ec) {
+                bytes_done += size;
+                files_done++;
+                return;
+            }
+        }
+        fs::remove(part, ec);
+        if (!cancelled) {
+            fail("copy failed", from, item);
+        }
+    }
+
+    void copy_tree(ThreadPool& pool, const string& from_dir, const string& to_dir, size_t item) {
+        std::error_code ec;
+        fs::create_directories(to_dir, ec);
+        if (ec) {
+            fail("cannot create", to_dir, item);
+            return;
+        }
+        for (fs::recursive_directory_iterator it(from_dir, ec), end; !cancelled && !ec && it != end; it.increment(ec)) {
+            fs::path to = fs::path(to_dir) / fs::relative(it->path(), from_dir, ec);
+            std::error_code entry_ec;
+            if (it->is_directory(entry_ec)) {
+                fs::create_directories(to, entry_ec);
+            } else if (it->is_regular_file(entry_ec)) {
+                files_total++;
+                bytes_total += it->file_size(entry_ec);
+                pool.submit([this, from = it->path().string(), to = to.string(), item] { copy_file(from, to, item); });
+            }
+            if (entry_ec) {
+                fail("cannot copy", it->path().string(), item);
+            }
+        }
+        if (ec) {
+            fail("cannot read", from_dir, item);
+        }
+    }
+
+    void apply_directory_modes() {}
+#endif
+
+    // Queues the files of one source on the pool; directories are walked here
+    void copy_item(ThreadPool& pool, size_t item) {
+        const string& source = items[item].source;
+        const string& destination = items[item].destination;
+        std::error_code ec;
+        fs::file_status status = fs::symlink_status(source, ec);
+        fs::path src_norm = fs::path(source).lexically_normal();
+        fs::path rel = fs::path(destination).lexically_normal().lexically_relative(src_norm);
+        std::error_code same_ec;
+
+        if (ec) {
+            fail("cannot stat", source, item);
+        } else if (fs::is_directory(status)) {
+            // Copying a directory into itself would never finish
+            if (!rel.empty() && *rel.begin() != "..") {
+                fail("cannot copy a directory into itself", destination, item);
+            } else {
+                copy_tree(pool, source, destination, item);
+            }
+        } else if (rel == "." || (fs::is_regular_file(status) && fs::equivalent(source, destination, same_ec))) {
+            // Would replace the file with a copy of itself, or with nothing if the copy fails
+            fail("cannot copy a file onto itself", destination, item);
+        } else if (fs::is_regular_file(status)) {
+            files_total++;
+            bytes_total += fs::file_size(source, ec);
+            pool.submit([this, item] { copy_file(items[item].source, items[item].destination, item); });
+        } else {
+#ifndef _WIN32
+            if (fs::is_symlink(status)) {
+                files_total++;
+                copy_symlink(source, destination, item);
+            } else
+#endif
+            fail("unsupported file type", source, item);
+        }
+    }
+
+    void run() {
+        {
+            ThreadPool pool(std::max(thread_count, MIN_COPY_THREADS));
+            for (size_t item = 0; item < items.size() && !cancelled; item++) {
+                copy_item(pool, item);
+            }
+            scanning = false;
+            pool.wait();
+        }
+        apply_directory_modes();
+        for (const Item& item : items) {
+            invalidate_path(item.destination);
+        }
+
+        std::lock_guard<std::mutex> lock(mtx);
+        stopped = std::chrono::steady_clock::now();
+        finished = true;
+    }
+
+public:
+    CopyJob(const string& src, const string& dest, size_t threads = 0)
+        : CopyJob(vector<std::pair<string, string>>{{src, dest}}, threads) {}
+
+    // One job for many (source, destination) pairs
+    explicit CopyJob(const vector<std::pair<string, string>>& pairs, size_t threads = 0)
+        : thread_count(threads ? threads : ThreadPool::default_threads()), item_errors(pairs.size()) {
+        for (const auto& [src, dest] : pairs) {
+            items.push_back(Item{src, dest});
+        }
+    }
+
+    ~CopyJob() {
+        cancel();
+        wait();
+    }
+
+    CopyJob(const CopyJob&) = delete;
+    CopyJob& operator=(const CopyJob&) = delete;
+
+    void start() {
+        if (!coordinator.joinable()) {
+            started = sample_time = std::chrono::steady_clock::now();
+            coordinator = std::thread([this] { run(); });
+        }
+    }
+
+    void cancel() {
+        cancelled = true;
+    }
+
+    void wait() {
+        if (coordinator.joinable()) {
+            coordinator.join();
+        }
+    }
+
+    bool is_done() const {
+        return finished;
+    }
+
+    // True once the job has finished without errors or cancellation
+    bool succeeded() const {
+        return finished && !cancelled && error_total == 0;
+    }
+
+    const string& source_path() const {
+        return items.front().source;
+    }
+
+    const string& destination_path() const {
+        return items.front().destination;
+    }
+
+    size_t item_count() const {
+        return items.size();
+    }
+
+    CopyProgress progress() const {
+        std::lock_guard<std::mutex> lock(mtx);
+        auto now = finished ? stopped : std::chrono::steady_clock::now();
+
+        CopyProgress p;
+        p.bytes_done = bytes_done;
+        p.bytes_total = bytes_total;
+        p.files_done = files_done;
+        p.files_total = files_total;
+        p.errors = error_total;
+        p.scanning = scanning;
+        p.done = finished;
+        p.cancelled = cancelled;
+        p.seconds = std::chrono::duration<double>(now - started).count();
+
+        // Current rather than average throughput: re-sampled at most twice a second
+        double window = std::chrono::duration<double>(now - sample_time).count();
+        if (window >= 0.5) {
+            rate = (p.bytes_done - sample_bytes) / window;
+            sample_time = now;
+            sample_bytes = p.bytes_done;
+        }
+        p.bytes_per_second = finished && p.seconds > 0 ? p.bytes_done / p.seconds : rate;
+        return p;
+    }
+
+    vector<string> error_messages() const {
+        std::lock_guard<std::mutex> lock(mtx);
+        return messages;
+    }
+
+    // Per-item outcome; an item succeeded if none of its files failed and the job was not cancelled
+    vector<BatchResult> results() const {
+        std::lock_guard<std::mutex> lock(mtx);
+        vector<BatchResult> out;
+        out.reserve(items.size());
+        for (size_t i = 0; i < items.size(); i++) {
+            bool ok = finished && !cancelled && item_errors[i].empty();
+            string error = item_errors[i].empty() && cancelled ? "cancelled" : item_errors[i];
+            out.push_back(BatchResult{items[i].source, items[i].destination, ok, error});
+        }
+        return out;
+    }
+};
+
+// Blocking copy on the job engine, for callers that only need the outcome
+bool copy_path(const string& src, const string& dest) {
+    CopyJob job(src, dest);
+    job.start();
+    job.wait();
+    return job.succeeded();
+}
@@ -0,0 +1,711 @@
+#include "../include/thread_pool.h"
+#include <algorithm>
+#include <atomic>
+#include <cerrno>
+#include <chrono>
+#include <condition_variable>
+#include <cstring>
+#include <deque>
+#include <filesystem>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+#ifndef _WIN32
+#include <dirent.h>
+#include <fcntl.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+namespace fs = std::filesystem;
+using std::string;
+using std::vector;
+
+// Unlinks are metadata-bound and mostly wait on the filesystem: run at least this many at once
+constexpr size_t MIN_DELETE_THREADS = 4;
+// Names of one large directory handed to a single task, so its unlinks spread over the pool
+constexpr size_t DELETE_BATCH = 1024;
+// Error messages kept per job
+constexpr size_t MAX_DELETE_ERRORS = 100;
+// Threads of the background trash purge, kept low so it does not compete with the UI's work
+constexpr size_t TRASH_PURGE_THREADS = 2;
+constexpr const char* TRASH_PREFIX = ".file-ranger-trash-";
+
+struct DeleteProgress {
+    uint64_t files_done = 0;
+    uint64_t directories_done = 0;
+    uint64_t errors = 0;
+    double seconds = 0;
+    double entries_per_second = 0;
+    bool done = false;
+    bool cancelled = false;
+};
+
+// Removes files and directory trees in the background. Each directory is opened
+// relative to its parent's descriptor without following symlinks and read once;
+// its entries are unlinked with unlinkat in batches spread over a pool, and the
+// directory is removed from its parent as soon as its last entry and subdirectory
+// are gone. No path below an item is ever resolved, so neither depth nor symlinks
+// swapped in during the delete can redirect it. Subdirectories are taken
+// depth-first, which keeps the descriptors held open few.
+class DeleteJob {
+private:
+    vector<string> paths;
+    size_t thread_count;
+    int base_fd = -1;  // directory the paths are entries of, when given open
+    ThreadPool* pool = nullptr;
+
+    std::thread coordinator;
+    std::atomic<bool> cancelled{false};
+    std::atomic<bool> finished{false};
+    std::atomic<uint64_t> files_done{0};
+    std::atomic<uint64_t> directories_done{0};
+    std::atomic<uint64_t> error_total{0};
+    std::chrono::steady_clock::time_point started;
+    std::chrono::steady_clock::time_point stopped;
+
+    vector<string> messages;
+    vector<string> item_errors;  // first error of each item, "" if none
+    mutable std::mutex mtx;
+
+    void fail(const string& what, const string& where, size_t item, int error = 0) {
+        error_total++;
+        string message = what + ": " + where + (error ? string(" (") + std::strerror(error) + ")" : "");
+        std::lock_guard<std::mutex> lock(mtx);
+        if (messages.size() < MAX_DELETE_ERRORS) {
+            messages.push_back(message);
+        }
+        if (item_errors[item].empty()) {
+            item_errors[item] = message;
+        }
+    }
+
+    bool item_errors_empty(size_t item) const {
+        std::lock_guard<std::mutex> lock(mtx);
+        return item_errors[item].empty();
+    }
+
+    static string trimmed(string path) {
+        while (path.size() > 1 && path.back() == '/') {
+            path.pop_back();
+        }
+        return path;
+    }
+
+#ifndef _WIN32
+    struct Directory {
+        string name;  // entry in its parent
+        std::shared_ptr<Directory> parent;
+        size_t item;
+        dev_t dev = 0;
+        ino_t ino = 0;
+        dev_t parent_dev;
+        ino_t parent_ino;
+        // Its own listing, each unlink batch and each subdirectory not yet removed
+        std::atomic<size_t> pending{1};
+
+        Directory(string dir_name, std::shared_ptr<Directory> parent_dir, size_t item_index,
+                  dev_t in_dev, ino_t in_ino)
+            : name(std::move(dir_name)), parent(std::move(parent_dir)), item(item_index),
+              parent_dev(in_dev), parent_ino(in_ino) {}
+    };
+
+    struct CloseDir {
+        void operator()(DIR* dir) const {
+            closedir(dir);
+        }
+    };
+    using DirHandle = std::shared_ptr<DIR>;
+
+    static DirHandle open_handle(int fd) {
+        DIR* stream = fd >= 0 ? fdopendir(fd) : nullptr;
+        if (stream == nullptr && fd >= 0) {
+            int error = errno;
+            close(fd);
+            errno = error;
+        }
+        return stream ? DirHandle(stream, CloseDir()) : nullptr;
+    }
+
+    // For messages only; the job itself never resolves it
+    string path_of(const Directory* dir) const {
+        vector<const string*> names;
+        for (; dir->parent; dir = dir->parent.get()) {
+            names.push_back(&dir->name);
+        }
+        string path = trimmed(paths[dir->item]);
+        for (auto it = names.rbegin(); it != names.rend(); ++it) {
+            path += "/" + **it;
+        }
+        return path;
+    }
+
+    // Removes an emptied directory through its "..", checked to still be the directory
+    // it was listed in; returns that parent's descriptor, or -1 if it was not removed
+    int remove_directory(Directory& dir, int fd) {
+        int parent_fd = openat(fd, "..", O_RDONLY | O_DIRECTORY | O_CLOEXEC);
+        if (parent_fd < 0) {
+            fail("cannot remove", path_of(&dir), dir.item, errno);
+            return -1;
+        }
+        struct stat parent_st;
+        struct stat st;
+        if (fstat(parent_fd, &parent_st) != 0 || parent_st.st_dev != dir.parent_dev ||
+            parent_st.st_ino != dir.parent_ino ||
+            fstatat(parent_fd, dir.name.c_str(), &st, AT_SYMLINK_NOFOLLOW) != 0 ||
+            st.st_dev != dir.dev || st.st_ino != dir.ino) {
+            fail("moved while being removed", path_of(&dir), dir.item);
+            close(parent_fd);
+            return -1;
+        }
+        if (unlinkat(parent_fd, dir.name.c_str(), AT_REMOVEDIR) == 0) {
+            directories_done++;
+            return parent_fd;
+        }
+        int error = errno;
+        // A directory left non-empty by a failed entry was already reported
+        if (error != ENOTEMPTY || item_errors_empty(dir.item)) {
+            fail("cannot remove", path_of(&dir), dir.item, error);
+        }
+        close(parent_fd);
+        return -1;
+    }
+
+    // Drops one pending count; a directory whose count reaches zero is removed, and so
+    // on upwards. handle is the directory's own, or null if it could not be read, in
+    // which case nothing above it can be removed either.
+    void release(std::shared_ptr<Directory> dir, DirHandle handle) {
+        int fd = handle ? dirfd(handle.get()) : -1;
+        int opened = -1;  // a parent's descriptor opened on the way up
+        while (dir && --dir->pending == 0) {
+            int parent_fd = !cancelled && fd >= 0 ? remove_directory(*dir, fd) : -1;
+            // Closed as soon as removed: an open descendant keeps the whole removed chain
+            // in the kernel's cache, and each rmdir above would walk it again
+            handle.reset();
+            if (opened >= 0) {
+                close(opened);
+            }
+            opened = fd = parent_fd;
+            // Detached from its child first, so a long chain is not freed recursively
+            std::shared_ptr<Directory> parent = std::move(dir->parent);
+            dir = std::move(parent);
+        }
+        if (opened >= 0) {
+            close(opened);
+        }
+    }
+
+    // The subdirectory opens itself relative to `handle`, which it holds until then
+    void queue_directory(const DirHandle& handle, const std::shared_ptr<Directory>& dir, const string& name) {
+        auto child = std::make_shared<Directory>(name, dir, dir->item, dir->dev, dir->ino);
+        dir->pending++;
+        pool->submit_front([this, parent = handle, child]() mutable { clear_directory(child, std::move(parent)); });
+    }
+
+    void unlink_batch(const DirHandle& handle, const std::shared_ptr<Directory>& dir, const vector<string>& names) {
+        int fd = dirfd(handle.get());
+        for (const string& name : names) {
+            if (cancelled) {
+                break;
+            }
+            if (unlinkat(fd, name.c_str(), 0) == 0) {
+                files_done++;
+            } else if (errno == EISDIR || errno == EPERM) {
+                // A directory whose type the listing did not report (EPERM on some systems)
+                struct stat st;
+                if (fstatat(fd, name.c_str(), &st, AT_SYMLINK_NOFOLLOW) == 0 && S_ISDIR(st.st_mode)) {
+                    queue_directory(handle, dir, name);
+                } else {
+                    fail("cannot remove", path_of(dir.get()) + "/" + name, dir->item, EPERM);
+                }
+            } else if (errno != ENOENT) {
+                fail("cannot remove", path_of(dir.get()) + "/" + name, dir->item, errno);
+            }
+        }
+    }
+
+    void clear_directory(std::shared_ptr<Directory> dir, DirHandle parent) {
+        int fd = openat(dirfd(parent.get()), dir->name.c_str(), O_RDONLY | O_DIRECTORY | O_NOFOLLOW | O_CLOEXEC);
+        parent.reset();
+        struct stat st;
+        if (fd >= 0 && fstat(fd, &st) == 0) {
+            dir->dev = st.st_dev;
+            dir->ino = st.st_ino;
+        }
+        DirHandle handle = open_handle(fd);
+        if (!handle) {
+            fail("cannot open", path_of(dir.get()), dir->item, errno);
+            release(dir, nullptr);
+            return;
+        }
+        DIR* stream = handle.get();
+
+        vector<string> batch;
+        vector<string> subdirectories;
+        while (!cancelled) {
+            errno = 0;
+            dirent* entry = readdir(stream);
+            if (entry == nullptr) {
+                if (errno) {
+                    fail("cannot read", path_of(dir.get()), dir->item, errno);
+                }
+                break;
+            }
+            const char* name = entry->d_name;
+            if (name[0] == '.' && (name[1] == '\0' || (name[1] == '.' && name[2] == '\0'))) {
+                continue;
+            }
+            if (entry->d_type == DT_DIR) {
+                subdirectories.emplace_back(name);
+                continue;
+            }
+            batch.emplace_back(name);
+            if (batch.size() == DELETE_BATCH) {
+                // Large directories: later batches run on other threads, sharing the open directory
+                dir->pending++;
+                pool->submit([this, handle, dir, names = std::move(batch)]() mutable {
+                    unlink_batch(handle, dir, names);
+                    release(dir, std::move(handle));
+                });
+                batch.clear();
+            }
+        }
+        unlink_batch(handle, dir, batch);
+
+        // Queued once the listing is done, so a directory is never read by two threads
+        for (const string& name : subdirectories) {
+            if (cancelled) {
+                break;
+            }
+            queue_directory(handle, dir, name);
+        }
+        release(dir, std::move(handle));
+    }
+
+    // `parent` is the open directory of the previous item, reused while items share it
+    void remove_item(size_t item, DirHandle& parent, string& parent_path) {
+        string target = trimmed(paths[item]);
+        fs::path split(target);
+        string name = split.filename().string();
+        string dir_path = base_fd >= 0 ? "" : split.parent_path().string();
+        if (name.empty() || name == "." || name == "..") {
+            fail("cannot remove", target, item, EINVAL);
+            return;
+        }
+        if (!parent || dir_path != parent_path) {
+            int fd = base_fd >= 0 ? dup(base_fd)
+                                  : open(dir_path.empty() ? "." : dir_path.c_str(), O_RDONLY | O_DIRECTORY | O_CLOEXEC);
+            parent = open_handle(fd);
+            parent_path = dir_path;
+            if (!parent) {
+                fail("cannot remove", target, item, errno);
+                return;
+            }
+        }
+        int parent_fd = dirfd(parent.get());
+        struct stat st;
+        if (fstatat(parent_fd, name.c_str(), &st, AT_SYMLINK_NOFOLLOW) != 0) {
+            fail("cannot remove", target, item, errno);
+            return;
+        }
+        if (!S_ISDIR(st.st_mode)) {
+            if (unlinkat(parent_fd, name.c_str(), 0) == 0) {
+                files_done++;
+            } else {
+                fail("cannot remove", target, item, errno);
+            }
+            return;
+        }
+        struct stat parent_st;
+        if (fstat(parent_fd, &parent_st) != 0) {
+            fail("cannot remove", target, item, errno);
+            return;
+        }
+        auto dir = std::make_shared<Directory>(name, nullptr, item, parent_st.st_dev, parent_st.st_ino);
+        pool->submit([this, handle = parent, dir]() mutable { clear_directory(dir, std::move(handle)); });
+    }
+#else
+    void remove_item(size_t item) {
+        std::error_code ec;
+        std::uintmax_t removed = fs::remove_all(paths[item], ec);
+        if (ec || removed == 0) {
+            fail("cannot remove", paths[item], item);
+        } else {
+            files_done += removed;
+        }
+    }
+#endif
+
+    void run() {
+        {
+            ThreadPool workers(std::max(thread_count, MIN_DELETE_THREADS));
+            pool = &workers;
+#ifndef _WIN32
+            DirHandle parent;
+            string parent_path;
+            for (size_t item = 0; item < paths.size() && !cancelled; item++) {
+                remove_item(item, parent, parent_path);
+            }
+            parent.reset();
+#else
+            for (size_t item = 0; item < paths.size() && !cancelled; item++) {
+                remove_item(item);
+            }
+#endif
+            workers.wait();
+            pool = nullptr;
+        }
+        for (const string& target : paths) {
+            invalidate_path(target);
+        }
+
+        std::lock_guard<std::mutex> lock(mtx);
+        stopped = std::chrono::steady_clock::now();
+        finished = true;
+    }
+
+public:
+    explicit DeleteJob(const vector<string>& targets, size_t threads = 0)
+        : paths(targets), thread_count(threads ? threads : ThreadPool::default_threads()),
+          item_errors(targets.size()) {}
+
+    // Removes entries of an already open directory and takes over its descriptor;
+    // `directory` only names them in results and messages
+    DeleteJob(int directory_fd, const string& directory, const vector<string>& names, size_t threads = 0)
+        : thread_count(threads ? threads : ThreadPool::default_threads()), base_fd(directory_fd),
+          item_errors(names.size()) {
+        for (const string& name : names) {
+            paths.push_back(directory + "/" + name);
+        }
+    }
+
+    ~DeleteJob() {
+        cancel();
+        wait();
+#ifndef _WIN32
+        if (base_fd >= 0) {
+            close(base_fd);
+        }
+#endif
+    }
+
+    DeleteJob(const DeleteJob&) = delete;
+    DeleteJob& operator=(const DeleteJob&) = delete;
+
+    void start() {
+        if (!coordinator.joinable()) {
+            started = std::chrono::steady_clock::now();
+            coordinator = std::thread([this] { run(); });
+        }
+    }
+
+    void cancel() {
+        cancelled = true;
+    }
+
+    void wait() {
+        if (coordinator.joinable()) {
+            coordinator.join();
+        }
+    }
+
+    bool is_done() const {
+        return finished;
+    }
+
+    bool succeeded() const {
+        return finished && !cancelled && error_total == 0;
+    }
+
+    size_t item_count() const {
+        return paths.size();
+    }
+
+    DeleteProgress progress() const {
+        std::lock_guard<std::mutex> lock(mtx);
+        auto now = finished ? stopped : std::chrono::steady_clock::now();
+        DeleteProgress p;
+        p.files_done = files_done;
+        p.directories_done = directories_done;
+        p.errors = error_total;
+        p.done = finished;
+        p.cancelled = cancelled;
+        p.seconds = std::chrono::duration<double>(now - started).count();
+        p.entries_per_second = p.seconds > 0 ? (p.files_done + p.directories_done) / p.seconds : 0;
+        return p;
+    }
+
+    vector<string> error_messages() const {
+        std::lock_guard<std::mutex> lock(mtx);
+        return messages;
+    }
+
+    vector<BatchResult> results() const {
+        std::lock_guard<std::mutex> lock(mtx);
+        vector<BatchResult> out;
+        out.reserve(paths.size());
+        for (size_t i = 0; i < paths.size(); i++) {
+            bool ok = finished && !cancelled && item_errors[i].empty();
+            string error = item_errors[i].empty() && cancelled ? "cancelled" : item_errors[i];
+            out.push_back(BatchResult{paths[i], "", ok, error});
+        }
+        return out;
+    }
+};
+
+// Blocking delete on the job engine, for callers that only need the outcome
+bool remove_path_recursive(const string& target_path) {
+    DeleteJob job({target_path});
+    job.start();
+    job.wait();
+    return job.succeeded();
+}
+
+#ifndef _WIN32
+// Opens a trash directory, creating it if asked, but only if it is a real directory
+// of ours that no one else can enter: in a shared directory another user could have
+// put anything at its name first. -1 otherwise.
+int open_trash(const string& trash, bool create) {
+    if (create && mkdir(trash.c_str(), 0700) != 0 && errno != EEXIST) {
+        return -1;
+    }
+    int fd = open(trash.c_str(), O_RDONLY | O_DIRECTORY | O_NOFOLLOW | O_CLOEXEC);
+    struct stat st;
+    if (fd >= 0 && (fstat(fd, &st) != 0 || !S_ISDIR(st.st_mode) || st.st_uid != getuid() ||
+                    (st.st_mode & 07777) != 0700)) {
+        close(fd);
+        return -1;
+    }
+    return fd;
+}
+
+void close_trash(int fd) {
+    close(fd);
+}
+
+vector<string> trash_entries(int fd) {
+    vector<string> names;
+    int listing_fd = dup(fd);
+    DIR* stream = listing_fd >= 0 ? fdopendir(listing_fd) : nullptr;
+    if (stream == nullptr) {
+        if (listing_fd >= 0) {
+            close(listing_fd);
+        }
+        return names;
+    }
+    while (dirent* entry = readdir(stream)) {
+        string name = entry->d_name;
+        if (name != "." && name != "..") {
+            names.push_back(name);
+        }
+    }
+    closedir(stream);
+    return names;
+}
+
+// 0 once `path` is renamed to `entry` in the open trash, or the errno
+int rename_into_trash(const string& path, int trash_fd, const string& entry) {
+    return renameat(AT_FDCWD, path.c_str(), trash_fd, entry.c_str()) == 0 ? 0 : errno;
+}
+#else
+int open_trash(const string&, bool) {
+    return -1;
+}
+
+void close_trash(int) {}
+
+vector<string> trash_entries(int) {
+    return {};
+}
+
+int rename_into_trash(const string&, int, const string&) {
+    return ENOSYS;
+}
+#endif
+
+// Empties trash directories one at a time on a background thread. Whatever is
+// left when the process exits is purged the next time that trash is used.
+class TrashPurger {
+private:
+    std::deque<string> queue;
+    std::unique_ptr<DeleteJob> current;
+    std::thread worker;
+    std::mutex mtx;
+    std::condition_variable changed;
+    bool stopping = false;
+
+    void run() {
+        std::unique_lock<std::mutex> lock(mtx);
+        while (true) {
+            changed.wait(lock, [this] { return stopping || !queue.empty(); });
+            if (stopping) {
+                return;
+            }
+            string trash = queue.front();
+            int fd = open_trash(trash, false);
+            if (fd >= 0) {
+                current = std::make_unique<DeleteJob>(fd, trash, trash_entries(fd), TRASH_PURGE_THREADS);
+                current->start();
+                lock.unlock();
+                current->wait();
+                lock.lock();
+                current.reset();
+            }
+            queue.pop_front();
+            changed.notify_all();
+        }
+    }
+
+public:
+    TrashPurger() = default;
+
+    ~TrashPurger() {
+        {
+            std::lock_guard<std::mutex> lock(mtx);
+            stopping = true;
+            if (current) {
+                current->cancel();
+            }
+        }
+        changed.notify_all();
+        if (worker.joinable()) {
+            worker.join();
+        }
+    }
+
+    void purge(const string& trash) {
+        std::lock_guard<std::mutex> lock(mtx);
+        // A purge already waiting will see the new entries too
+        if (std::find(queue.begin() + (queue.empty() ? 0 : 1), queue.end(), trash) != queue.end()) {
+            return;
+        }
+        queue.push_back(trash);
+        if (!worker.joinable()) {
+            worker = std::thread([this] { run(); });
+        }
+        changed.notify_all();
+    }
+
+    // True once nothing is queued or being purged; waits up to timeout_ms
+    bool wait_idle(int timeout_ms) {
+        std::unique_lock<std::mutex> lock(mtx);
+        return changed.wait_for(lock, std::chrono::milliseconds(timeout_ms), [this] { return queue.empty(); });
+    }
+};
+
+inline TrashPurger& trash_purger() {
+    static TrashPurger purger;
+    return purger;
+}
+
+#ifndef _WIN32
+// Trash for a path: in the topmost writable directory above it on the same device,
+// so moving the path there is a rename. "" if there is none.
+string trash_directory(const string& target) {
+    std::error_code ec;
+    fs::path parent = fs::absolute(fs::path(target), ec).lexically_normal().parent_path();
+    struct stat st;
+    if (ec || stat(parent.c_str(), &st) != 0) {
+        return "";
+    }
+    fs::path best;
+    for (fs::path dir = parent;; dir = dir.parent_path()) {
+        struct stat dir_st;
+        if (stat(dir.c_str(), &dir_st) != 0 || dir_st.st_dev != st.st_dev) {
+            break;
+        }
+        if (access(dir.c_str(), W_OK) == 0) {
+            best = dir;
+        }
+        if (dir == dir.root_path()) {
+            break;
+        }
+    }
+    if (best.empty()) {
+        return "";
+    }
+    return (best / (TRASH_PREFIX + std::to_string(getuid()))).string();
+}
+#else
+string trash_directory(const string&) {
+    return "";
+}
+#endif
+
+// Deletes by renaming each path into the trash on its filesystem, which takes one
+// rename whatever the size of the tree; the trash is emptied in the background.
+// Paths that cannot be renamed there are deleted in place. destination is the
+// path in the trash, or "" for paths deleted in place.
+vector<BatchResult> trash_paths(const vector<string>& paths, size_t threads = 0) {
+    static std::atomic<uint64_t> serial{0};
+    vector<BatchResult> results(paths.size());
+    vector<string> in_place;
+    vector<size_t> in_place_items;
+    vector<std::pair<string, int>> opened;  // each trash and its descriptor, -1 if unusable
+    vector<string> used_trash;
+    auto stamp = std::chrono::system_clock::now().time_since_epoch().count();
+
+    for (size_t i = 0; i < paths.size(); i++) {
+        BatchResult& result = results[i];
+        result.path = paths[i];
+        string trash = trash_directory(paths[i]);
+        int trash_fd = -1;
+        if (!trash.empty()) {
+            auto it = std::find_if(opened.begin(), opened.end(), [&](const auto& t) { return t.first == trash; });
+            if (it == opened.end()) {
+                opened.emplace_back(trash, open_trash(trash, true));
+                it = opened.end() - 1;
+            }
+            trash_fd = it->second;
+        }
+        if (trash_fd >= 0) {
+            fs::path name = fs::path(paths[i]).lexically_normal();
+            if (!name.has_filename()) {
+                name = name.parent_path();
+            }
+            string entry = std::to_string(stamp) + "-" + std::to_string(serial++) + "-" + name.filename().string();
+            int error = rename_into_trash(paths[i], trash_fd, entry);
+            if (error == 0) {
+                result.destination = trash + "/" + entry;
+                result.ok = true;
+                invalidate_path(paths[i]);
+                if (std::find(used_trash.begin(), used_trash.end(), trash) == used_trash.end()) {
+                    used_trash.push_back(trash);
+                }
+                continue;
+            }
+            if (error == ENOENT) {
+                result.error = "cannot remove: " + paths[i] + " (" + std::strerror(error) + ")";
+                continue;
+            }
+        }
+        in_place.push_back(paths[i]);
+        in_place_items.push_back(i);
+    }
+
+    for (const auto& t : opened) {
+        if (t.second >= 0) {
+            close_trash(t.second);
+        }
+    }
+    for (const string& trash : used_trash) {
+        trash_purger().purge(trash);
+    }
+    if (!in_place.empty()) {
+        DeleteJob job(in_place, threads);
+        job.start();
+        job.wait();
+        vector<BatchResult> removed = job.results();
+        for (size_t k = 0; k < in_place_items.size(); k++) {
+            results[in_place_items[k]] = removed[k];
+        }
+    }
+    return results;
+}
+
+bool wait_trash_purge(int timeout_ms) {
+    return trash_purger().wait_idle(timeout_ms);
+}
@@ -1,9 +1,23 @@
 #include "../include/file_node.h"
+#include "../include/directory_listing.h"
+#include "../include/directory_cache.h"
+#include "../include/scan_token.h"
+#include "../include/disk_usage_cache.h"
+#include "../include/perf_counters.h"
 #include <filesystem>
 #include <algorithm>
 #include <cctype>
 #include <system_error>
 #include <fstream>
+#include <chrono>
+#include <numeric>
+#include <unordered_map>
+
+#ifndef _WIN32
+#include <dirent.h>
+#include <fcntl.h>
+#include <sys/stat.h>
+#endif
 
 namespace fs = std::filesystem;
 using fs::path;
@@ -16,7 +30,7 @@ using std::unique_ptr;
 using std::shared_ptr;
 using std::make_shared;
 
-string to_lower(const string& s) {
+string to_lower(string_view s) {
     string result;
     result.reserve(s.size());
     for (unsigned char c : s) {
@@ -25,144 +39,584 @@ string to_lower(const string& s) {
     return result;
 }
 
-// Comparator function: directories first, then case-insensitive alphabetical
-bool compare_nodes(const shared_ptr<FileNode>& a, const shared_ptr<FileNode>& b) {
-    if (a->is_directory != b->is_directory) {
-        return a->is_directory && !b->is_directory;
+// Collation keys computed once per sort instead of once per comparison
+struct SortKeys {
+    const ListingData& data;
+    string lower;                // lowercase copy of the name arena
+    vector<uint32_t> ext_start;  // arena offset where each extension starts
+    SortKey key;
+    bool descending;
+
+    SortKeys(const ListingData& listing_data, SortKey sort_key, bool desc)
+        : data(listing_data), lower(to_lower(listing_data.names)), key(sort_key), descending(desc) {
+        if (key == SortKey::EXTENSION) {
+            ext_start.resize(data.rows());
+            for (uint32_t row = 0; row < data.rows(); row++) {
+                string_view name = data.row_name(row);
+                size_t dot = name.rfind('.');
+                // Dotfiles such as ".bashrc" have no extension
+                ext_start[row] = data.name_offsets[row] + ((dot == string_view::npos || dot == 0) ? name.size() : dot);
+            }
+        }
+    }
+
+    string_view lower_name(uint32_t row) const {
+        return string_view(lower).substr(data.name_offsets[row], data.name_offsets[row + 1] - data.name_offsets[row]);
+    }
+
+    string_view extension(uint32_t row) const {
+        return string_view(lower).substr(ext_start[row], data.name_offsets[row + 1] - ext_start[row]);
     }
-    return to_lower(a->name) < to_lower(b->name);
+};
+
+template <typename T>
+int three_way(const T& a, const T& b) {
+    return (a < b) ? -1 : (b < a) ? 1 : 0;
 }
 
-// Merges two sorted halves
-void merge(vector<shared_ptr<FileNode>>& arr, int left, int mid, int right) {
-    int n1 = mid - left + 1;
-    int n2 = right - mid;
+// Version-aware comparison: runs of digits compare by numeric value, so "file2" < "file10"
+int natural_compare(string_view a, string_view b) {
+    size_t i = 0;
+    size_t j = 0;
+
+    while (i < a.size() && j < b.size()) {
+        unsigned char ca = a[i];
+        unsigned char cb = b[j];
 
-    vector<shared_ptr<FileNode>> leftArr(n1);
-    vector<shared_ptr<FileNode>> rightArr(n2);
+        if (std::isdigit(ca) && std::isdigit(cb)) {
+            size_t si = i;
+            size_t sj = j;
+            while (si < a.size() && a[si] == '0') si++;
+            while (sj < b.size() && b[sj] == '0') sj++;
 
-    for (int i = 0; i < n1; i++) {
-        leftArr[i] = arr[left + i];
+            size_t ei = si;
+            size_t ej = sj;
+            while (ei < a.size() && std::isdigit(static_cast<unsigned char>(a[ei]))) ei++;
+            while (ej < b.size() && std::isdigit(static_cast<unsigned char>(b[ej]))) ej++;
+
+            // More significant digits means a larger number
+            if (ei - si != ej - sj) {
+                return (ei - si < ej - sj) ? -1 : 1;
+            }
+            int digits = a.substr(si, ei - si).compare(b.substr(sj, ej - sj));
+            if (digits != 0) {
+                return digits < 0 ? -1 : 1;
+            }
+            // Same value: fewer leading zeros first ("1" before "01")
+            if (si - i != sj - j) {
+                return (si - i < sj - j) ? -1 : 1;
+            }
+            i = ei;
+            j = ej;
+        } else {
+            if (ca != cb) {
+                return ca < cb ? -1 : 1;
+            }
+            i++;
+            j++;
+        }
     }
-    for (int j = 0; j < n2; j++) {
-        rightArr[j] = arr[mid + 1 + j];
+
+    return three_way(a.size() - i, b.size() - j);
+}
+
+// Comparator function: directories first, then the sort key, then natural name order
+int compare_nodes(const SortKeys& keys, uint32_t a, uint32_t b) {
+    bool a_dir = keys.data.row_is_directory(a);
+    bool b_dir = keys.data.row_is_directory(b);
+    if (a_dir != b_dir) {
+        return a_dir ? -1 : 1;
     }
 
-    int i = 0;    
-    int j = 0;    
-    int k = left;
+    int result = 0;
+    switch (keys.key) {
+        case SortKey::SIZE:
+            result = three_way(keys.data.sizes[a], keys.data.sizes[b]);
+            break;
+        case SortKey::MTIME:
+            result = three_way(keys.data.mtimes[a], keys.data.mtimes[b]);
+            break;
+        case SortKey::EXTENSION:
+            result = three_way(keys.extension(a), keys.extension(b));
+            break;
+        case SortKey::NAME:
+            break;
+    }
 
-    while (i < n1 && j < n2) {
-        if (compare_nodes(leftArr[i], rightArr[j])) {
-            arr[k] = leftArr[i];
-            i++;
+    if (result == 0) {
+        result = natural_compare(keys.lower_name(a), keys.lower_name(b));
+    }
+    if (result == 0) {
+        // Names that differ only in case
+        result = three_way(keys.data.row_name(a), keys.data.row_name(b));
+    }
+    return keys.descending ? -result : result;
+}
+
+// Merges two sorted halves through the scratch buffer shared by the whole sort
+void merge(const SortKeys& keys, vector<uint32_t>& arr, vector<uint32_t>& scratch,
+           size_t left, size_t mid, size_t right) {
+    std::copy(arr.begin() + left, arr.begin() + right + 1, scratch.begin() + left);
+
+    size_t i = left;
+    size_t j = mid + 1;
+    size_t k = left;
+
+    // Take from the right half only when strictly smaller, which keeps the sort stable
+    while (i <= mid && j <= right) {
+        if (compare_nodes(keys, scratch[j], scratch[i]) < 0) {
+            arr[k++] = scratch[j++];
         } else {
-            arr[k] = rightArr[j];
-            j++;
+            arr[k++] = scratch[i++];
         }
-        k++;
     }
 
-    while (i < n1) {
-        arr[k] = leftArr[i];
-        i++;
-        k++;
+    while (i <= mid) {
+        arr[k++] = scratch[i++];
     }
 
-    while (j < n2) {
-        arr[k] = rightArr[j];
-        j++;
-        k++;
+    while (j <= right) {
+        arr[k++] = scratch[j++];
     }
 }
 
 // Merge Sort function
-void merge_sort(vector<shared_ptr<FileNode>>& arr, int left, int right) {
+void merge_sort(const SortKeys& keys, vector<uint32_t>& arr, vector<uint32_t>& scratch,
+                size_t left, size_t right) {
     if (left < right) {
-        int mid = left + (right - left) / 2;
+        size_t mid = left + (right - left) / 2;
 
         // Recursively sort first and second halves
-        merge_sort(arr, left, mid);
-        merge_sort(arr, mid + 1, right);
+        merge_sort(keys, arr, scratch, left, mid);
+        merge_sort(keys, arr, scratch, mid + 1, right);
 
         // Merge the sorted halves
-        merge(arr, left, mid, right);
+        merge(keys, arr, scratch, left, mid, right);
     }
 }
 
-// Wrapper function to call merge sort
-void sort_file_nodes(vector<shared_ptr<FileNode>>& nodes) {
-    if (nodes.size() > 1) {
-        merge_sort(nodes, 0, nodes.size() - 1);
+// Wrapper function to call merge sort on the display order of a listing
+void sort_listing(DirectoryListing& listing, SortKey key, bool descending) {
+    PerfCounters& perf = perf_counters();
+    PerfTimer timer(perf.sort_ns);
+    perf.add(perf.sorts, 1);
+    perf.add(perf.entries_sorted, listing.order.size());
+    listing.sort_key = key;
+    listing.descending = descending;
+    if (listing.order.size() > 1) {
+        SortKeys keys(*listing.data, key, descending);
+        vector<uint32_t> scratch(listing.order.size());
+        merge_sort(keys, listing.order, scratch, 0, listing.order.size() - 1);
     }
 }
 
+// Re-sorts an existing listing by another key; the entries are shared, not re-read
+shared_ptr<DirectoryListing> sorted_listing(const DirectoryListing& listing, SortKey key, bool descending) {
+    auto result = make_shared<DirectoryListing>(listing);
+    sort_listing(*result, key, descending);
+    return result;
+}
+
+// file_time_type has no portable epoch in C++17, so convert through the system clock
+int64_t to_unix_nanoseconds(fs::file_time_type t) {
+    auto system_time = std::chrono::system_clock::now() + (t - fs::file_time_type::clock::now());
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(system_time.time_since_epoch()).count();
+}
+
+#ifndef _WIN32
+int64_t stat_mtime_ns(const struct stat& st) {
+#ifdef __APPLE__
+    return static_cast<int64_t>(st.st_mtimespec.tv_sec) * 1000000000 + st.st_mtimespec.tv_nsec;
+#else
+    return static_cast<int64_t>(st.st_mtim.tv_sec) * 1000000000 + st.st_mtim.tv_nsec;
+#endif
+}
+#endif
+
+struct EntryStat {
+    uint8_t flags = 0;
+    uint64_t size = 0;
+    int64_t mtime = 0;
+    uint64_t inode = 0;
+};
+
+// Every listed attribute from one lstat (plus a stat for symlinks) instead of a
+// std::filesystem query per attribute. Symlinks report their target's type, size
+// and mtime, and their own inode.
+EntryStat stat_entry(const fs::directory_entry& entry) {
+    EntryStat result;
+#ifndef _WIN32
+    struct stat st;
+    if (lstat(entry.path().c_str(), &st) != 0) {
+        return result;
+    }
+    result.inode = static_cast<uint64_t>(st.st_ino);
+    if (S_ISLNK(st.st_mode)) {
+        result.flags |= ENTRY_SYMLINK;
+        struct stat target;
+        if (stat(entry.path().c_str(), &target) == 0) {
+            st = target;
+        }
+    }
+    if (S_ISDIR(st.st_mode)) result.flags |= ENTRY_DIRECTORY;
+    if (S_ISREG(st.st_mode)) {
+        result.flags |= ENTRY_REGULAR;
+        result.size = static_cast<uint64_t>(st.st_size);
+    }
+    result.mtime = stat_mtime_ns(st);
+#else
+    std::error_code ec;
+    if (entry.is_directory(ec)) result.flags |= ENTRY_DIRECTORY;
+    if (entry.is_regular_file(ec)) result.flags |= ENTRY_REGULAR;
+    if (entry.is_symlink(ec)) result.flags |= ENTRY_SYMLINK;
+    if (result.flags & ENTRY_REGULAR) {
+        result.size = entry.file_size(ec);
+        if (ec) result.size = 0;
+    }
+    auto mtime = entry.last_write_time(ec);
+    result.mtime = ec ? 0 : to_unix_nanoseconds(mtime);
+#endif
+    return result;
+}
+
+// Files opened per listing to sniff their kind; past it, entries the extension does
+// not settle stay UNKNOWN so a huge directory is not read file by file
+constexpr size_t KIND_SNIFF_BUDGET = 4096;
+
+// Classifies a freshly read listing in one pass: the extension settles most entries,
+// the rest come from the inode+mtime cache or a sniff of their first block
+void classify_listing(DirectoryListing& listing, const shared_ptr<ScanToken>& token = nullptr) {
+    ListingData& data = *listing.data;
+    FileKindCache& cache = file_kind_cache();
+    PerfCounters& perf = perf_counters();
+    size_t budget = KIND_SNIFF_BUDGET;
+    for (uint32_t row = 0; row < data.rows(); row++) {
+        if (token && token->is_cancelled()) {
+            return;
+        }
+        FileKind kind = FileKind::UNKNOWN;
+        if (data.flags[row] & ENTRY_DIRECTORY) {
+            kind = FileKind::DIRECTORY;
+        } else if (!(data.flags[row] & ENTRY_REGULAR)) {
+            // Devices, sockets and dangling links are never opened
+        } else if (data.mode == ListingMode::FAST) {
+            // No sizes and no extra opens: the extension is all there is
+            kind = kind_from_extension(to_lower(name_extension(data.row_name(row))));
+        } else if (data.sizes[row] == 0) {
+            kind = FileKind::EMPTY;
+        } else {
+            string_view name = data.row_name(row);
+            kind = kind_from_extension(to_lower(name_extension(name)));
+            uint64_t inode = data.inodes[row];
+            bool cached = kind == FileKind::UNKNOWN && inode && cache.lookup(inode, data.mtimes[row], kind);
+            if (cached) {
+                perf.add(perf.kind_cache_hits, 1);
+            } else if (kind == FileKind::UNKNOWN && budget > 0) {
+                budget--;
+                data.syscalls += 3;  // open, pread, close
+                perf.add(perf.kind_sniffs, 1);
+                kind = sniff_file_kind((path(listing.path) / path(string(name))).string());
+                if (inode && kind != FileKind::UNKNOWN) {
+                    cache.store(inode, data.mtimes[row], kind);
+                }
+            }
+        }
+        data.kinds[row] = static_cast<uint8_t>(kind);
+    }
+}
+
+#ifndef _WIN32
+void add_stat(ListingData& data, const string& name, const struct stat& st, uint8_t flags, ListingMode mode) {
+    if (S_ISDIR(st.st_mode)) flags |= ENTRY_DIRECTORY;
+    if (S_ISREG(st.st_mode)) flags |= ENTRY_REGULAR;
+    if (mode == ListingMode::FAST) {
+        data.add(name, flags, 0, 0, static_cast<uint64_t>(st.st_ino));
+        return;
+    }
+    uint64_t size = (flags & ENTRY_REGULAR) ? static_cast<uint64_t>(st.st_size) : 0;
+    data.add(name, flags, size, stat_mtime_ns(st), static_cast<uint64_t>(st.st_ino));
+}
+
+// Reads a directory with readdir and, per entry, at most one fstatat relative to the open
+// directory (no path walk per entry). Symlinks take one more call to follow them, and in
+// FULL mode one to read their target. FAST trusts d_type and stats only the entries it
+// cannot type (DT_UNKNOWN) or that are symlinks. Returns false if cancelled midway.
+bool read_directory(DIR* dir, ListingData& data, ListingMode mode,
+                    const shared_ptr<ScanToken>& token) {
+    int fd = dirfd(dir);
+    while (dirent* ent = readdir(dir)) {
+        if (token && token->is_cancelled()) {
+            return false;
+        }
+        const char* name = ent->d_name;
+        if (name[0] == '.' && (name[1] == 0 || (name[1] == '.' && name[2] == 0))) {
+            continue;
+        }
+
+        unsigned char type = ent->d_type;
+        if (mode == ListingMode::FAST && type != DT_UNKNOWN && type != DT_LNK) {
+            uint8_t flags = type == DT_DIR ? ENTRY_DIRECTORY : type == DT_REG ? ENTRY_REGULAR : 0;
+            data.add(name, flags, 0, 0, static_cast<uint64_t>(ent->d_ino));
+            continue;
+        }
 
-shared_ptr<FileNode> list_directory(const string& dir_path) {
-    auto node = make_shared<FileNode>();
-    node->name = path(dir_path).filename().string();
-    node->path = dir_path;
-    node->is_directory = is_directory(dir_path);
-    node->size = 0;
+        struct stat st;
+        if (mode == ListingMode::FAST && type == DT_LNK) {
+            // Only the target's type is wanted
+            data.syscalls++;
+            if (fstatat(fd, name, &st, 0) == 0) {
+                st.st_ino = ent->d_ino;
+                add_stat(data, name, st, ENTRY_SYMLINK, mode);
+            } else {
+                data.add(name, ENTRY_SYMLINK, 0, 0, static_cast<uint64_t>(ent->d_ino));
+            }
+            continue;
+        }
 
-    if (node->is_directory) {
-        for (const auto& entry : directory_iterator(dir_path)) {
-            auto child_node = make_shared<FileNode>();
-            child_node->name = entry.path().filename().string();
-            child_node->path = entry.path().string();
-            child_node->is_directory = is_directory(entry.path());
+        data.syscalls++;
+        if (fstatat(fd, name, &st, AT_SYMLINK_NOFOLLOW) != 0) {
+            // Vanished since readdir, or not stat-able: list it by name only
+            data.add(name, type == DT_DIR ? ENTRY_DIRECTORY : 0, 0, 0, static_cast<uint64_t>(ent->d_ino));
+            if (mode == ListingMode::FULL) data.add_details(0, 0, 0);
+            continue;
+        }
 
-             // Safely get file size
-            try {
-                child_node->size = (entry.is_regular_file()) ? entry.file_size() : 0;
-            } catch (...) {
-                child_node->size = 0;
+        uint8_t flags = 0;
+        struct stat own = st;
+        if (S_ISLNK(st.st_mode)) {
+            flags |= ENTRY_SYMLINK;
+            if (mode == ListingMode::FULL) {
+                char target[4096];
+                data.syscalls++;
+                ssize_t n = readlinkat(fd, name, target, sizeof(target));
+                if (n >= 0) {
+                    data.link_targets.emplace(static_cast<uint32_t>(data.rows()), string(target, static_cast<size_t>(n)));
+                }
+            }
+            // Symlinks report their target's type, size and mtime, and their own inode
+            struct stat followed;
+            data.syscalls++;
+            if (fstatat(fd, name, &followed, 0) == 0) {
+                followed.st_ino = st.st_ino;
+                st = followed;
             }
+        }
+        add_stat(data, name, st, flags, mode);
+        if (mode == ListingMode::FULL) {
+            data.add_details(static_cast<uint32_t>(own.st_mode), static_cast<uint32_t>(own.st_uid),
+                             static_cast<uint32_t>(own.st_gid));
+        }
+    }
+    return true;
+}
+#endif
+
+// Stops early (returning a partial, unsorted listing) once the token is cancelled
+shared_ptr<DirectoryListing> list_directory(const string& dir_path, const shared_ptr<ScanToken>& token = nullptr,
+                                            SortKey sort_key = SortKey::NAME, bool descending = false,
+                                            ListingMode mode = ListingMode::STANDARD) {
+    PerfCounters& perf = perf_counters();
+    PerfTimer timer(perf.listing_ns);
+    auto listing = make_shared<DirectoryListing>();
+    listing->path = dir_path;
+    ListingData& data = *listing->data;
+    data.mode = mode;
+    // Counted on every return path, once the listing is final
+    struct CountListing {
+        PerfCounters& perf;
+        const ListingData& data;
+        ~CountListing() {
+            perf.add(perf.listings, 1);
+            perf.add(perf.entries_listed, data.rows());
+            perf.add(perf.listing_syscalls, data.syscalls);
+        }
+    } count_listing{perf, data};
+
+#ifndef _WIN32
+    data.syscalls++;
+    DIR* dir = opendir(dir_path.c_str());
+    if (!dir) {
+        // Missing paths and files list as empty non-directories; anything else is an error
+        if (errno == ENOENT || errno == ENOTDIR) {
+            return listing;
+        }
+        throw fs::filesystem_error("list_directory", dir_path, std::error_code(errno, std::generic_category()));
+    }
+    listing->is_directory = true;
+    bool complete = read_directory(dir, data, mode, token);
+    data.syscalls++;
+    closedir(dir);
+    if (!complete) {
+        listing->order.resize(listing->rows());
+        std::iota(listing->order.begin(), listing->order.end(), 0);
+        return listing;
+    }
+#else
+    listing->is_directory = is_directory(dir_path);
+    if (!listing->is_directory) {
+        return listing;
+    }
+    for (const auto& entry : directory_iterator(dir_path)) {
+        if (token && token->is_cancelled()) {
+            listing->order.resize(listing->rows());
+            std::iota(listing->order.begin(), listing->order.end(), 0);
+            return listing;
+        }
 
-            node->children.push_back(child_node);
+        EntryStat st = stat_entry(entry);
+        data.syscalls++;
+        data.add(entry.path().filename().string(), st.flags, st.size, st.mtime, st.inode);
+        if (mode == ListingMode::FULL) {
+            std::error_code ec;
+            auto perms = entry.symlink_status(ec).permissions();
+            data.add_details(ec ? 0 : static_cast<uint32_t>(perms), 0, 0);
         }
-        
-        sort_file_nodes(node->children);
     }
+#endif
 
-    return node;
+    data.shrink_to_fit();
+    classify_listing(*listing, token);
+    listing->order.resize(listing->rows());
+    std::iota(listing->order.begin(), listing->order.end(), 0);
+    sort_listing(*listing, sort_key, descending);
+    return listing;
 }
 
+// What changed between two listings of one directory, so the UI can patch rather than
+// rebuild its rows. An entry whose name now refers to another inode counts as removed
+// and added; so does a changed entry when the change may have moved it in the order.
+ListingDiff diff_listings(const DirectoryListing& old_listing, const DirectoryListing& new_listing) {
+    ListingDiff diff;
+    if (old_listing.path != new_listing.path || old_listing.sort_key != new_listing.sort_key ||
+        old_listing.descending != new_listing.descending || old_listing.data->mode != new_listing.data->mode) {
+        diff.comparable = false;
+        return diff;
+    }
+    if (old_listing.data == new_listing.data && old_listing.order == new_listing.order) {
+        return diff;
+    }
 
+    std::unordered_map<string_view, uint32_t> old_positions;
+    old_positions.reserve(old_listing.size());
+    for (uint32_t i = 0; i < old_listing.size(); i++) {
+        old_positions.emplace(old_listing.name(i), i);
+    }
 
+    const ListingData& old_data = *old_listing.data;
+    const ListingData& new_data = *new_listing.data;
+    bool order_by_attributes = new_listing.sort_key == SortKey::SIZE || new_listing.sort_key == SortKey::MTIME;
+    vector<bool> kept(old_listing.size(), false);
 
-bool make_directory_recursive(const string& dir_path) {
-    try {
-        return std::filesystem::create_directories(dir_path);
-    } catch (const std::filesystem::filesystem_error&) {
-        return false;
+    for (uint32_t j = 0; j < new_listing.size(); j++) {
+        auto it = old_positions.find(new_listing.name(j));
+        uint32_t new_row = new_listing.order[j];
+        uint32_t old_row = it == old_positions.end() ? 0 : old_listing.order[it->second];
+        if (it == old_positions.end() || old_data.inodes[old_row] != new_data.inodes[new_row]) {
+            diff.added.push_back(j);
+            continue;
+        }
+
+        bool same_flags = old_data.flags[old_row] == new_data.flags[new_row];
+        bool same = same_flags && old_data.sizes[old_row] == new_data.sizes[new_row] &&
+                    old_data.mtimes[old_row] == new_data.mtimes[new_row];
+        if (!same && (order_by_attributes || !same_flags)) {
+            diff.added.push_back(j);
+            continue;
+        }
+        kept[it->second] = true;
+        if (!same) {
+            diff.changed.push_back(j);
+        }
     }
+
+    for (uint32_t i = 0; i < old_listing.size(); i++) {
+        if (!kept[i]) {
+            diff.removed.push_back(i);
+        }
+    }
+    return diff;
 }
 
-bool remove_path_recursive(const string& target_path) {
-    try {
-        std::error_code ec;
-        std::uintmax_t removed = std::filesystem::remove_all(target_path, ec);
-        return ec ? false : (removed > 0);
-    } catch (...) {
-        return false;
+DirectoryCache& directory_cache() {
+    static DirectoryCache cache;
+    return cache;
+}
+
+// Same as list_directory, but reuses the cached listing while the directory mtime is unchanged
+// A cached listing read in a richer mode also serves cheaper requests
+shared_ptr<DirectoryListing> list_directory_cached(const string& dir_path, const shared_ptr<ScanToken>& token = nullptr,
+                                                   SortKey sort_key = SortKey::NAME, bool descending = false,
+                                                   ListingMode mode = ListingMode::STANDARD) {
+    string key = DirectoryCache::normalize(dir_path);
+    std::error_code ec;
+    auto mtime = fs::last_write_time(key, ec);
+    if (ec) {
+        directory_cache().invalidate(key);
+        return list_directory(dir_path, token, sort_key, descending, mode);
+    }
+
+    auto cached = directory_cache().get(key, mtime);
+    if (cached && cached->data->mode >= mode) {
+        if (cached->sort_key != sort_key || cached->descending != descending) {
+            // A different order only needs a re-sort of the cached entries
+            cached = sorted_listing(*cached, sort_key, descending);
+            directory_cache().replace(key, cached);
+        }
+        return cached;
     }
+
+    auto scanned_at = fs::file_time_type::clock::now();
+    auto listing = list_directory(dir_path, token, sort_key, descending, mode);
+    if (listing->is_directory && !(token && token->is_cancelled())) {
+        directory_cache().put(key, listing, mtime, scanned_at);
+    }
+    return listing;
 }
 
-bool rename_path(const string& oldp, const string& newp) {
+void invalidate_directory(const string& dir_path) {
+    directory_cache().invalidate(DirectoryCache::normalize(dir_path));
+}
+
+// Drops the cached listings of a changed path and of the directory containing it
+void invalidate_path(const string& target_path) {
+    string key = DirectoryCache::normalize(target_path);
+    directory_cache().invalidate_tree(key);
+    directory_cache().invalidate(path(key).parent_path().string());
+    disk_usage_cache().invalidate_ancestors(key);
+}
+
+void clear_directory_cache() {
+    directory_cache().clear();
+}
+
+void set_directory_cache_capacity(size_t max_directories, size_t max_entries) {
+    directory_cache().set_capacity(max_directories, max_entries);
+}
+
+CacheStats directory_cache_stats() {
+    return directory_cache().get_stats();
+}
+
+
+bool make_directory_recursive(const string& dir_path) {
     try {
-        std::error_code ec;
-        std::filesystem::rename(oldp, newp, ec);
-        return !ec;
-    } catch (...) {
+        bool created = std::filesystem::create_directories(dir_path);
+        // Every newly created level changes the listing of the one above it
+        for (path p = path(dir_path).lexically_normal(); p.has_relative_path(); p = p.parent_path()) {
+            invalidate_directory(p.parent_path().string());
+        }
+        return created;
+    } catch (const std::filesystem::filesystem_error&) {
         return false;
     }
 }
 
-bool copy_path(const string& src, const string& dest) {
+bool rename_path(const string& oldp, const string& newp) {
     try {
         std::error_code ec;
-        std::filesystem::copy(src, dest, std::filesystem::copy_options::recursive | std::filesystem::copy_options::overwrite_existing, ec);
+        std::filesystem::rename(oldp, newp, ec);
+        invalidate_path(oldp);
+        invalidate_path(newp);
         return !ec;
     } catch (...) {
         return false;
@@ -172,6 +626,7 @@ bool copy_path(const string& src, const string& dest) {
 bool touch_file(const string& file_path) {
     try {
         std::ofstream ofs(file_path, std::ios::app);
+        invalidate_path(file_path);
         return ofs.good();
     } catch (...) {
         return false;
@@ -0,0 +1,356 @@
+#include "../include/directory_cache.h"
+#include "../include/disk_usage_cache.h"
+#include "../include/thread_pool.h"
+#include <algorithm>
+#include <atomic>
+#include <filesystem>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <unordered_set>
+#include <vector>
+
+#ifndef _WIN32
+#include <dirent.h>
+#include <fcntl.h>
+#include <sys/stat.h>
+#endif
+
+namespace fs = std::filesystem;
+using std::string;
+using std::vector;
+using std::unique_ptr;
+
+struct UsageEntry {
+    string name;
+    string path;
+    bool is_directory = false;
+    uint64_t bytes = 0;
+    uint64_t files = 0;
+    bool complete = false;
+};
+
+// du-style walker: sizes every top-level child of a directory in parallel and
+// can be polled for partial totals while it runs
+class DiskUsageScanner {
+private:
+    struct Child {
+        string name;
+        string path;
+        bool is_directory = false;
+        std::atomic<uint64_t> bytes{0};
+        std::atomic<uint64_t> files{0};
+        std::atomic<size_t> pending{0};  // directory tasks still running in this subtree
+        std::atomic<bool> complete{false};
+    };
+
+    struct InodeHash {
+        size_t operator()(const std::pair<uint64_t, uint64_t>& key) const {
+            return std::hash<uint64_t>()(key.first * 1000003u ^ key.second);
+        }
+    };
+
+    string root;
+    size_t thread_count;
+    vector<unique_ptr<Child>> children;
+    mutable std::mutex children_mtx;
+    std::thread coordinator;
+    std::atomic<bool> cancelled{false};
+    std::atomic<bool> finished{false};
+    std::atomic<uint64_t> errors{0};
+    std::atomic<uint64_t> reused{0};
+    uint64_t root_device = 0;
+
+    // Files with several hard links are counted once
+    std::unordered_set<std::pair<uint64_t, uint64_t>, InodeHash> seen_links;
+    std::mutex links_mtx;
+
+    void finish_task(Child& child) {
+        if (child.pending.fetch_sub(1) == 1 && !cancelled) {
+            child.complete = true;
+        }
+    }
+
+#ifndef _WIN32
+    static LinkedFile linked_file(const struct stat& st) {
+        return LinkedFile{static_cast<uint64_t>(st.st_dev), static_cast<uint64_t>(st.st_ino),
+                          static_cast<uint64_t>(st.st_blocks) * 512};
+    }
+
+    // Files with several hard links are counted at their first link only
+    bool count_linked(Child& child, const LinkedFile& file) {
+        std::lock_guard<std::mutex> lock(links_mtx);
+        if (!seen_links.insert({file.device, file.inode}).second) {
+            return false;
+        }
+        child.bytes += file.bytes;
+        child.files++;
+        return true;
+    }
+
+    void visit(ThreadPool& pool, Child& child, const string& dir, const struct stat& st) {
+        // Stay on the filesystem we started on
+        if (static_cast<uint64_t>(st.st_dev) != root_device) {
+            return;
+        }
+        child.pending++;
+        pool.submit([this, &pool, &child, dir, st] { walk(pool, child, dir, st); });
+    }
+
+    // Unchanged since it was last read: its files are not stat'ed again, but every
+    // subdirectory is still checked against its own mtime
+    void reuse(ThreadPool& pool, Child& child, const string& dir, const DirectoryUsage& usage) {
+        child.bytes += usage.bytes;
+        child.files += usage.files;
+        reused += usage.files;
+        for (const LinkedFile& file : usage.links) {
+            if (count_linked(child, file)) {
+                reused++;
+            }
+        }
+        for (const string& name : usage.subdirectories) {
+            if (cancelled) {
+                break;
+            }
+            string path = dir + "/" + name;
+            struct stat st;
+            if (lstat(path.c_str(), &st) != 0) {
+                errors++;
+            } else if (S_ISDIR(st.st_mode)) {
+                visit(pool, child, path, st);
+            }
+        }
+    }
+
+    void read(ThreadPool& pool, Child& child, const string& dir, const struct stat& dir_st) {
+        DIR* handle = cancelled ? nullptr : opendir(dir.c_str());
+        if (!handle) {
+            if (!cancelled) {
+                errors++;
+            }
+            return;
+        }
+        DirectoryUsage usage;
+        usage.mtime = stat_mtime_ns(dir_st);
+        bool complete = true;
+        int fd = dirfd(handle);
+        while (dirent* entry = readdir(handle)) {
+            if (cancelled) {
+                complete = false;
+                break;
+            }
+            string name = entry->d_name;
+            if (name == "." || name == "..") {
+                continue;
+            }
+
+            struct stat st;
+            if (fstatat(fd, entry->d_name, &st, AT_SYMLINK_NOFOLLOW) != 0) {
+                errors++;
+                complete = false;
+                continue;
+            }
+
+            if (S_ISDIR(st.st_mode)) {
+                usage.subdirectories.push_back(name);
+                visit(pool, child, dir + "/" + name, st);
+            } else if (st.st_nlink > 1) {
+                usage.links.push_back(linked_file(st));
+                count_linked(child, usage.links.back());
+            } else {
+                uint64_t bytes = static_cast<uint64_t>(st.st_blocks) * 512;
+                usage.bytes += bytes;
+                usage.files++;
+                child.bytes += bytes;
+                child.files++;
+            }
+        }
+        closedir(handle);
+        if (complete) {
+            disk_usage_cache().store(dir, std::move(usage));
+        }
+    }
+
+    void walk(ThreadPool& pool, Child& child, const string& dir, const struct stat& dir_st) {
+        // A directory's own blocks change with its own mtime, so they are counted here, fresh
+        child.bytes += static_cast<uint64_t>(dir_st.st_blocks) * 512;
+        DirectoryUsage usage;
+        if (disk_usage_cache().lookup(dir, stat_mtime_ns(dir_st), usage)) {
+            reuse(pool, child, dir, usage);
+        } else {
+            read(pool, child, dir, dir_st);
+        }
+        finish_task(child);
+    }
+#else
+    // No inode or device numbers through std::filesystem: walk each child serially
+    void walk(ThreadPool&, Child& child, const string& dir) {
+        std::error_code ec;
+        for (fs::recursive_directory_iterator it(dir, fs::directory_options::skip_permission_denied, ec), end;
+             !cancelled && !ec && it != end; it.increment(ec)) {
+            if (it->is_regular_file(ec)) {
+                child.bytes += it->file_size(ec);
+                child.files++;
+            }
+        }
+        if (ec) {
+            errors++;
+        }
+        finish_task(child);
+    }
+#endif
+
+    void run() {
+        ThreadPool pool(thread_count);
+        std::error_code list_ec;
+
+#ifndef _WIN32
+        struct stat root_st;
+        if (stat(root.c_str(), &root_st) != 0) {
+            errors++;
+            finished = true;
+            return;
+        }
+        root_device = static_cast<uint64_t>(root_st.st_dev);
+#endif
+
+        for (const auto& entry : fs::directory_iterator(root, fs::directory_options::skip_permission_denied, list_ec)) {
+            if (cancelled) {
+                break;
+            }
+
+            std::error_code ec;
+            auto child = std::make_unique<Child>();
+            child->name = entry.path().filename().string();
+            child->path = DirectoryCache::normalize(entry.path().string());
+            child->is_directory = entry.is_directory(ec) && !entry.is_symlink(ec);
+            child->pending = 1;
+
+#ifndef _WIN32
+            struct stat st;
+            if (lstat(child->path.c_str(), &st) != 0) {
+                errors++;
+                continue;
+            }
+#endif
+
+            Child& ref = *child;
+            {
+                std::lock_guard<std::mutex> lock(children_mtx);
+                children.push_back(std::move(child));
+            }
+
+            if (!ref.is_directory) {
+#ifndef _WIN32
+                if (st.st_nlink > 1) {
+                    count_linked(ref, linked_file(st));
+                } else {
+                    ref.bytes = static_cast<uint64_t>(st.st_blocks) * 512;
+                    ref.files = 1;
+                }
+#else
+                ref.bytes = entry.is_regular_file(ec) ? entry.file_size(ec) : 0;
+                ref.files = 1;
+#endif
+                ref.pending = 0;
+                ref.complete = true;
+            } else {
+#ifndef _WIN32
+                if (static_cast<uint64_t>(st.st_dev) != root_device) {
+                    ref.pending = 0;
+                    ref.complete = true;
+                    continue;
+                }
+                pool.submit([this, &pool, &ref, st] { walk(pool, ref, ref.path, st); });
+#else
+                pool.submit([this, &pool, &ref] { walk(pool, ref, ref.path); });
+#endif
+            }
+        }
+
+        if (list_ec) {
+            errors++;
+        }
+        pool.wait();
+        finished = true;
+    }
+
+public:
+    DiskUsageScanner(const string& path, size_t threads = 0)
+        : root(DirectoryCache::normalize(path)), thread_count(threads) {}
+
+    ~DiskUsageScanner() {
+        cancel();
+        wait();
+    }
+
+    void start() {
+        if (!coordinator.joinable()) {
+            coordinator = std::thread([this] { run(); });
+        }
+    }
+
+    void cancel() {
+        cancelled = true;
+    }
+
+    void wait() {
+        if (coordinator.joinable()) {
+            coordinator.join();
+        }
+    }
+
+    bool is_done() const {
+        return finished;
+    }
+
+    bool is_cancelled() const {
+        return cancelled;
+    }
+
+    uint64_t error_count() const {
+        return errors;
+    }
+
+    // Files counted from directories unchanged since an earlier scan, without a new stat;
+    // a file rewritten in place keeps its directory's mtime, so these sizes may be behind
+    uint64_t reused_files() const {
+        return reused;
+    }
+
+    // Partial totals of every child so far, largest first
+    vector<UsageEntry> snapshot() const {
+        vector<UsageEntry> result;
+        {
+            std::lock_guard<std::mutex> lock(children_mtx);
+            result.reserve(children.size());
+            for (const auto& child : children) {
+                result.push_back(UsageEntry{child->name, child->path, child->is_directory,
+                                            child->bytes, child->files, child->complete});
+            }
+        }
+        std::sort(result.begin(), result.end(), [](const UsageEntry& a, const UsageEntry& b) {
+            return a.bytes > b.bytes;
+        });
+        return result;
+    }
+
+    uint64_t total_bytes() const {
+        std::lock_guard<std::mutex> lock(children_mtx);
+        uint64_t total = 0;
+        for (const auto& child : children) {
+            total += child->bytes;
+        }
+        return total;
+    }
+
+    uint64_t total_files() const {
+        std::lock_guard<std::mutex> lock(children_mtx);
+        uint64_t total = 0;
+        for (const auto& child : children) {
+            total += child->files;
+        }
+        return total;
+    }
+};
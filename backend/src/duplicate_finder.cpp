@@ -0,0 +1,452 @@
+#include "../include/directory_cache.h"
+#include "../include/file_hash.h"
+#include "../include/thread_pool.h"
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <cstdio>
+#include <filesystem>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <unordered_set>
+#include <vector>
+
+#ifndef _WIN32
+#include <dirent.h>
+#include <fcntl.h>
+#include <sys/stat.h>
+#endif
+
+namespace fs = std::filesystem;
+using std::string;
+using std::vector;
+
+// Bytes hashed at each end of a file before it is read in full
+constexpr size_t DUPLICATE_BLOCK = 4096;
+// Read size while hashing whole files
+constexpr size_t DUPLICATE_CHUNK = 1024 * 1024;
+
+struct DuplicateGroup {
+    uint64_t size = 0;
+    uint64_t hash = 0;
+    vector<string> paths;  // sorted
+
+    // Bytes freed by keeping one copy
+    uint64_t reclaimable() const {
+        return paths.size() > 1 ? size * (paths.size() - 1) : 0;
+    }
+};
+
+struct DuplicateProgress {
+    string stage;                // "scanning", "hashing", "verifying" or "done"
+    uint64_t files_scanned = 0;
+    uint64_t candidates = 0;     // files sharing their size with another file
+    uint64_t files_hashed = 0;
+    uint64_t bytes_hashed = 0;
+    uint64_t cache_hits = 0;
+    uint64_t errors = 0;
+    uint64_t groups = 0;
+    uint64_t duplicate_files = 0;
+    uint64_t reclaimable_bytes = 0;
+    double seconds = 0;
+    bool done = false;
+    bool cancelled = false;
+};
+
+// Finds files with identical contents under a directory in three passes, each on
+// fewer files than the last: group by size, then by a hash of the first and last
+// blocks, then by a hash of the whole file. Hashes are cached by inode and mtime.
+class DuplicateFinder {
+private:
+    enum Stage { SCANNING, HASHING, VERIFYING, DONE };
+
+    struct Candidate {
+        string path;
+        uint64_t size = 0;
+        uint64_t device = 0;
+        uint64_t inode = 0;  // 0 where the platform gives none: not cached
+        int64_t mtime = 0;
+        FileHashes hashes;
+        bool readable = true;
+    };
+
+    struct InodeHash {
+        size_t operator()(const std::pair<uint64_t, uint64_t>& key) const {
+            return std::hash<uint64_t>()(key.first * 1000003u ^ key.second);
+        }
+    };
+
+    string root;
+    uint64_t min_size;
+    size_t thread_count;
+
+    std::thread coordinator;
+    std::atomic<int> stage{SCANNING};
+    std::atomic<bool> cancelled{false};
+    std::atomic<bool> finished{false};
+    std::atomic<uint64_t> files_scanned{0};
+    std::atomic<uint64_t> candidate_total{0};
+    std::atomic<uint64_t> files_hashed{0};
+    std::atomic<uint64_t> bytes_hashed{0};
+    std::atomic<uint64_t> cache_hits{0};
+    std::atomic<uint64_t> errors{0};
+    std::chrono::steady_clock::time_point started;
+    std::chrono::steady_clock::time_point stopped;
+    uint64_t root_device = 0;
+
+    vector<Candidate> files;
+    std::mutex files_mtx;
+    // Hard links to one inode are one file, not duplicates
+    std::unordered_set<std::pair<uint64_t, uint64_t>, InodeHash> seen_links;
+
+    vector<DuplicateGroup> found;
+    mutable std::mutex result_mtx;
+
+    void add_files(vector<Candidate>& batch) {
+        std::lock_guard<std::mutex> lock(files_mtx);
+        for (Candidate& file : batch) {
+            if (file.inode != 0 && !seen_links.insert({file.device, file.inode}).second) {
+                continue;
+            }
+            files.push_back(std::move(file));
+        }
+        batch.clear();
+    }
+
+#ifndef _WIN32
+    void walk(ThreadPool& pool, const string& dir) {
+        DIR* handle = cancelled ? nullptr : opendir(dir.c_str());
+        if (!handle) {
+            if (!cancelled) {
+                errors++;
+            }
+            return;
+        }
+        int fd = dirfd(handle);
+        vector<Candidate> batch;
+        while (dirent* entry = readdir(handle)) {
+            if (cancelled) {
+                break;
+            }
+            string name = entry->d_name;
+            if (name == "." || name == "..") {
+                continue;
+            }
+
+            struct stat st;
+            if (fstatat(fd, entry->d_name, &st, AT_SYMLINK_NOFOLLOW) != 0) {
+                errors++;
+                continue;
+            }
+            string child = dir == "/" ? "/" + name : dir + "/" + name;
+            if (S_ISDIR(st.st_mode)) {
+                // Stay on the filesystem we started on
+                if (static_cast<uint64_t>(st.st_dev) == root_device) {
+                    pool.submit([this, &pool, child] { walk(pool, child); });
+                }
+            } else if (S_ISREG(st.st_mode) && static_cast<uint64_t>(st.st_size) >= min_size) {
+                files_scanned++;
+                Candidate file;
+                file.path = std::move(child);
+                file.size = static_cast<uint64_t>(st.st_size);
+                file.device = static_cast<uint64_t>(st.st_dev);
+                file.inode = static_cast<uint64_t>(st.st_ino);
+                file.mtime = stat_mtime_ns(st);
+                batch.push_back(std::move(file));
+            }
+        }
+        closedir(handle);
+        add_files(batch);
+    }
+
+    bool scan_root(ThreadPool& pool) {
+        struct stat st;
+        if (stat(root.c_str(), &st) != 0 || !S_ISDIR(st.st_mode)) {
+            errors++;
+            return false;
+        }
+        root_device = static_cast<uint64_t>(st.st_dev);
+        walk(pool, root);
+        return true;
+    }
+#else
+    // No inode or device numbers through std::filesystem: walk serially, without the hash cache
+    bool scan_root(ThreadPool&) {
+        std::error_code ec;
+        vector<Candidate> batch;
+        for (fs::recursive_directory_iterator it(root, fs::directory_options::skip_permission_denied, ec), end;
+             !cancelled && !ec && it != end; it.increment(ec)) {
+            std::error_code entry_ec;
+            if (!it->is_regular_file(entry_ec) || it->is_symlink(entry_ec)) {
+                continue;
+            }
+            uint64_t size = it->file_size(entry_ec);
+            if (entry_ec || size < min_size) {
+                continue;
+            }
+            files_scanned++;
+            Candidate file;
+            file.path = it->path().string();
+            file.size = size;
+            file.mtime = to_unix_nanoseconds(it->last_write_time(entry_ec));
+            batch.push_back(std::move(file));
+        }
+        if (ec) {
+            errors++;
+        }
+        add_files(batch);
+        return true;
+    }
+#endif
+
+    static bool read_at(std::FILE* in, uint64_t offset, char* buffer, size_t length) {
+#ifdef _WIN32
+        bool sought = _fseeki64(in, static_cast<__int64>(offset), SEEK_SET) == 0;
+#else
+        bool sought = fseeko(in, static_cast<off_t>(offset), SEEK_SET) == 0;
+#endif
+        return sought && std::fread(buffer, 1, length, in) == length;
+    }
+
+    // Hash of the first and last blocks; files no longer than two blocks are read whole
+    void hash_ends(Candidate& file) {
+        if (file.inode != 0 && file_hash_cache().lookup(file.device, file.inode, file.size, file.mtime, file.hashes)) {
+            cache_hits++;
+            return;
+        }
+        std::FILE* in = std::fopen(file.path.c_str(), "rb");
+        if (!in) {
+            file.readable = false;
+            errors++;
+            return;
+        }
+        char buffer[2 * DUPLICATE_BLOCK];
+        size_t head = static_cast<size_t>(std::min<uint64_t>(file.size, DUPLICATE_BLOCK));
+        size_t tail = static_cast<size_t>(std::min<uint64_t>(file.size - head, DUPLICATE_BLOCK));
+        bool ok = read_at(in, 0, buffer, head) && read_at(in, file.size - tail, buffer + head, tail);
+        std::fclose(in);
+        if (!ok) {
+            file.readable = false;
+            errors++;
+            return;
+        }
+        file.hashes.partial = xxh64(buffer, head + tail, file.size);
+        if (file.size <= 2 * DUPLICATE_BLOCK) {
+            file.hashes.full = file.hashes.partial;
+            file.hashes.has_full = true;
+        }
+        files_hashed++;
+        bytes_hashed += head + tail;
+        if (file.inode != 0) {
+            file_hash_cache().store(file.device, file.inode, file.size, file.mtime, file.hashes);
+        }
+    }
+
+    // Chained XXH64 over the whole file, one chunk at a time
+    void hash_whole(Candidate& file) {
+        if (file.hashes.has_full || cancelled) {
+            return;
+        }
+        std::FILE* in = std::fopen(file.path.c_str(), "rb");
+        if (!in) {
+            file.readable = false;
+            errors++;
+            return;
+        }
+        std::unique_ptr<char[]> buffer(new char[DUPLICATE_CHUNK]);
+        std::setvbuf(in, nullptr, _IONBF, 0);
+        uint64_t hash = file.size;
+        uint64_t total = 0;
+        size_t n;
+        while (!cancelled && (n = std::fread(buffer.get(), 1, DUPLICATE_CHUNK, in)) > 0) {
+            hash = xxh64(buffer.get(), n, hash);
+            total += n;
+            bytes_hashed += n;
+        }
+        std::fclose(in);
+        if (cancelled) {
+            return;
+        }
+        if (total != file.size) {
+            // Changed while we read it
+            file.readable = false;
+            errors++;
+            return;
+        }
+        file.hashes.full = hash;
+        file.hashes.has_full = true;
+        files_hashed++;
+        if (file.inode != 0) {
+            file_hash_cache().store(file.device, file.inode, file.size, file.mtime, file.hashes);
+        }
+    }
+
+    // Runs of two or more readable files with equal keys, after sorting by that key
+    template <typename Key>
+    static vector<vector<Candidate*>> equal_runs(vector<Candidate*> items, Key key) {
+        items.erase(std::remove_if(items.begin(), items.end(), [](Candidate* c) { return !c->readable; }),
+                    items.end());
+        std::sort(items.begin(), items.end(), [&](Candidate* a, Candidate* b) { return key(*a) < key(*b); });
+        vector<vector<Candidate*>> runs;
+        for (size_t i = 0; i < items.size();) {
+            size_t j = i + 1;
+            while (j < items.size() && key(*items[j]) == key(*items[i])) {
+                j++;
+            }
+            if (j - i > 1) {
+                runs.emplace_back(items.begin() + i, items.begin() + j);
+            }
+            i = j;
+        }
+        return runs;
+    }
+
+    template <typename Fn>
+    void for_each_parallel(ThreadPool& pool, const vector<vector<Candidate*>>& runs, Fn fn) {
+        for (const auto& run : runs) {
+            for (Candidate* file : run) {
+                pool.submit([this, file, fn] {
+                    if (!cancelled) {
+                        fn(*file);
+                    }
+                });
+            }
+        }
+        pool.wait();
+    }
+
+    static vector<Candidate*> flatten(const vector<vector<Candidate*>>& runs) {
+        vector<Candidate*> out;
+        for (const auto& run : runs) {
+            out.insert(out.end(), run.begin(), run.end());
+        }
+        return out;
+    }
+
+    void run() {
+        {
+            ThreadPool pool(thread_count);
+            if (scan_root(pool)) {
+                pool.wait();
+
+                vector<Candidate*> all;
+                all.reserve(files.size());
+                for (Candidate& file : files) {
+                    all.push_back(&file);
+                }
+                auto by_size = equal_runs(all, [](const Candidate& c) { return c.size; });
+                for (const auto& run : by_size) {
+                    candidate_total += run.size();
+                }
+
+                stage = HASHING;
+                for_each_parallel(pool, by_size, [this](Candidate& c) { hash_ends(c); });
+                auto by_ends = equal_runs(flatten(by_size), [](const Candidate& c) {
+                    return std::make_pair(c.size, c.hashes.partial);
+                });
+
+                stage = VERIFYING;
+                for_each_parallel(pool, by_ends, [this](Candidate& c) { hash_whole(c); });
+                auto by_contents = equal_runs(flatten(by_ends), [](const Candidate& c) {
+                    return std::make_pair(c.size, c.hashes.full);
+                });
+
+                vector<DuplicateGroup> groups;
+                for (const auto& run : by_contents) {
+                    DuplicateGroup group;
+                    group.size = run.front()->size;
+                    group.hash = run.front()->hashes.full;
+                    for (Candidate* file : run) {
+                        group.paths.push_back(file->path);
+                    }
+                    std::sort(group.paths.begin(), group.paths.end());
+                    groups.push_back(std::move(group));
+                }
+                std::sort(groups.begin(), groups.end(), [](const DuplicateGroup& a, const DuplicateGroup& b) {
+                    return a.reclaimable() > b.reclaimable();
+                });
+                if (!cancelled) {
+                    std::lock_guard<std::mutex> lock(result_mtx);
+                    found = std::move(groups);
+                }
+            }
+        }
+
+        std::lock_guard<std::mutex> lock(result_mtx);
+        stage = DONE;
+        stopped = std::chrono::steady_clock::now();
+        finished = true;
+    }
+
+public:
+    DuplicateFinder(const string& path, uint64_t minimum_size = 1, size_t threads = 0)
+        : root(DirectoryCache::normalize(path)), min_size(std::max<uint64_t>(1, minimum_size)),
+          thread_count(threads ? threads : ThreadPool::default_threads()) {}
+
+    ~DuplicateFinder() {
+        cancel();
+        wait();
+    }
+
+    DuplicateFinder(const DuplicateFinder&) = delete;
+    DuplicateFinder& operator=(const DuplicateFinder&) = delete;
+
+    void start() {
+        if (!coordinator.joinable()) {
+            started = std::chrono::steady_clock::now();
+            coordinator = std::thread([this] { run(); });
+        }
+    }
+
+    void cancel() {
+        cancelled = true;
+    }
+
+    void wait() {
+        if (coordinator.joinable()) {
+            coordinator.join();
+        }
+    }
+
+    bool is_done() const {
+        return finished;
+    }
+
+    bool is_cancelled() const {
+        return cancelled;
+    }
+
+    DuplicateProgress progress() const {
+        static const char* const names[] = {"scanning", "hashing", "verifying", "done"};
+        std::lock_guard<std::mutex> lock(result_mtx);
+        DuplicateProgress p;
+        p.stage = names[stage];
+        p.files_scanned = files_scanned;
+        p.candidates = candidate_total;
+        p.files_hashed = files_hashed;
+        p.bytes_hashed = bytes_hashed;
+        p.cache_hits = cache_hits;
+        p.errors = errors;
+        p.done = finished;
+        p.cancelled = cancelled;
+        p.seconds = std::chrono::duration<double>(
+            (finished ? stopped : std::chrono::steady_clock::now()) - started).count();
+        for (const DuplicateGroup& group : found) {
+            p.groups++;
+            p.duplicate_files += group.paths.size() - 1;
+            p.reclaimable_bytes += group.reclaimable();
+        }
+        return p;
+    }
+
+    // Groups of identical files, most reclaimable space first; empty until done
+    vector<DuplicateGroup> groups(size_t limit = 0) const {
+        std::lock_guard<std::mutex> lock(result_mtx);
+        if (limit == 0 || limit >= found.size()) {
+            return found;
+        }
+        return vector<DuplicateGroup>(found.begin(), found.begin() + limit);
+    }
+};
@@ -0,0 +1,639 @@
+#include "../include/mapped_file.h"
+#include "../include/scan_token.h"
+#include "../include/thread_pool.h"
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <cstring>
+#include <filesystem>
+#include <fstream>
+#include <memory>
+#include <mutex>
+#include <shared_mutex>
+#include <string>
+#include <string_view>
+#include <thread>
+#include <unordered_map>
+#include <vector>
+
+#ifndef _WIN32
+#include <dirent.h>
+#include <fcntl.h>
+#include <sys/stat.h>
+#endif
+
+namespace fs = std::filesystem;
+using std::string;
+using std::string_view;
+using std::vector;
+using std::unique_ptr;
+using std::shared_ptr;
+
+// On-disk layout of the index. Every section is a flat array so a loaded index is
+// used straight out of the memory map. Directory children get consecutive entry ids.
+constexpr char INDEX_MAGIC[8] = {'F', 'R', 'I', 'N', 'D', 'E', 'X', '1'};
+constexpr uint32_t INDEX_VERSION = 1;
+constexpr uint32_t NO_PARENT = 0xFFFFFFFFu;
+
+struct IndexHeader {
+    char magic[8];
+    uint32_t version;
+    uint32_t entry_count;
+    uint32_t dir_count;
+    uint32_t trigram_count;
+    uint64_t posting_count;
+    uint64_t names_size;
+    uint64_t root_size;
+    uint64_t dirs_offset;
+    uint64_t entries_offset;
+    uint64_t order_offset;
+    uint64_t trigrams_offset;
+    uint64_t postings_offset;
+    uint64_t root_offset;
+    uint64_t names_offset;
+    uint64_t file_size;
+};
+
+struct IndexEntry {
+    uint32_t parent;
+    uint32_t name_offset;
+    uint16_t name_length;
+    uint8_t flags;  // EntryFlags
+    uint8_t reserved;
+};
+
+struct IndexDir {
+    uint32_t entry;
+    uint32_t first_child;
+    uint32_t child_count;
+    uint32_t reserved;
+    int64_t mtime;
+};
+
+struct TrigramKey {
+    uint32_t trigram;
+    uint32_t start;  // postings of key i are [start_i, start_{i+1})
+};
+
+struct SearchResult {
+    string path;
+    string name;
+    bool is_directory = false;
+    int score = 0;
+};
+
+struct IndexUpdateStats {
+    size_t entries = 0;
+    size_t directories_scanned = 0;
+    size_t directories_reused = 0;
+    double seconds = 0;
+};
+
+// Case-insensitive fuzzy score of pattern (already lowercase) against a name;
+// 0 means no match. Substring matches rank above scattered subsequences.
+int fuzzy_score(string_view name, string_view pattern, string& lower) {
+    lower.assign(name.begin(), name.end());
+    for (char& c : lower) {
+        c = static_cast<char>(std::tolower(static_cast<unsigned char>(c)));
+    }
+
+    auto is_boundary = [&](size_t i) {
+        if (i == 0) return true;
+        char prev = name[i - 1];
+        return prev == '.' || prev == '_' || prev == '-' || prev == ' ' ||
+               (std::isupper(static_cast<unsigned char>(name[i])) && std::islower(static_cast<unsigned char>(prev)));
+    };
+
+    size_t found = lower.find(pattern);
+    if (found != string::npos) {
+        int score = 1000 - static_cast<int>(std::min<size_t>(name.size(), 500));
+        if (name.size() == pattern.size()) score += 1000;
+        if (found == 0) score += 500;
+        else if (is_boundary(found)) score += 200;
+        return score;
+    }
+
+    int score = 0;
+    size_t j = 0;
+    size_t prev = string::npos;
+    for (size_t i = 0; i < lower.size() && j < pattern.size(); i++) {
+        if (lower[i] != pattern[j]) {
+            continue;
+        }
+        score += 10;
+        if (prev != string::npos && i == prev + 1) score += 15;
+        if (is_boundary(i)) score += 20;
+        prev = i;
+        j++;
+    }
+    if (j < pattern.size()) {
+        return 0;
+    }
+    score -= static_cast<int>(std::min<size_t>(name.size() - pattern.size(), 100)) / 4;
+    return std::max(score, 1);
+}
+
+// Whether pattern (lowercase) is a subsequence of text, ignoring case
+bool fuzzy_contains(string_view text, string_view pattern) {
+    size_t j = 0;
+    for (size_t i = 0; i < text.size() && j < pattern.size(); i++) {
+        if (std::tolower(static_cast<unsigned char>(text[i])) == static_cast<unsigned char>(pattern[j])) {
+            j++;
+        }
+    }
+    return j == pattern.size();
+}
+
+uint32_t make_trigram(const string& s, size_t i) {
+    return (static_cast<uint32_t>(static_cast<unsigned char>(s[i])) << 16) |
+           (static_cast<uint32_t>(static_cast<unsigned char>(s[i + 1])) << 8) |
+           static_cast<uint32_t>(static_cast<unsigned char>(s[i + 2]));
+}
+
+// Persistent index of every path under a root, memory-mapped for searching
+class FileIndex {
+private:
+    // One directory of the tree being (re)built
+    struct BuildDir {
+        string path;
+        int64_t mtime = 0;
+        vector<string> names;
+        vector<uint8_t> flags;
+        vector<std::pair<uint32_t, unique_ptr<BuildDir>>> subdirs;  // child slot -> subtree
+    };
+
+    string index_path;
+    unique_ptr<MappedFile> mapping;
+    const IndexHeader* header = nullptr;
+    mutable std::shared_mutex mtx;
+    std::mutex update_mtx;
+    IndexUpdateStats last_stats;
+
+    const IndexDir* dirs() const { return reinterpret_cast<const IndexDir*>(mapping->data() + header->dirs_offset); }
+    const IndexEntry* entries() const { return reinterpret_cast<const IndexEntry*>(mapping->data() + header->entries_offset); }
+    const uint32_t* name_order() const { return reinterpret_cast<const uint32_t*>(mapping->data() + header->order_offset); }
+    const TrigramKey* trigrams() const { return reinterpret_cast<const TrigramKey*>(mapping->data() + header->trigrams_offset); }
+    const uint32_t* postings() const { return reinterpret_cast<const uint32_t*>(mapping->data() + header->postings_offset); }
+    const char* names() const { return mapping->data() + header->names_offset; }
+
+    string_view entry_name(uint32_t id) const {
+        const IndexEntry& e = entries()[id];
+        return string_view(names() + e.name_offset, e.name_length);
+    }
+
+    string entry_path(uint32_t id) const {
+        vector<string_view> parts;
+        for (uint32_t cur = id; cur != 0 && cur != NO_PARENT; cur = entries()[cur].parent) {
+            parts.push_back(entry_name(cur));
+        }
+        fs::path result(string(mapping->data() + header->root_offset, header->root_size));
+        for (auto it = parts.rbegin(); it != parts.rend(); ++it) {
+            result /= fs::path(string(*it));
+        }
+        return result.string();
+    }
+
+    static bool validate(const MappedFile& file) {
+        if (file.size() < sizeof(IndexHeader)) return false;
+        const IndexHeader* h = reinterpret_cast<const IndexHeader*>(file.data());
+        if (std::memcmp(h->magic, INDEX_MAGIC, sizeof(INDEX_MAGIC)) != 0 || h->version != INDEX_VERSION) return false;
+        if (h->file_size != file.size()) return false;
+        return h->names_offset + h->names_size <= file.size() &&
+               h->root_offset + h->root_size <= file.size() &&
+               h->postings_offset + h->posting_count * sizeof(uint32_t) <= file.size() &&
+               h->trigrams_offset + (h->trigram_count + 1) * sizeof(TrigramKey) <= file.size() &&
+               h->entries_offset + h->entry_count * sizeof(IndexEntry) <= file.size() &&
+               h->dirs_offset + h->dir_count * sizeof(IndexDir) <= file.size() &&
+               h->entry_count > 0;
+    }
+
+    // Directory path -> (dir record) of the currently loaded index, for incremental updates
+    std::unordered_map<string, uint32_t> map_directories() const {
+        std::unordered_map<string, uint32_t> result;
+        if (!header) return result;
+        std::unordered_map<uint32_t, string> entry_paths;
+        entry_paths[0] = string(mapping->data() + header->root_offset, header->root_size);
+        for (uint32_t d = 0; d < header->dir_count; d++) {
+            const IndexDir& dir = dirs()[d];
+            auto it = entry_paths.find(dir.entry);
+            if (it == entry_paths.end()) continue;
+            string dir_path = it->second;
+            for (uint32_t c = dir.first_child; c < dir.first_child + dir.child_count; c++) {
+                if (entries()[c].flags & ENTRY_DIRECTORY) {
+                    entry_paths[c] = (fs::path(dir_path) / fs::path(string(entry_name(c)))).string();
+                }
+            }
+            result[dir_path] = d;
+            entry_paths.erase(it);
+        }
+        return result;
+    }
+
+    void scan_directory(ThreadPool& pool, BuildDir& dir, uint64_t root_device,
+                        const std::unordered_map<string, uint32_t>& previous,
+                        const shared_ptr<ScanToken>& token,
+                        std::atomic<size_t>& scanned, std::atomic<size_t>& reused) {
+        if (token && token->is_cancelled()) return;
+
+#ifndef _WIN32
+        struct stat st;
+        if (lstat(dir.path.c_str(), &st) != 0 || !S_ISDIR(st.st_mode)) return;
+        // Do not cross into other filesystems (/proc, network mounts, ...)
+        if (static_cast<uint64_t>(st.st_dev) != root_device) return;
+        dir.mtime = stat_mtime_ns(st);
+#else
+        std::error_code ec;
+        dir.mtime = to_unix_nanoseconds(fs::last_write_time(dir.path, ec));
+        if (ec) return;
+#endif
+
+        auto prev = previous.find(dir.path);
+        if (prev != previous.end() && dirs()[prev->second].mtime == dir.mtime) {
+            // Unchanged directory: its children come from the old index, no readdir needed
+            const IndexDir& old = dirs()[prev->second];
+            for (uint32_t c = old.first_child; c < old.first_child + old.child_count; c++) {
+                dir.names.emplace_back(entry_name(c));
+                dir.flags.push_back(entries()[c].flags);
+            }
+            reused++;
+        } else {
+            read_children(dir);
+            scanned++;
+        }
+
+        for (uint32_t i = 0; i < dir.names.size(); i++) {
+            if ((dir.flags[i] & ENTRY_DIRECTORY) && !(dir.flags[i] & ENTRY_SYMLINK)) {
+                auto sub = std::make_unique<BuildDir>();
+                sub->path = (fs::path(dir.path) / fs::path(dir.names[i])).string();
+                BuildDir* raw = sub.get();
+                dir.subdirs.emplace_back(i, std::move(sub));
+                pool.submit([this, &pool, raw, root_device, &previous, token, &scanned, &reused] {
+                    scan_directory(pool, *raw, root_device, previous, token, scanned, reused);
+                });
+            }
+        }
+    }
+
+    static void read_children(BuildDir& dir) {
+#ifndef _WIN32
+        DIR* handle = opendir(dir.path.c_str());
+        if (!handle) return;
+        int fd = dirfd(handle);
+        while (dirent* entry = readdir(handle)) {
+            const char* name = entry->d_name;
+            if (std::strcmp(name, ".") == 0 || std::strcmp(name, "..") == 0) continue;
+            if (std::strlen(name) > 0xFFFF) continue;
+
+            uint8_t flags = 0;
+            unsigned char type = entry->d_type;
+            if (type == DT_UNKNOWN) {
+                // Some filesystems do not report the type in readdir
+                struct stat st;
+                if (fstatat(fd, name, &st, AT_SYMLINK_NOFOLLOW) == 0) {
+                    type = S_ISDIR(st.st_mode) ? DT_DIR : S_ISLNK(st.st_mode) ? DT_LNK : DT_REG;
+                }
+            }
+            if (type == DT_DIR) flags |= ENTRY_DIRECTORY;
+            if (type == DT_REG) flags |= ENTRY_REGULAR;
+            if (type == DT_LNK) flags |= ENTRY_SYMLINK;
+            dir.names.emplace_back(name);
+            dir.flags.push_back(flags);
+        }
+        closedir(handle);
+#else
+        std::error_code ec;
+        for (const auto& entry : fs::directory_iterator(dir.path, fs::directory_options::skip_permission_denied, ec)) {
+            uint8_t flags = 0;
+            if (entry.is_directory(ec)) flags |= ENTRY_DIRECTORY;
+            if (entry.is_regular_file(ec)) flags |= ENTRY_REGULAR;
+            if (entry.is_symlink(ec)) flags |= ENTRY_SYMLINK;
+            dir.names.push_back(entry.path().filename().string());
+            dir.flags.push_back(flags);
+        }
+#endif
+    }
+
+    // Flattens the scanned tree into the on-disk format and writes it atomically
+    static bool write_index(const string& out_path, const string& root, BuildDir& top) {
+        vector<IndexEntry> entry_table;
+        vector<IndexDir> dir_table;
+        string name_arena;
+
+        entry_table.push_back(IndexEntry{NO_PARENT, 0, 0, ENTRY_DIRECTORY, 0});
+
+        // Iterative so that very deep trees cannot overflow the stack
+        vector<std::pair<BuildDir*, uint32_t>> stack{{&top, 0}};
+        while (!stack.empty()) {
+            auto [dir, entry_id] = stack.back();
+            stack.pop_back();
+
+            uint32_t first_child = static_cast<uint32_t>(entry_table.size());
+            dir_table.push_back(IndexDir{entry_id, first_child, static_cast<uint32_t>(dir->names.size()), 0, dir->mtime});
+            for (size_t i = 0; i < dir->names.size(); i++) {
+                entry_table.push_back(IndexEntry{entry_id, static_cast<uint32_t>(name_arena.size()),
+                                                 static_cast<uint16_t>(dir->names[i].size()), dir->flags[i], 0});
+                name_arena += dir->names[i];
+            }
+            for (auto it = dir->subdirs.rbegin(); it != dir->subdirs.rend(); ++it) {
+                stack.emplace_back(it->second.get(), first_child + it->first);
+            }
+        }
+
+        auto name_of = [&](uint32_t id) {
+            return string_view(name_arena).substr(entry_table[id].name_offset, entry_table[id].name_length);
+        };
+
+        // Sorted name table for prefix lookups
+        vector<string> lower_names(entry_table.size());
+        for (uint32_t id = 1; id < entry_table.size(); id++) {
+            lower_names[id] = to_lower(name_of(id));
+        }
+        vector<uint32_t> order(entry_table.size() - 1);
+        for (uint32_t i = 0; i < order.size(); i++) order[i] = i + 1;
+        std::sort(order.begin(), order.end(), [&](uint32_t a, uint32_t b) { return lower_names[a] < lower_names[b]; });
+
+        // Trigram postings, one per distinct trigram of each name
+        vector<uint64_t> pairs;
+        vector<uint32_t> name_trigrams;
+        for (uint32_t id = 1; id < entry_table.size(); id++) {
+            const string& lower = lower_names[id];
+            name_trigrams.clear();
+            for (size_t i = 0; i + 3 <= lower.size(); i++) {
+                name_trigrams.push_back(make_trigram(lower, i));
+            }
+            std::sort(name_trigrams.begin(), name_trigrams.end());
+            name_trigrams.erase(std::unique(name_trigrams.begin(), name_trigrams.end()), name_trigrams.end());
+            for (uint32_t t : name_trigrams) {
+                pairs.push_back((static_cast<uint64_t>(t) << 32) | id);
+            }
+        }
+        lower_names.clear();
+        lower_names.shrink_to_fit();
+        std::sort(pairs.begin(), pairs.end());
+
+        vector<TrigramKey> keys;
+        vector<uint32_t> posting_list(pairs.size());
+        for (size_t i = 0; i < pairs.size(); i++) {
+            uint32_t t = static_cast<uint32_t>(pairs[i] >> 32);
+            if (keys.empty() || keys.back().trigram != t) {
+                keys.push_back(TrigramKey{t, static_cast<uint32_t>(i)});
+            }
+            posting_list[i] = static_cast<uint32_t>(pairs[i]);
+        }
+        keys.push_back(TrigramKey{0xFFFFFFFFu, static_cast<uint32_t>(pairs.size())});  // sentinel
+
+        auto align = [](uint64_t offset) { return (offset + 7) & ~uint64_t(7); };
+        IndexHeader h{};
+        std::memcpy(h.magic, INDEX_MAGIC, sizeof(INDEX_MAGIC));
+        h.version = INDEX_VERSION;
+        h.entry_count = static_cast<uint32_t>(entry_table.size());
+        h.dir_count = static_cast<uint32_t>(dir_table.size());
+        h.trigram_count = static_cast<uint32_t>(keys.size() - 1);
+        h.posting_count = posting_list.size();
+        h.names_size = name_arena.size();
+        h.root_size = root.size();
+        h.dirs_offset = align(sizeof(IndexHeader));
+        h.entries_offset = align(h.dirs_offset + dir_table.size() * sizeof(IndexDir));
+        h.order_offset = align(h.entries_offset + entry_table.size() * sizeof(IndexEntry));
+        h.trigrams_offset = align(h.order_offset + order.size() * sizeof(uint32_t));
+        h.postings_offset = align(h.trigrams_offset + keys.size() * sizeof(TrigramKey));
+        h.root_offset = align(h.postings_offset + posting_list.size() * sizeof(uint32_t));
+        h.names_offset = align(h.root_offset + root.size());
+        h.file_size = h.names_offset + name_arena.size();
+
+        string tmp_path = out_path + ".tmp";
+        {
+            std::ofstream out(tmp_path, std::ios::binary | std::ios::trunc);
+            if (!out) return false;
+            auto write_at = [&](uint64_t offset, const void* data, size_t size) {
+                static const char zeros[8] = {};
+                while (static_cast<uint64_t>(out.tellp()) < offset) {
+                    out.write(zeros, std::min<uint64_t>(8, offset - out.tellp()));
+                }
+                out.write(static_cast<const char*>(data), size);
+            };
+            write_at(0, &h, sizeof(h));
+            write_at(h.dirs_offset, dir_table.data(), dir_table.size() * sizeof(IndexDir));
+            write_at(h.entries_offset, entry_table.data(), entry_table.size() * sizeof(IndexEntry));
+            write_at(h.order_offset, order.data(), order.size() * sizeof(uint32_t));
+            write_at(h.trigrams_offset, keys.data(), keys.size() * sizeof(TrigramKey));
+            write_at(h.postings_offset, posting_list.data(), posting_list.size() * sizeof(uint32_t));
+            write_at(h.root_offset, root.data(), root.size());
+            write_at(h.names_offset, name_arena.data(), name_arena.size());
+            if (!out) return false;
+        }
+
+        std::error_code ec;
+        fs::rename(tmp_path, out_path, ec);
+        return !ec;
+    }
+
+    // Entry ids whose names contain every trigram of the pattern
+    vector<uint32_t> trigram_candidates(const string& pattern) const {
+        vector<uint32_t> result;
+        bool first = true;
+        const TrigramKey* keys = trigrams();
+        for (size_t i = 0; i + 3 <= pattern.size(); i++) {
+            uint32_t t = make_trigram(pattern, i);
+            const TrigramKey* key = std::lower_bound(keys, keys + header->trigram_count, t,
+                [](const TrigramKey& k, uint32_t value) { return k.trigram < value; });
+            if (key == keys + header->trigram_count || key->trigram != t) {
+                return {};
+            }
+            const uint32_t* begin = postings() + key->start;
+            const uint32_t* end = postings() + (key + 1)->start;
+            if (first) {
+                result.assign(begin, end);
+                first = false;
+            } else {
+                vector<uint32_t> narrowed;
+                std::set_intersection(result.begin(), result.end(), begin, end, std::back_inserter(narrowed));
+                result.swap(narrowed);
+            }
+            if (result.empty()) break;
+        }
+        return result;
+    }
+
+    // Entry ids whose names start with the pattern, through the sorted name table
+    vector<uint32_t> prefix_candidates(const string& pattern, size_t limit) const {
+        const uint32_t* order = name_order();
+        size_t count = header->entry_count - 1;
+        auto lower_prefix = [&](uint32_t id) {
+            string_view name = entry_name(id);
+            return to_lower(name.substr(0, std::min(name.size(), pattern.size())));
+        };
+        const uint32_t* begin = std::lower_bound(order, order + count, pattern,
+            [&](uint32_t id, const string& value) { return lower_prefix(id) < value; });
+        vector<uint32_t> result;
+        for (const uint32_t* it = begin; it != order + count && result.size() < limit; ++it) {
+            if (lower_prefix(*it) != pattern) break;
+            result.push_back(*it);
+        }
+        return result;
+    }
+
+public:
+    explicit FileIndex(const string& path) : index_path(path) {}
+
+    // Maps an existing index file; nothing is rebuilt
+    bool load() {
+        auto file = std::make_unique<MappedFile>();
+        if (!file->open(index_path) || !validate(*file)) {
+            return false;
+        }
+        std::unique_lock<std::shared_mutex> lock(mtx);
+        mapping = std::move(file);
+        header = reinterpret_cast<const IndexHeader*>(mapping->data());
+        return true;
+    }
+
+    bool is_loaded() const {
+        std::shared_lock<std::shared_mutex> lock(mtx);
+        return header != nullptr;
+    }
+
+    size_t size() const {
+        std::shared_lock<std::shared_mutex> lock(mtx);
+        return header ? header->entry_count - 1 : 0;
+    }
+
+    string root() const {
+        std::shared_lock<std::shared_mutex> lock(mtx);
+        return header ? string(mapping->data() + header->root_offset, header->root_size) : "";
+    }
+
+    string path() const {
+        return index_path;
+    }
+
+    IndexUpdateStats last_update() const {
+        std::shared_lock<std::shared_mutex> lock(mtx);
+        return last_stats;
+    }
+
+    // Rebuilds the index for root, re-reading only directories whose mtime changed
+    // since the loaded index was written, then saves and maps the new file
+    bool update(const string& root_path, const shared_ptr<ScanToken>& token = nullptr, size_t threads = 0) {
+        std::lock_guard<std::mutex> updating(update_mtx);
+        auto started = std::chrono::steady_clock::now();
+        string root = fs::path(root_path).lexically_normal().string();
+
+        IndexUpdateStats stats;
+        std::atomic<size_t> scanned{0};
+        std::atomic<size_t> reused{0};
+        BuildDir top;
+        top.path = root;
+        {
+            // Readers may keep searching the old mapping while the new tree is built
+            std::shared_lock<std::shared_mutex> lock(mtx);
+            bool same_root = header && string(mapping->data() + header->root_offset, header->root_size) == root;
+            std::unordered_map<string, uint32_t> previous;
+            if (same_root) {
+                previous = map_directories();
+            }
+
+            uint64_t root_device = 0;
+#ifndef _WIN32
+            struct stat st;
+            if (stat(root.c_str(), &st) != 0) return false;
+            root_device = static_cast<uint64_t>(st.st_dev);
+#endif
+            ThreadPool pool(threads);
+            pool.submit([&] { scan_directory(pool, top, root_device, previous, token, scanned, reused); });
+            pool.wait();
+        }
+
+        if ((token && token->is_cancelled()) || !write_index(index_path, root, top)) {
+            return false;
+        }
+        if (!load()) {
+            return false;
+        }
+
+        stats.entries = size();
+        stats.directories_scanned = scanned;
+        stats.directories_reused = reused;
+        stats.seconds = std::chrono::duration<double>(std::chrono::steady_clock::now() - started).count();
+        std::unique_lock<std::shared_mutex> lock(mtx);
+        last_stats = stats;
+        return true;
+    }
+
+    // Ranked fuzzy matches of the query against file names. A query containing
+    // '/' also has to match the parent path with the part before the last '/'.
+    vector<SearchResult> search(const string& query, size_t limit = 50) const {
+        std::shared_lock<std::shared_mutex> lock(mtx);
+        vector<SearchResult> results;
+        if (!header || limit == 0) return results;
+
+        string pattern;
+        for (char c : query) {
+            if (c != ' ') pattern.push_back(static_cast<char>(std::tolower(static_cast<unsigned char>(c))));
+        }
+        string dir_pattern;
+        size_t slash = pattern.find_last_of("/\\");
+        if (slash != string::npos) {
+            dir_pattern = pattern.substr(0, slash);
+            pattern = pattern.substr(slash + 1);
+        }
+        if (pattern.empty()) return results;
+
+        uint32_t count = header->entry_count;
+        vector<std::pair<int, uint32_t>> scored;
+        vector<char> seen;
+        string lower;
+
+        auto accept = [&](uint32_t id, int score) {
+            if (score <= 0) return;
+            if (!dir_pattern.empty() && !fuzzy_contains(entry_path(entries()[id].parent), dir_pattern)) return;
+            scored.emplace_back(score, id);
+        };
+
+        // Fast paths: names containing the pattern (trigrams) or starting with it (sorted table)
+        vector<uint32_t> candidates = pattern.size() >= 3 ? trigram_candidates(pattern) : prefix_candidates(pattern, limit * 4);
+        for (uint32_t id : candidates) {
+            accept(id, fuzzy_score(entry_name(id), pattern, lower));
+        }
+
+        // Not enough direct hits: fall back to a parallel fuzzy scan of every name
+        if (scored.size() < limit) {
+            seen.assign(count, 0);
+            for (const auto& hit : scored) seen[hit.second] = 1;
+
+            size_t workers = std::min<size_t>(ThreadPool::default_threads(), 1 + count / 65536);
+            vector<vector<std::pair<int, uint32_t>>> partial(workers);
+            vector<std::thread> threads;
+            for (size_t w = 0; w < workers; w++) {
+                threads.emplace_back([&, w] {
+                    string local_lower;
+                    uint32_t begin = 1 + static_cast<uint32_t>((count - 1) * w / workers);
+                    uint32_t end = 1 + static_cast<uint32_t>((count - 1) * (w + 1) / workers);
+                    for (uint32_t id = begin; id < end; id++) {
+                        if (seen[id]) continue;
+                        int score = fuzzy_score(entry_name(id), pattern, local_lower);
+                        if (score > 0) partial[w].emplace_back(score, id);
+                    }
+                });
+            }
+            for (auto& t : threads) t.join();
+            for (auto& part : partial) {
+                for (const auto& hit : part) accept(hit.second, hit.first);
+            }
+        }
+
+        size_t keep = std::min(limit, scored.size());
+        std::partial_sort(scored.begin(), scored.begin() + keep, scored.end(),
+            [&](const std::pair<int, uint32_t>& a, const std::pair<int, uint32_t>& b) {
+                if (a.first != b.first) return a.first > b.first;
+                return a.second < b.second;
+            });
+
+        for (size_t i = 0; i < keep; i++) {
+            uint32_t id = scored[i].second;
+            results.push_back(SearchResult{entry_path(id), string(entry_name(id)),
+                                           static_cast<bool>(entries()[id].flags & ENTRY_DIRECTORY), scored[i].first});
+        }
+        return results;
+    }
+};
@@ -0,0 +1,180 @@
+#include "../include/perf_counters.h"
+#include <algorithm>
+#include <cerrno>
+#include <cstring>
+#include <fstream>
+#include <string>
+#include <system_error>
+
+#ifndef _WIN32
+#include <fcntl.h>
+#include <unistd.h>
+#endif
+
+using std::string;
+
+// Bytes read per call while collecting lines
+constexpr size_t PREVIEW_BLOCK_BYTES = 16 * 1024;
+// Skipping towards a far-away first line gives up after this many bytes
+constexpr uint64_t PREVIEW_SKIP_LIMIT = 64ull * 1024 * 1024;
+
+// The lines of a file needed to fill a preview pane
+struct TextPreview {
+    string text;
+    size_t first_line = 1;
+    size_t line_count = 0;
+    bool binary = false;
+    bool more = false;  // the file goes on past the returned lines
+    uint64_t bytes_read = 0;
+    string error;
+};
+
+// Sequential positioned reads: pread where available, a seeking stream otherwise
+class BlockReader {
+private:
+#ifndef _WIN32
+    int fd = -1;
+#else
+    std::ifstream in;
+#endif
+    uint64_t offset = 0;
+
+public:
+    explicit BlockReader(const string& file_path) {
+#ifndef _WIN32
+        fd = ::open(file_path.c_str(), O_RDONLY | O_CLOEXEC);
+#else
+        in.open(file_path, std::ios::binary);
+#endif
+    }
+
+    ~BlockReader() {
+#ifndef _WIN32
+        if (fd >= 0) {
+            ::close(fd);
+        }
+#endif
+    }
+
+    BlockReader(const BlockReader&) = delete;
+    BlockReader& operator=(const BlockReader&) = delete;
+
+    bool is_open() const {
+#ifndef _WIN32
+        return fd >= 0;
+#else
+        return in.is_open();
+#endif
+    }
+
+    // Bytes read into `buffer`; 0 at end of file, -1 on error
+    long long read(char* buffer, size_t size) {
+#ifndef _WIN32
+        ssize_t n;
+        do {
+            n = pread(fd, buffer, size, static_cast<off_t>(offset));
+        } while (n < 0 && errno == EINTR);
+#else
+        in.read(buffer, static_cast<std::streamsize>(size));
+        long long n = in.gcount();
+        if (n == 0 && in.bad()) {
+            n = -1;
+        }
+#endif
+        if (n > 0) {
+            offset += static_cast<uint64_t>(n);
+        }
+        return n;
+    }
+};
+
+// Reads `max_lines` lines starting at `first_line` (1-based), each cut to `max_line_bytes`,
+// without reading the file past the last of them. Files with a NUL near the start are binary.
+TextPreview read_text_preview(const string& file_path, size_t first_line, size_t max_lines, size_t max_line_bytes) {
+    PerfCounters& perf = perf_counters();
+    PerfTimer timer(perf.preview_ns);
+    perf.add(perf.previews, 1);
+    TextPreview preview;
+    preview.first_line = std::max<size_t>(first_line, 1);
+
+    BlockReader reader(file_path);
+    if (!reader.is_open()) {
+        preview.error = std::error_code(errno, std::generic_category()).message();
+        return preview;
+    }
+
+    char block[PREVIEW_BLOCK_BYTES];
+    size_t line = 1;
+    size_t line_bytes = 0;
+    bool sniffed = false;
+    while (preview.line_count < max_lines) {
+        long long n = reader.read(block, sizeof(block));
+        if (n < 0) {
+            preview.error = std::error_code(errno, std::generic_category()).message();
+            return preview;
+        }
+        if (n == 0) {
+            // A last line without a newline still counts
+            if (line >= preview.first_line && line_bytes > 0) {
+                preview.line_count++;
+            }
+            return preview;
+        }
+        if (!sniffed) {
+            sniffed = true;
+            if (std::memchr(block, 0, std::min<size_t>(static_cast<size_t>(n), BINARY_SNIFF_BYTES))) {
+                preview.binary = true;
+                return preview;
+            }
+        }
+        preview.bytes_read += static_cast<uint64_t>(n);
+        perf.add(perf.preview_bytes, static_cast<uint64_t>(n));
+
+        const char* p = block;
+        const char* end = block + n;
+        // Skip whole blocks of lines before the first one wanted
+        while (p < end && line < preview.first_line) {
+            const char* newline = static_cast<const char*>(std::memchr(p, '\n', end - p));
+            if (!newline) {
+                p = end;
+                break;
+            }
+            p = newline + 1;
+            line++;
+        }
+        if (line < preview.first_line) {
+            if (preview.bytes_read >= PREVIEW_SKIP_LIMIT) {
+                preview.more = true;
+                return preview;
+            }
+            continue;
+        }
+
+        while (p < end) {
+            const char* newline = static_cast<const char*>(std::memchr(p, '\n', end - p));
+            const char* stop = newline ? newline : end;
+            size_t room = max_line_bytes > line_bytes ? max_line_bytes - line_bytes : 0;
+            size_t take = std::min(static_cast<size_t>(stop - p), room);
+            preview.text.append(p, take);
+            line_bytes += take;
+            if (!newline) {
+                p = end;
+                break;
+            }
+            if (take > 0 && take == static_cast<size_t>(stop - p) && preview.text.back() == '\r') {
+                preview.text.pop_back();
+            }
+            preview.text.push_back('\n');
+            preview.line_count++;
+            line++;
+            line_bytes = 0;
+            p = newline + 1;
+            if (preview.line_count == max_lines) {
+                // Anything left in this block means there is more to see
+                preview.more = p < end || reader.read(block, 1) > 0;
+                return preview;
+            }
+        }
+    }
+    return preview;
+}
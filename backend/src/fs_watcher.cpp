@@ -0,0 +1,256 @@
+#include "../include/directory_cache.h"
+#include "../include/disk_usage_cache.h"
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <filesystem>
+#include <mutex>
+#include <set>
+#include <string>
+#include <thread>
+#include <unordered_map>
+#include <vector>
+
+#ifdef __linux__
+#include <fcntl.h>
+#include <poll.h>
+#include <sys/inotify.h>
+#include <unistd.h>
+#endif
+
+namespace fs = std::filesystem;
+using std::string;
+using std::vector;
+
+// Watches a small set of directories (the ones on screen) and reports which of them
+// changed, in debounced batches: a burst of events becomes one batch once the
+// directories have been quiet for `debounce`, or after `max_delay` at the latest.
+// Reported directories are dropped from the listing cache before they are returned.
+// Uses inotify on Linux; elsewhere it falls back to comparing directory mtimes.
+class FsWatcher {
+private:
+    using Clock = std::chrono::steady_clock;
+
+    std::chrono::milliseconds debounce;
+    std::chrono::milliseconds max_delay;
+    std::set<string> watched;
+    std::mutex mtx;
+    std::atomic<bool> closed{false};
+
+#ifdef __linux__
+    int inotify_fd = -1;
+    int wake_pipe[2] = {-1, -1};
+    std::unordered_map<int, string> descriptors;  // watch descriptor -> directory
+    std::unordered_map<string, int> by_path;
+
+    static constexpr uint32_t WATCH_EVENTS = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_MODIFY |
+                                             IN_ATTRIB | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR;
+
+    // Drains the queued events into `changed`
+    void read_events(std::set<string>& changed) {
+        alignas(inotify_event) char buffer[64 * 1024];
+        while (true) {
+            ssize_t n = read(inotify_fd, buffer, sizeof(buffer));
+            if (n <= 0) {
+                return;
+            }
+            std::lock_guard<std::mutex> lock(mtx);
+            for (char* p = buffer; p < buffer + n;) {
+                auto* event = reinterpret_cast<inotify_event*>(p);
+                p += sizeof(inotify_event) + event->len;
+                if (event->mask & IN_Q_OVERFLOW) {
+                    // Events were lost: everything we watch may have changed
+                    changed.insert(watched.begin(), watched.end());
+                    continue;
+                }
+                auto it = descriptors.find(event->wd);
+                if (it != descriptors.end()) {
+                    changed.insert(it->second);
+                }
+                if (event->mask & IN_IGNORED) {
+                    // The directory itself is gone; its watch was removed by the kernel
+                    if (it != descriptors.end()) {
+                        by_path.erase(it->second);
+                        descriptors.erase(it);
+                    }
+                }
+            }
+        }
+    }
+
+    // Waits for the inotify fd (or a wake-up) for at most `timeout`; false if closed
+    bool wait_readable(std::chrono::milliseconds timeout) {
+        pollfd fds[2] = {{inotify_fd, POLLIN, 0}, {wake_pipe[0], POLLIN, 0}};
+        int ready = poll(fds, 2, static_cast<int>(std::max<long long>(0, timeout.count())));
+        if (ready > 0 && (fds[1].revents & POLLIN)) {
+            return false;
+        }
+        return true;
+    }
+#endif
+
+    // Polling fallback: last seen mtime of every watched directory
+    std::unordered_map<string, fs::file_time_type> mtimes;
+
+    void poll_mtimes(std::set<string>& changed) {
+        std::lock_guard<std::mutex> lock(mtx);
+        for (const auto& dir : watched) {
+            std::error_code ec;
+            auto mtime = fs::last_write_time(dir, ec);
+            auto it = mtimes.find(dir);
+            if (it != mtimes.end() && (ec || it->second != mtime)) {
+                changed.insert(dir);
+            }
+            mtimes[dir] = mtime;
+        }
+    }
+
+    void wait_polling(std::set<string>& changed, Clock::time_point deadline) {
+        while (changed.empty() && !closed && Clock::now() < deadline) {
+            auto left = std::chrono::duration_cast<std::chrono::milliseconds>(deadline - Clock::now());
+            std::this_thread::sleep_for(std::min(debounce * 5, left));
+            poll_mtimes(changed);
+        }
+    }
+
+    void invalidate(const std::set<string>& changed) {
+        for (const auto& dir : changed) {
+            directory_cache().invalidate(dir);
+            disk_usage_cache().invalidate_ancestors(dir);
+        }
+    }
+
+public:
+    explicit FsWatcher(int debounce_ms = 100, int max_delay_ms = 1000)
+        : debounce(debounce_ms), max_delay(max_delay_ms) {
+#ifdef __linux__
+        inotify_fd = inotify_init1(IN_NONBLOCK | IN_CLOEXEC);
+        if (pipe2(wake_pipe, O_NONBLOCK | O_CLOEXEC) != 0) {
+            wake_pipe[0] = wake_pipe[1] = -1;
+        }
+#endif
+    }
+
+    ~FsWatcher() {
+        close();
+#ifdef __linux__
+        if (inotify_fd >= 0) ::close(inotify_fd);
+        if (wake_pipe[0] >= 0) ::close(wake_pipe[0]);
+        if (wake_pipe[1] >= 0) ::close(wake_pipe[1]);
+#endif
+    }
+
+    FsWatcher(const FsWatcher&) = delete;
+    FsWatcher& operator=(const FsWatcher&) = delete;
+
+    // Whether changes are pushed by the kernel rather than found by polling mtimes
+    bool is_native() const {
+#ifdef __linux__
+        return inotify_fd >= 0;
+#else
+        return false;
+#endif
+    }
+
+    // Replaces the watched set; directories already watched keep their watch
+    void watch(const vector<string>& dirs) {
+        std::set<string> wanted;
+        for (const auto& dir : dirs) {
+            if (!dir.empty()) {
+                wanted.insert(DirectoryCache::normalize(dir));
+            }
+        }
+
+        std::lock_guard<std::mutex> lock(mtx);
+#ifdef __linux__
+        for (const auto& dir : watched) {
+            if (!wanted.count(dir)) {
+                auto it = by_path.find(dir);
+                if (it != by_path.end()) {
+                    inotify_rm_watch(inotify_fd, it->second);
+                    descriptors.erase(it->second);
+                    by_path.erase(it);
+                }
+            }
+        }
+        for (const auto& dir : wanted) {
+            if (!by_path.count(dir) && inotify_fd >= 0) {
+                int wd = inotify_add_watch(inotify_fd, dir.c_str(), WATCH_EVENTS);
+                if (wd >= 0) {
+                    descriptors[wd] = dir;
+                    by_path[dir] = wd;
+                }
+            }
+        }
+#endif
+        if (!is_native()) {
+            for (auto it = mtimes.begin(); it != mtimes.end();) {
+                it = wanted.count(it->first) ? std::next(it) : mtimes.erase(it);
+            }
+            for (const auto& dir : wanted) {
+                std::error_code ec;
+                if (!mtimes.count(dir)) {
+                    mtimes[dir] = fs::last_write_time(dir, ec);
+                }
+            }
+        }
+        watched = std::move(wanted);
+    }
+
+    vector<string> watched_directories() {
+        std::lock_guard<std::mutex> lock(mtx);
+        return vector<string>(watched.begin(), watched.end());
+    }
+
+    // Blocks until a debounced batch of changed directories is ready, the timeout
+    // passes (empty result) or the watcher is closed (empty result)
+    vector<string> wait_changes(int timeout_ms) {
+        std::set<string> changed;
+        auto deadline = Clock::now() + std::chrono::milliseconds(timeout_ms);
+#ifdef __linux__
+        if (!is_native()) {
+            wait_polling(changed, deadline);
+            invalidate(changed);
+            return vector<string>(changed.begin(), changed.end());
+        }
+        // Wait for the first event of a burst
+        while (changed.empty()) {
+            auto left = std::chrono::duration_cast<std::chrono::milliseconds>(deadline - Clock::now());
+            if (left.count() <= 0 || !wait_readable(left) || closed) {
+                return {};
+            }
+            read_events(changed);
+        }
+        // Then keep collecting until the burst pauses or has gone on too long
+        auto flush_by = Clock::now() + max_delay;
+        while (Clock::now() < flush_by) {
+            auto left = std::min(debounce, std::chrono::duration_cast<std::chrono::milliseconds>(flush_by - Clock::now()));
+            pollfd fd = {inotify_fd, POLLIN, 0};
+            if (poll(&fd, 1, static_cast<int>(left.count())) <= 0 || closed) {
+                break;
+            }
+            read_events(changed);
+        }
+#else
+        wait_polling(changed, deadline);
+#endif
+        invalidate(changed);
+        return vector<string>(changed.begin(), changed.end());
+    }
+
+    // Wakes a blocked wait_changes(); the watcher reports nothing afterwards
+    void close() {
+        std::lock_guard<std::mutex> lock(mtx);
+        if (closed) {
+            return;
+        }
+        closed = true;
+#ifdef __linux__
+        if (wake_pipe[1] >= 0) {
+            char byte = 1;
+            ssize_t ignored = write(wake_pipe[1], &byte, 1);
+            (void)ignored;
+        }
+#endif
+    }
+};
@@ -0,0 +1,425 @@
+#include <algorithm>
+#include <cstdint>
+#include <filesystem>
+#include <mutex>
+#include <string>
+#include <vector>
+
+using std::string;
+using std::vector;
+
+// Bytes of tree nodes kept before collapsed subtrees are dropped
+constexpr size_t DEFAULT_TREE_BUDGET = 64 * 1024 * 1024;
+// Eviction frees down to this fraction of the budget, so it does not run on every expand
+constexpr double TREE_EVICT_TARGET = 0.75;
+
+struct TreeRow {
+    string name;
+    string path;
+    uint32_t depth = 0;
+    bool expanded = false;
+    bool loaded = false;       // children listed; false for never opened or evicted
+    uint32_t child_count = 0;  // subdirectories, once loaded
+};
+
+struct TreeStats {
+    size_t nodes = 0;
+    size_t visible_rows = 0;
+    size_t memory_usage = 0;
+    size_t memory_budget = 0;
+    uint64_t loads = 0;
+    uint64_t evictions = 0;      // subtrees dropped to stay within the budget
+    uint64_t nodes_evicted = 0;
+};
+
+// Directory tree for the left pane. Subdirectories are listed only when their
+// parent is expanded, and the visible rows are kept as one flat pre-order array,
+// so drawing a row is an index lookup however large the tree. Children of
+// collapsed directories are dropped, least recently collapsed first, once the
+// nodes outgrow the memory budget; expanding them again re-lists them.
+class LazyTree {
+private:
+    static constexpr uint32_t NO_NODE = UINT32_MAX;
+
+    struct Node {
+        string name;
+        vector<uint32_t> children;
+        uint32_t parent = NO_NODE;
+        uint32_t depth = 0;
+        uint32_t serial = 0;  // bumped whenever the slot is reused
+        uint64_t last_used = 0;
+        bool alive = false;
+        bool loaded = false;
+        bool expanded = false;
+    };
+
+    string root_path;
+    vector<Node> nodes;  // slot 0 is the root
+    vector<uint32_t> free_slots;
+    vector<uint32_t> visible;
+    size_t budget;
+    size_t used = 0;
+    size_t live = 0;
+    uint64_t tick = 0;
+    uint64_t loads = 0;
+    uint64_t evictions = 0;
+    uint64_t nodes_evicted = 0;
+    mutable std::mutex mtx;
+
+    // Heap bytes of a node besides its slot; short names live inside the string itself
+    static size_t node_bytes(const Node& node) {
+        size_t name_bytes = node.name.capacity() > 15 ? node.name.capacity() + 1 : 0;
+        return name_bytes + node.children.capacity() * sizeof(uint32_t);
+    }
+
+    uint32_t allocate(string name, uint32_t parent) {
+        uint32_t id;
+        if (!free_slots.empty()) {
+            id = free_slots.back();
+            free_slots.pop_back();
+        } else {
+            id = static_cast<uint32_t>(nodes.size());
+            nodes.emplace_back();
+        }
+        Node& node = nodes[id];
+        node.name = std::move(name);
+        node.parent = parent;
+        node.depth = parent == NO_NODE ? 0 : nodes[parent].depth + 1;
+        node.serial++;
+        node.last_used = 0;
+        node.alive = true;
+        node.loaded = false;
+        node.expanded = false;
+        used += node_bytes(node);
+        live++;
+        return id;
+    }
+
+    void release(uint32_t id) {
+        Node& node = nodes[id];
+        for (uint32_t child : node.children) {
+            release(child);
+        }
+        used -= node_bytes(node);
+        string().swap(node.name);
+        vector<uint32_t>().swap(node.children);
+        node.alive = false;
+        free_slots.push_back(id);
+        live--;
+    }
+
+    void drop_children(uint32_t id) {
+        vector<uint32_t> children;
+        children.swap(nodes[id].children);
+        used -= children.capacity() * sizeof(uint32_t);
+        for (uint32_t child : children) {
+            release(child);
+        }
+        nodes[id].loaded = false;
+    }
+
+    void attach(uint32_t id, const DirectoryListing& listing) {
+        vector<uint32_t> children;
+        for (size_t i = 0; i < listing.size(); i++) {
+            if (listing.entry_is_directory(i)) {
+                children.push_back(allocate(string(listing.name(i)), id));
+            }
+        }
+        children.shrink_to_fit();
+        used += children.capacity() * sizeof(uint32_t);
+        nodes[id].children = std::move(children);
+        nodes[id].loaded = true;
+        loads++;
+    }
+
+    string path_of(uint32_t id) const {
+        vector<uint32_t> chain;
+        for (uint32_t at = id; at != 0; at = nodes[at].parent) {
+            chain.push_back(at);
+        }
+        std::filesystem::path p(root_path);
+        for (auto it = chain.rbegin(); it != chain.rend(); ++it) {
+            p /= nodes[*it].name;
+        }
+        return p.string();
+    }
+
+    void subtree_rows(uint32_t id, vector<uint32_t>& out) const {
+        for (uint32_t child : nodes[id].children) {
+            out.push_back(child);
+            if (nodes[child].expanded) {
+                subtree_rows(child, out);
+            }
+        }
+    }
+
+    long row_of(uint32_t id) const {
+        auto it = std::find(visible.begin(), visible.end(), id);
+        return it == visible.end() ? -1 : static_cast<long>(it - visible.begin());
+    }
+
+    bool is_shown(uint32_t id) const {
+        for (uint32_t at = nodes[id].parent; at != NO_NODE; at = nodes[at].parent) {
+            if (!nodes[at].expanded) {
+                return false;
+            }
+        }
+        return true;
+    }
+
+    // Rows below a visible, expanded node; the subtree is shown right after it
+    size_t show_children(uint32_t id) {
+        if (!is_shown(id)) {
+            return 0;
+        }
+        long row = row_of(id);
+        if (row < 0) {
+            return 0;
+        }
+        vector<uint32_t> rows;
+        subtree_rows(id, rows);
+        visible.insert(visible.begin() + row + 1, rows.begin(), rows.end());
+        return rows.size();
+    }
+
+    size_t hide_children(uint32_t id) {
+        long row = row_of(id);
+        if (row < 0) {
+            return 0;
+        }
+        size_t end = static_cast<size_t>(row) + 1;
+        while (end < visible.size() && nodes[visible[end]].depth > nodes[id].depth) {
+            end++;
+        }
+        visible.erase(visible.begin() + row + 1, visible.begin() + end);
+        return end - row - 1;
+    }
+
+    // Freed slots are reused by the next load, so live nodes are what the budget bounds
+    size_t memory_in_use() const {
+        return live * sizeof(Node) + used + visible.capacity() * sizeof(uint32_t);
+    }
+
+    void enforce_budget() {
+        if (memory_in_use() <= budget) {
+            return;
+        }
+        vector<uint32_t> candidates;
+        for (uint32_t id = 1; id < nodes.size(); id++) {
+            const Node& node = nodes[id];
+            if (node.alive && node.loaded && !node.expanded && !node.children.empty()) {
+                candidates.push_back(id);
+            }
+        }
+        std::sort(candidates.begin(), candidates.end(),
+                  [this](uint32_t a, uint32_t b) { return nodes[a].last_used < nodes[b].last_used; });
+        size_t target = static_cast<size_t>(budget * TREE_EVICT_TARGET);
+        for (uint32_t id : candidates) {
+            if (memory_in_use() <= target) {
+                break;
+            }
+            // Already gone with an evicted ancestor
+            if (nodes[id].alive && nodes[id].loaded) {
+                size_t before = live;
+                drop_children(id);
+                evictions++;
+                nodes_evicted += before - live;
+            }
+        }
+    }
+
+    // Lists the directory without holding the lock; the node may be evicted meanwhile
+    long expand_node(uint32_t id, uint32_t serial) {
+        string path;
+        {
+            std::lock_guard<std::mutex> lock(mtx);
+            Node& node = nodes[id];
+            if (!node.alive || node.serial != serial) {
+                return -1;
+            }
+            if (node.expanded) {
+                return 0;
+            }
+            if (node.loaded) {
+                node.expanded = true;
+                node.last_used = ++tick;
+                return static_cast<long>(show_children(id));
+            }
+            path = path_of(id);
+        }
+
+        auto listing = list_directory(path, nullptr, SortKey::NAME, false, ListingMode::FAST);
+
+        std::lock_guard<std::mutex> lock(mtx);
+        if (!nodes[id].alive || nodes[id].serial != serial) {
+            return -1;
+        }
+        if (!nodes[id].loaded) {
+            attach(id, *listing);
+        }
+        if (nodes[id].expanded) {
+            return 0;
+        }
+        nodes[id].expanded = true;
+        nodes[id].last_used = ++tick;
+        size_t added = show_children(id);
+        enforce_budget();
+        return static_cast<long>(added);
+    }
+
+    uint32_t child_named(uint32_t id, const string& name) const {
+        for (uint32_t child : nodes[id].children) {
+            if (nodes[child].name == name) {
+                return child;
+            }
+        }
+        return NO_NODE;
+    }
+
+    // Components of a path below the root, or false if it is not under it
+    bool components(const string& target, vector<string>& out) const {
+        std::filesystem::path rel = std::filesystem::path(target).lexically_normal()
+                                        .lexically_relative(std::filesystem::path(root_path).lexically_normal());
+        if (rel.empty() || *rel.begin() == "..") {
+            return false;
+        }
+        for (const auto& part : rel) {
+            if (part != "." && !part.empty()) {
+                out.push_back(part.string());
+            }
+        }
+        return true;
+    }
+
+public:
+    explicit LazyTree(const string& root, size_t memory_budget = DEFAULT_TREE_BUDGET)
+        : root_path(root), budget(memory_budget) {
+        allocate(root, NO_NODE);
+        visible.push_back(0);
+    }
+
+    const string& root() const {
+        return root_path;
+    }
+
+    size_t row_count() const {
+        std::lock_guard<std::mutex> lock(mtx);
+        return visible.size();
+    }
+
+    vector<TreeRow> rows(size_t start, size_t count) const {
+        std::lock_guard<std::mutex> lock(mtx);
+        vector<TreeRow> out;
+        for (size_t row = start; row < visible.size() && out.size() < count; row++) {
+            const Node& node = nodes[visible[row]];
+            out.push_back(TreeRow{row == 0 ? root_path : node.name, path_of(visible[row]), node.depth,
+                                  node.expanded, node.loaded, static_cast<uint32_t>(node.children.size())});
+        }
+        return out;
+    }
+
+    // Rows added below `row`, or -1 if there is no such row
+    long expand(size_t row) {
+        uint32_t id, serial;
+        {
+            std::lock_guard<std::mutex> lock(mtx);
+            if (row >= visible.size()) {
+                return -1;
+            }
+            id = visible[row];
+            serial = nodes[id].serial;
+        }
+        return expand_node(id, serial);
+    }
+
+    // Rows removed below `row`; the children stay loaded until the budget needs the memory
+    long collapse(size_t row) {
+        std::lock_guard<std::mutex> lock(mtx);
+        if (row >= visible.size()) {
+            return -1;
+        }
+        uint32_t id = visible[row];
+        if (!nodes[id].expanded) {
+            return 0;
+        }
+        size_t removed = hide_children(id);
+        nodes[id].expanded = false;
+        nodes[id].last_used = ++tick;
+        enforce_budget();
+        return static_cast<long>(removed);
+    }
+
+    // Expands every ancestor of a directory; its row, or -1 if it is not in the tree
+    long reveal(const string& target) {
+        vector<string> parts;
+        if (!components(target, parts)) {
+            return -1;
+        }
+        uint32_t id = 0;
+        for (const string& part : parts) {
+            uint32_t serial;
+            {
+                std::lock_guard<std::mutex> lock(mtx);
+                serial = nodes[id].serial;
+            }
+            if (expand_node(id, serial) < 0) {
+                return -1;
+            }
+            std::lock_guard<std::mutex> lock(mtx);
+            if (!nodes[id].alive || nodes[id].serial != serial) {
+                return -1;
+            }
+            id = child_named(id, part);
+            if (id == NO_NODE) {
+                return -1;
+            }
+        }
+        std::lock_guard<std::mutex> lock(mtx);
+        return row_of(id);
+    }
+
+    // Re-lists a loaded directory after it changed; expanded subdirectories below it are collapsed
+    bool reload(const string& target) {
+        vector<string> parts;
+        uint32_t id = 0;
+        uint32_t serial;
+        bool was_expanded;
+        {
+            std::lock_guard<std::mutex> lock(mtx);
+            if (!components(target, parts)) {
+                return false;
+            }
+            for (const string& part : parts) {
+                id = nodes[id].loaded ? child_named(id, part) : NO_NODE;
+                if (id == NO_NODE) {
+                    return false;
+                }
+            }
+            if (!nodes[id].loaded) {
+                return false;
+            }
+            was_expanded = nodes[id].expanded;
+            if (was_expanded && is_shown(id)) {
+                hide_children(id);
+            }
+            nodes[id].expanded = false;
+            drop_children(id);
+            serial = nodes[id].serial;
+        }
+        if (was_expanded) {
+            expand_node(id, serial);
+        }
+        return true;
+    }
+
+    void set_memory_budget(size_t bytes) {
+        std::lock_guard<std::mutex> lock(mtx);
+        budget = bytes;
+        enforce_budget();
+    }
+
+    TreeStats stats() const {
+        std::lock_guard<std::mutex> lock(mtx);
+        return TreeStats{live, visible.size(), memory_in_use(), budget, loads, evictions, nodes_evicted};
+    }
+};
@@ -0,0 +1,303 @@
+# Times the backend and UI hot paths on synthetic trees and compares them with a stored baseline.
+#
+#   python benchmarks/run.py --scale 0.01                # quick run
+#   python benchmarks/run.py --save-baseline             # record the numbers to compare against
+#   python benchmarks/run.py --only copy,remove          # a subset, by name
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "ui"))
+
+try:
+    import backend
+except ImportError:
+    print("❌ Error: 'backend' module not found. Build it first (see README).")
+    sys.exit(1)
+
+from trees import TreeSet, make_deep, remove_tree
+
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_ROOT = Path(tempfile.gettempdir()) / "file_ranger_bench"
+
+# Slowdown over the baseline reported as a regression
+DEFAULT_THRESHOLD = 0.15
+
+# Previews timed per run of the preview benchmark
+PREVIEW_FILES = 20
+
+class Benchmark:
+    """One timed operation: setup and teardown run outside the timing, once per repetition."""
+
+    def __init__(self, name: str, run, items: int = 1, setup=None, teardown=None, repeat=None):
+        self.name = name
+        self.run = run
+        self.items = items
+        self.setup = setup
+        self.teardown = teardown
+        self.repeat = repeat
+
+    def measure(self, repeat: int) -> dict:
+        runs = []
+        ok = True
+        error = ""
+        for _ in range(self.repeat or repeat):
+            if self.setup:
+                self.setup()
+            start = time.perf_counter()
+            try:
+                result = self.run()
+            except Exception as e:
+                result, error = False, str(e)
+            runs.append(time.perf_counter() - start)
+            if self.teardown:
+                self.teardown()
+            # Backend file operations report failure as False
+            if result is False:
+                ok = False
+        best = min(runs)
+        return {
+            "seconds": best,
+            "median": statistics.median(runs),
+            "runs": runs,
+            "items": self.items,
+            "items_per_second": self.items / best if best > 0 else None,
+            "ok": ok,
+            "error": error,
+        }
+
+def backend_benchmarks(trees: TreeSet) -> list:
+    wide = str(trees.wide)
+    wide_count = trees.shape["wide_files"]
+    listing = backend.list_directory(wide)
+    scratch = trees.scratch / "copy"
+
+    def clear_scratch():
+        remove_tree(scratch)
+
+    def copy_then(src):
+        return lambda: backend.copy_path(str(src), str(scratch))
+
+    def deep_copy():
+        make_deep(scratch, trees.shape["deep_levels"])
+
+    benchmarks = []
+    for mode in (backend.ListingMode.FAST, backend.ListingMode.STANDARD, backend.ListingMode.FULL):
+        benchmarks.append(Benchmark(f"list_directory/wide/{mode.name.lower()}",
+                                    lambda mode=mode: backend.list_directory(wide, mode=mode), wide_count))
+    benchmarks.append(Benchmark("list_directory_cached/wide/hit",
+                                lambda: backend.list_directory_cached(wide), wide_count,
+                                setup=lambda: backend.list_directory_cached(wide)))
+    for key in (backend.SortKey.NAME, backend.SortKey.SIZE, backend.SortKey.MTIME, backend.SortKey.EXTENSION):
+        benchmarks.append(Benchmark(f"merge_sort/wide/{key.name.lower()}",
+                                    lambda key=key: listing.sorted(key), wide_count))
+
+    for name, src, items in (("small", trees.small, trees.small_file_count()),
+                             ("huge", trees.huge, trees.shape["huge_files"]),
+                             ("deep", trees.deep, trees.shape["deep_levels"])):
+        benchmarks.append(Benchmark(f"copy_path/{name}", copy_then(src), items,
+                                    setup=clear_scratch, teardown=clear_scratch))
+        # Removal works on a fresh copy each time; deep trees are rebuilt directly since
+        # copying them is itself one of the things measured
+        make_copy = deep_copy if name == "deep" else copy_then(src)
+        benchmarks.append(Benchmark(f"remove_path_recursive/{name}",
+                                    lambda: backend.remove_path_recursive(str(scratch)), items,
+                                    setup=lambda make_copy=make_copy: (clear_scratch(), make_copy()),
+                                    teardown=clear_scratch))
+    return benchmarks
+
+async def measure_ui(trees: TreeSet, repeat: int) -> dict:
+    """Time the app's own code paths in a headless Textual session."""
+    # Keep the user's history, snapshots and index out of it, in both directions
+    with tempfile.TemporaryDirectory(prefix="file_ranger_bench_") as state:
+        os.environ["FILE_RANGER_CACHE_DIR"] = state
+        os.environ["FILE_RANGER_INDEX_ROOT"] = os.path.join(state, "index")
+        os.mkdir(os.environ["FILE_RANGER_INDEX_ROOT"])
+        return await measure_app(trees, repeat)
+
+async def measure_app(trees: TreeSet, repeat: int) -> dict:
+    from app import FileManagerApp
+    from file_list import FileList
+    from preview import preview_key
+
+    results = {}
+    app = FileManagerApp()
+    async with app.run_test(size=(160, 50)) as pilot:
+        middle = app.query_one("#middle-pane", FileList)
+
+        async def wait_for(condition, timeout=600.0):
+            deadline = time.perf_counter() + timeout
+            while not condition():
+                if time.perf_counter() > deadline:
+                    raise TimeoutError("the app did not finish in time")
+                await asyncio.sleep(0.001)
+
+        def record(name, runs, items):
+            best = min(runs)
+            results[name] = {"seconds": best, "median": statistics.median(runs), "runs": runs, "items": items,
+                             "items_per_second": items / best if best > 0 else None, "ok": True, "error": ""}
+
+        # Listing shown in the panes, cold (uncached) and from the listing cache
+        wide = str(trees.wide)
+        for cached in (False, True):
+            runs = []
+            for _ in range(repeat):
+                app.navigate_to(str(trees.root))
+                await wait_for(lambda: getattr(middle.entries, "path", None) == str(trees.root))
+                if not cached:
+                    backend.clear_directory_cache()
+                start = time.perf_counter()
+                app.navigate_to(wide)
+                await wait_for(lambda: getattr(middle.entries, "path", None) == wide)
+                runs.append(time.perf_counter() - start)
+            record(f"ui/refresh_ui/wide/{'cached' if cached else 'cold'}", runs, trees.shape["wide_files"])
+
+        # Formatting the rows on screen
+        runs = []
+        for _ in range(repeat):
+            middle._row_cache.clear()
+            start = time.perf_counter()
+            for y in range(middle.size.height):
+                middle.render_line(y)
+            runs.append(time.perf_counter() - start)
+        record("ui/row_building/wide", runs, middle.size.height)
+
+        # File previews: read, highlight and show, then the same file again from the cache
+        directory = trees.small / "dir_0000"
+        app.navigate_to(str(directory))
+        await wait_for(lambda: getattr(middle.entries, "path", None) == str(directory))
+        nodes = [middle.entries[i] for i in range(min(PREVIEW_FILES, len(middle.entries)))]
+        shown = {}
+        show_file_preview = app.show_file_preview
+
+        def timed_show(request, rendered):
+            shown[request[0]] = time.perf_counter()
+            show_file_preview(request, rendered)
+
+        app.show_file_preview = timed_show
+
+        def previews_idle():
+            return not any(worker.group == "preview" and not worker.is_finished for worker in app.workers)
+
+        cold, warm = [], []
+        for _ in range(repeat):
+            for node in nodes:
+                # The previous preview also renders its neighbours; let it finish so this one is really cold
+                await wait_for(previews_idle)
+                app.preview_cache.clear()
+                shown.clear()
+                start = time.perf_counter()
+                app.update_preview(node)
+                await wait_for(lambda: node.path in shown)
+                cold.append(shown[node.path] - start)
+            width, height = app.preview_size()
+            for node in nodes:
+                key = preview_key(node.path, node.mtime, width, height)
+                if not app.preview_cache.get(key):
+                    app.update_preview(node)
+                    await wait_for(lambda: app.preview_cache.get(key))
+                start = time.perf_counter()
+                app.update_preview(node)
+                warm.append(time.perf_counter() - start)
+        app.show_file_preview = show_file_preview
+        record("ui/update_preview/cold", cold, 1)
+        record("ui/update_preview/cached", warm, 1)
+        app.exit()
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> dict:
+    comparison = {}
+    for name, current in results.items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before or not before.get("seconds"):
+            continue
+        ratio = current["seconds"] / before["seconds"]
+        comparison[name] = {
+            "baseline_seconds": before["seconds"],
+            "seconds": current["seconds"],
+            "change": ratio - 1,
+            "regression": ratio > 1 + threshold,
+        }
+    return comparison
+
+def print_report(results: dict, comparison: dict) -> None:
+    print(f"\n{'benchmark':<36} {'best':>10} {'median':>10} {'items/s':>12} {'vs baseline':>12}")
+    for name, r in results.items():
+        rate = f"{r['items_per_second']:.0f}" if r["items_per_second"] else "-"
+        change = ""
+        if name in comparison:
+            c = comparison[name]
+            change = f"{c['change']:+.1%}" + (" !" if c["regression"] else "")
+        status = "" if r["ok"] else f"  FAILED {r['error']}".rstrip()
+        print(f"{name:<36} {r['seconds']:>9.4f}s {r['median']:>9.4f}s {rate:>12} {change:>12}{status}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the file manager's hot paths.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplier for tree sizes (1.0: 1M-file directory, 10k levels, 3 GiB of large files)")
+    parser.add_argument("--root", type=Path, default=DEFAULT_ROOT, help="where the synthetic trees are kept")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the best one is reported")
+    parser.add_argument("--only", default="", help="comma-separated name prefixes to run")
+    parser.add_argument("--no-ui", action="store_true", help="skip the benchmarks that drive the app")
+    parser.add_argument("--output", type=Path, default=Path("bench_output.json"))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown (fraction) reported as a regression")
+    args = parser.parse_args()
+
+    trees = TreeSet(args.root, args.scale)
+    trees.ensure()
+    prefixes = [p for p in args.only.split(",") if p]
+
+    def wanted(name):
+        return not prefixes or any(name.startswith(p) for p in prefixes)
+
+    results = {}
+    for bench in backend_benchmarks(trees):
+        if wanted(bench.name):
+            print(f"  {bench.name}...", flush=True)
+            results[bench.name] = bench.measure(args.repeat)
+    if not args.no_ui and wanted("ui"):
+        print("  ui...", flush=True)
+        ui_results = asyncio.run(measure_ui(trees, args.repeat))
+        results.update({name: r for name, r in ui_results.items() if wanted(name)})
+    remove_tree(trees.scratch)
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+    comparison = compare(results, baseline, args.threshold)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpus": os.cpu_count()},
+        "scale": args.scale,
+        "shape": trees.shape,
+        "benchmarks": results,
+        "comparison": comparison,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    print_report(results, comparison)
+    print(f"\nResults written to {args.output}")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+
+    regressions = [name for name, c in comparison.items() if c["regression"]]
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
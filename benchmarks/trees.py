@@ -0,0 +1,159 @@
+# Synthetic directory trees for the benchmarks, built once and reused between runs
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+# Tree shapes at --scale 1; counts and sizes are multiplied by the scale
+WIDE_FILES = 1_000_000
+DEEP_LEVELS = 10_000
+SMALL_DIRS = 100
+SMALL_FILES_PER_DIR = 1_000
+HUGE_FILES = 3
+HUGE_FILE_BYTES = 1 << 30
+
+# Extensions cycled through in the wide tree so every sort key has work to do
+WIDE_EXTENSIONS = (".txt", ".py", ".dat", ".json", ".md", "")
+
+# Body of every small file: enough source to fill a preview pane
+SMALL_FILE_TEXT = "".join(
+    f"def function_{i}(value):\n    # Returns the value scaled by {i}\n    return value * {i}\n\n" for i in range(40)
+)
+
+WRITE_CHUNK = 1 << 20
+
+def scaled(count: int, scale: float, minimum: int = 1) -> int:
+    return max(minimum, int(count * scale))
+
+def make_wide(root: Path, files: int) -> None:
+    """One directory holding `files` files with assorted extensions and sizes."""
+    root.mkdir(parents=True)
+    fd = os.open(root, os.O_RDONLY | os.O_DIRECTORY) if hasattr(os, "O_DIRECTORY") else None
+    for i in range(files):
+        name = f"file_{i:07d}{WIDE_EXTENSIONS[i % len(WIDE_EXTENSIONS)]}"
+        if fd is not None:
+            file_fd = os.open(name, os.O_WRONLY | os.O_CREAT, 0o644, dir_fd=fd)
+        else:
+            file_fd = os.open(root / name, os.O_WRONLY | os.O_CREAT, 0o644)
+        # Sparse sizes: size sorts get distinct keys without writing any data
+        os.ftruncate(file_fd, (i * 7919) % 65536)
+        os.close(file_fd)
+    if fd is not None:
+        os.close(fd)
+
+def make_deep(root: Path, levels: int) -> None:
+    """A chain of `levels` nested directories with a file at the bottom. Built relative to
+    open directory handles, since the full path is longer than PATH_MAX."""
+    root.mkdir(parents=True)
+    fd = os.open(root, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        for _ in range(levels):
+            os.mkdir("d", dir_fd=fd)
+            child = os.open("d", os.O_RDONLY | os.O_DIRECTORY, dir_fd=fd)
+            os.close(fd)
+            fd = child
+        leaf = os.open("leaf.txt", os.O_WRONLY | os.O_CREAT, 0o644, dir_fd=fd)
+        os.write(leaf, b"bottom\n")
+        os.close(leaf)
+    finally:
+        os.close(fd)
+
+def make_small(root: Path, dirs: int, per_dir: int) -> None:
+    """`dirs` directories of `per_dir` small Python source files."""
+    data = SMALL_FILE_TEXT.encode()
+    for d in range(dirs):
+        directory = root / f"dir_{d:04d}"
+        directory.mkdir(parents=True)
+        for i in range(per_dir):
+            (directory / f"module_{i:05d}.py").write_bytes(data)
+
+def make_huge(root: Path, files: int, size: int) -> None:
+    """A few large files of incompressible data."""
+    root.mkdir(parents=True)
+    chunk = os.urandom(WRITE_CHUNK)
+    for i in range(files):
+        with open(root / f"huge_{i}.bin", "wb") as f:
+            written = 0
+            while written < size:
+                n = min(WRITE_CHUNK, size - written)
+                f.write(chunk[:n])
+                written += n
+
+def remove_tree(path: Path) -> None:
+    """Remove a tree of any depth; shutil.rmtree recurses once per level and gives up on deep chains."""
+    if not path.exists() and not path.is_symlink():
+        return
+    if not path.is_dir() or path.is_symlink():
+        path.unlink()
+        return
+    if not hasattr(os, "O_DIRECTORY"):
+        shutil.rmtree(path)
+        return
+
+    # Depth-first with a stack of open directories instead of recursion
+    stack = [(os.open(path, os.O_RDONLY | os.O_DIRECTORY), None)]
+    while stack:
+        fd, name_in_parent = stack[-1]
+        descended = False
+        for entry in os.scandir(fd):
+            if entry.is_dir(follow_symlinks=False):
+                child = os.open(entry.name, os.O_RDONLY | os.O_DIRECTORY, dir_fd=fd)
+                stack.append((child, entry.name))
+                descended = True
+                break
+            os.unlink(entry.name, dir_fd=fd)
+        if descended:
+            continue
+        os.close(fd)
+        stack.pop()
+        if stack:
+            os.rmdir(name_in_parent, dir_fd=stack[-1][0])
+    os.rmdir(path)
+
+class TreeSet:
+    """The benchmark trees under one root, rebuilt only when the requested shape changes."""
+
+    def __init__(self, root: Path, scale: float):
+        self.root = root
+        self.scale = scale
+        self.shape = {
+            "wide_files": scaled(WIDE_FILES, scale),
+            "deep_levels": scaled(DEEP_LEVELS, scale, minimum=10),
+            "small_dirs": scaled(SMALL_DIRS, scale ** 0.5),
+            "small_files_per_dir": scaled(SMALL_FILES_PER_DIR, scale ** 0.5),
+            "huge_files": HUGE_FILES,
+            "huge_file_bytes": scaled(HUGE_FILE_BYTES, scale, minimum=1 << 20),
+        }
+        self.wide = root / "wide"
+        self.deep = root / "deep"
+        self.small = root / "small"
+        self.huge = root / "huge"
+        # Copies made (and removed) by the benchmarks themselves
+        self.scratch = root / "scratch"
+
+    @property
+    def _marker(self) -> Path:
+        return self.root / "shape.json"
+
+    def ensure(self, log=print) -> None:
+        """Build any tree that is missing or was built with another shape."""
+        try:
+            built = json.loads(self._marker.read_text())
+        except (OSError, ValueError):
+            built = {}
+        if built != self.shape:
+            log(f"Building benchmark trees under {self.root} (once per shape)...")
+            for path in (self.wide, self.deep, self.small, self.huge, self.scratch):
+                remove_tree(path)
+            self.root.mkdir(parents=True, exist_ok=True)
+            make_wide(self.wide, self.shape["wide_files"])
+            make_deep(self.deep, self.shape["deep_levels"])
+            make_small(self.small, self.shape["small_dirs"], self.shape["small_files_per_dir"])
+            make_huge(self.huge, self.shape["huge_files"], self.shape["huge_file_bytes"])
+            self._marker.write_text(json.dumps(self.shape))
+        remove_tree(self.scratch)
+        self.scratch.mkdir()
+
+    def small_file_count(self) -> int:
+        return self.shape["small_dirs"] * self.shape["small_files_per_dir"]
@@ -2,31 +2,482 @@
 #include<pybind11/pybind11.h>
 #include<pybind11/stl.h>
 #include "../backend/include/file_node.h"
+#include "../backend/include/directory_listing.h"
 #include "../backend/include/history_manager.h"
+#include "../backend/include/directory_cache.h"
+#include "../backend/include/scan_token.h"
+#include "../backend/include/perf_counters.h"
 #include "../backend/src/directory_tree.cpp"
+#include "../backend/src/disk_usage.cpp"
+#include "../backend/src/file_index.cpp"
+#include "../backend/src/content_search.cpp"
+#include "../backend/src/copy_job.cpp"
+#include "../backend/src/delete_job.cpp"
+#include "../backend/src/batch_ops.cpp"
+#include "../backend/src/duplicate_finder.cpp"
+#include "../backend/src/lazy_tree.cpp"
+#include "../backend/src/fs_watcher.cpp"
+#include "../backend/src/file_preview.cpp"
 
 namespace py = pybind11;
 
+// Keeps the owning listing alive for as long as Python holds a view of one of its columns
+struct ListingColumn {
+    std::shared_ptr<const void> owner;
+    const void* data;
+    size_t count;
+    py::ssize_t itemsize;
+    std::string format;
+
+    template <typename T>
+    ListingColumn(std::shared_ptr<const void> column_owner, const std::vector<T>& column)
+        : owner(std::move(column_owner)), data(column.data()), count(column.size()),
+          itemsize(sizeof(T)), format(py::format_descriptor<T>::format()) {}
+
+    size_t length() const {
+        return count;
+    }
+
+    py::buffer_info buffer() const {
+        return py::buffer_info(const_cast<void*>(data), itemsize, format, 1,
+                               {static_cast<py::ssize_t>(count)}, {itemsize}, true);
+    }
+};
+
 PYBIND11_MODULE(backend, m) {
     py::class_<FileNode, std::shared_ptr<FileNode>>(m, "FileNode")
     .def_readonly("name", &FileNode::name)
     .def_readonly("path", &FileNode::path)
     .def_readonly("is_directory", &FileNode::is_directory)
     .def_readonly("size", &FileNode::size)
+    .def_readonly("mtime", &FileNode::mtime)
+    .def_readonly("kind", &FileNode::kind)
+    .def_readonly("extension", &FileNode::extension)
+    .def_readonly("mode", &FileNode::mode)
+    .def_readonly("uid", &FileNode::uid)
+    .def_readonly("gid", &FileNode::gid)
+    .def_readonly("link_target", &FileNode::link_target)
     .def_readonly("children", &FileNode::children); // vector of shared_ptr<FileNode>
 
-    py::class_<HistoryManager>(m, "HistoryManager")
+    py::enum_<FileKind>(m, "FileKind")
+    .value("UNKNOWN", FileKind::UNKNOWN)
+    .value("DIRECTORY", FileKind::DIRECTORY)
+    .value("EMPTY", FileKind::EMPTY)
+    .value("TEXT", FileKind::TEXT)
+    .value("BINARY", FileKind::BINARY)
+    .value("EXECUTABLE", FileKind::EXECUTABLE)
+    .value("IMAGE", FileKind::IMAGE)
+    .value("AUDIO", FileKind::AUDIO)
+    .value("VIDEO", FileKind::VIDEO)
+    .value("ARCHIVE", FileKind::ARCHIVE)
+    .value("DOCUMENT", FileKind::DOCUMENT);
+
+    py::enum_<ListingMode>(m, "ListingMode")
+    .value("FAST", ListingMode::FAST)
+    .value("STANDARD", ListingMode::STANDARD)
+    .value("FULL", ListingMode::FULL);
+
+    py::enum_<SortKey>(m, "SortKey")
+    .value("NAME", SortKey::NAME)
+    .value("SIZE", SortKey::SIZE)
+    .value("MTIME", SortKey::MTIME)
+    .value("EXTENSION", SortKey::EXTENSION);
+
+    // Read-only view of one column of a listing, exposed through the buffer protocol
+    py::class_<ListingColumn>(m, "ListingColumn", py::buffer_protocol())
+    .def_buffer([](ListingColumn& col) { return col.buffer(); })
+    .def("__len__", [](const ListingColumn& col) { return col.length(); });
+
+    // Lazy sequence: entries are materialized as FileNode only when indexed
+    py::class_<DirectoryListing, std::shared_ptr<DirectoryListing>>(m, "DirectoryListing")
+    .def_readonly("path", &DirectoryListing::path)
+    .def_readonly("is_directory", &DirectoryListing::is_directory)
+    .def_readonly("sort_key", &DirectoryListing::sort_key)
+    .def_readonly("descending", &DirectoryListing::descending)
+    .def_property_readonly("mode", [](const DirectoryListing& l) { return l.data->mode; })
+    .def_property_readonly("syscalls", [](const DirectoryListing& l) { return l.data->syscalls; },
+                           "Filesystem calls made to read the listing")
+    .def("__len__", &DirectoryListing::size)
+    .def("__getitem__", [](const DirectoryListing& listing, py::ssize_t index) {
+        py::ssize_t n = static_cast<py::ssize_t>(listing.size());
+        if (index < 0) index += n;
+        if (index < 0 || index >= n) throw py::index_error();
+        return listing.entry(static_cast<size_t>(index));
+    })
+    .def("__getitem__", [](const DirectoryListing& listing, const py::slice& slice) {
+        size_t start = 0, stop = 0, step = 0, length = 0;
+        if (!slice.compute(listing.size(), &start, &stop, &step, &length)) throw py::error_already_set();
+        py::list result(length);
+        for (size_t i = 0; i < length; i++, start += step) {
+            result[i] = py::cast(listing.entry(start));
+        }
+        return result;
+    })
+    .def("name", [](const DirectoryListing& listing, size_t index) {
+        if (index >= listing.size()) throw py::index_error();
+        return string(listing.name(index));
+    }, "Name of an entry without materializing it")
+    .def("is_dir", [](const DirectoryListing& listing, size_t index) {
+        if (index >= listing.size()) throw py::index_error();
+        return listing.entry_is_directory(index);
+    }, "Whether an entry is a directory without materializing it")
+    .def("kind", [](const DirectoryListing& listing, size_t index) {
+        if (index >= listing.size()) throw py::index_error();
+        return listing.entry_kind(index);
+    }, "FileKind of an entry without materializing it")
+    .def("find", &DirectoryListing::find, "Display index of the entry with the given name, or -1")
+    .def("memory_usage", &DirectoryListing::memory_usage, "Bytes held by the listing")
+    .def("sorted", &sorted_listing, "Re-sort by another key without re-reading the directory",
+         py::arg("sort_key"), py::arg("descending") = false, py::call_guard<py::gil_scoped_release>())
+    // Columns are in scan order; `order` maps display position to scan row
+    .def_property_readonly("flags", [](std::shared_ptr<DirectoryListing> l) { return ListingColumn(l->data, l->data->flags); })
+    .def_property_readonly("sizes", [](std::shared_ptr<DirectoryListing> l) { return ListingColumn(l->data, l->data->sizes); })
+    .def_property_readonly("mtimes", [](std::shared_ptr<DirectoryListing> l) { return ListingColumn(l->data, l->data->mtimes); })
+    .def_property_readonly("inodes", [](std::shared_ptr<DirectoryListing> l) { return ListingColumn(l->data, l->data->inodes); })
+    .def_property_readonly("kinds", [](std::shared_ptr<DirectoryListing> l) { return ListingColumn(l->data, l->data->kinds); })
+    .def_property_readonly("modes", [](std::shared_ptr<DirectoryListing> l) { return ListingColumn(l->data, l->data->modes); })
+    .def_property_readonly("uids", [](std::shared_ptr<DirectoryListing> l) { return ListingColumn(l->data, l->data->uids); })
+    .def_property_readonly("gids", [](std::shared_ptr<DirectoryListing> l) { return ListingColumn(l->data, l->data->gids); })
+    .def_property_readonly("order", [](std::shared_ptr<DirectoryListing> l) { return ListingColumn(l, l->order); });
+
+    py::class_<ListingDiff>(m, "ListingDiff")
+    .def_readonly("removed", &ListingDiff::removed)
+    .def_readonly("added", &ListingDiff::added)
+    .def_readonly("changed", &ListingDiff::changed)
+    .def_readonly("comparable", &ListingDiff::comparable)
+    .def("__len__", [](const ListingDiff& d) { return d.removed.size() + d.added.size() + d.changed.size(); });
+
+    py::class_<ScanToken, std::shared_ptr<ScanToken>>(m, "ScanToken")
         .def(py::init<>())
+        .def("cancel", &ScanToken::cancel)
+        .def("is_cancelled", &ScanToken::is_cancelled);
+
+    py::class_<CacheStats>(m, "CacheStats")
+    .def_readonly("hits", &CacheStats::hits)
+    .def_readonly("misses", &CacheStats::misses)
+    .def_readonly("evictions", &CacheStats::evictions)
+    .def_readonly("invalidations", &CacheStats::invalidations)
+    .def_readonly("directories", &CacheStats::directories)
+    .def_readonly("entries", &CacheStats::entries);
+
+    py::class_<PerfStats>(m, "PerfStats")
+    .def_readonly("enabled", &PerfStats::enabled)
+    .def_readonly("listings", &PerfStats::listings)
+    .def_readonly("listing_ns", &PerfStats::listing_ns)
+    .def_readonly("entries_listed", &PerfStats::entries_listed)
+    .def_readonly("listing_syscalls", &PerfStats::listing_syscalls)
+    .def_readonly("kind_sniffs", &PerfStats::kind_sniffs)
+    .def_readonly("kind_cache_hits", &PerfStats::kind_cache_hits)
+    .def_readonly("sorts", &PerfStats::sorts)
+    .def_readonly("sort_ns", &PerfStats::sort_ns)
+    .def_readonly("entries_sorted", &PerfStats::entries_sorted)
+    .def_readonly("previews", &PerfStats::previews)
+    .def_readonly("preview_ns", &PerfStats::preview_ns)
+    .def_readonly("preview_bytes", &PerfStats::preview_bytes);
+
+    py::class_<UsageEntry>(m, "UsageEntry")
+    .def_readonly("name", &UsageEntry::name)
+    .def_readonly("path", &UsageEntry::path)
+    .def_readonly("is_directory", &UsageEntry::is_directory)
+    .def_readonly("bytes", &UsageEntry::bytes)
+    .def_readonly("files", &UsageEntry::files)
+    .def_readonly("complete", &UsageEntry::complete);
+
+    // Runs on its own C++ threads; poll snapshot() for partial totals
+    py::class_<DiskUsageScanner, std::shared_ptr<DiskUsageScanner>>(m, "DiskUsageScanner")
+        .def(py::init<const std::string&, size_t>(), py::arg("path"), py::arg("threads") = 0)
+        .def("start", &DiskUsageScanner::start)
+        .def("cancel", &DiskUsageScanner::cancel)
+        .def("wait", &DiskUsageScanner::wait, py::call_guard<py::gil_scoped_release>())
+        .def("is_done", &DiskUsageScanner::is_done)
+        .def("is_cancelled", &DiskUsageScanner::is_cancelled)
+        .def("error_count", &DiskUsageScanner::error_count)
+        .def("reused_files", &DiskUsageScanner::reused_files,
+             "Files sized from an earlier scan because their directory is unchanged")
+        .def("snapshot", &DiskUsageScanner::snapshot, "Partial totals of every child, largest first")
+        .def("total_bytes", &DiskUsageScanner::total_bytes)
+        .def("total_files", &DiskUsageScanner::total_files);
+
+    py::class_<SearchResult>(m, "SearchResult")
+    .def_readonly("path", &SearchResult::path)
+    .def_readonly("name", &SearchResult::name)
+    .def_readonly("is_directory", &SearchResult::is_directory)
+    .def_readonly("score", &SearchResult::score);
+
+    py::class_<IndexUpdateStats>(m, "IndexUpdateStats")
+    .def_readonly("entries", &IndexUpdateStats::entries)
+    .def_readonly("directories_scanned", &IndexUpdateStats::directories_scanned)
+    .def_readonly("directories_reused", &IndexUpdateStats::directories_reused)
+    .def_readonly("seconds", &IndexUpdateStats::seconds);
+
+    py::class_<FileIndex, std::shared_ptr<FileIndex>>(m, "FileIndex")
+        .def(py::init<const std::string&>(), py::arg("index_path"))
+        .def("load", &FileIndex::load, "Map an existing index file", py::call_guard<py::gil_scoped_release>())
+        .def("update", &FileIndex::update, "Incrementally rebuild the index for a root and save it",
+             py::arg("root"), py::arg("token") = py::none(), py::arg("threads") = 0,
+             py::call_guard<py::gil_scoped_release>())
+        .def("search", &FileIndex::search, "Ranked fuzzy matches by file name",
+             py::arg("query"), py::arg("limit") = 50, py::call_guard<py::gil_scoped_release>())
+        .def("is_loaded", &FileIndex::is_loaded)
+        .def("size", &FileIndex::size)
+        .def("root", &FileIndex::root)
+        .def("path", &FileIndex::path)
+        .def("last_update", &FileIndex::last_update);
+
+    py::class_<ContentMatch>(m, "ContentMatch")
+    .def_readonly("path", &ContentMatch::path)
+    .def_readonly("line_number", &ContentMatch::line_number)
+    .def_readonly("column", &ContentMatch::column)
+    // Files are not necessarily UTF-8; undecodable bytes become U+FFFD instead of raising
+    .def_property_readonly("line", [](const ContentMatch& match) {
+        return py::reinterpret_steal<py::str>(
+            PyUnicode_DecodeUTF8(match.line.data(), static_cast<py::ssize_t>(match.line.size()), "replace"));
+    });
+
+    // Runs on its own C++ threads; poll take_results() for new matches
+    py::class_<ContentSearch, std::shared_ptr<ContentSearch>>(m, "ContentSearch")
+        .def(py::init<const std::string&, const std::string&, bool, size_t, size_t>(),
+             py::arg("path"), py::arg("query"), py::arg("ignore_case") = false,
+             py::arg("threads") = 0, py::arg("limit") = 10000)
+        .def("start", &ContentSearch::start)
+        .def("cancel", &ContentSearch::cancel)
+        .def("wait", &ContentSearch::wait, py::call_guard<py::gil_scoped_release>())
+        .def("is_done", &ContentSearch::is_done)
+        .def("is_cancelled", &ContentSearch::is_cancelled)
+        .def("is_truncated", &ContentSearch::is_truncated)
+        .def("file_count", &ContentSearch::file_count)
+        .def("matched_file_count", &ContentSearch::matched_file_count)
+        .def("match_count", &ContentSearch::match_count)
+        .def("error_count", &ContentSearch::error_count)
+        .def("take_results", &ContentSearch::take_results, "Matches found since the previous call");
+
+    py::class_<DuplicateGroup>(m, "DuplicateGroup")
+    .def_readonly("size", &DuplicateGroup::size)
+    .def_readonly("hash", &DuplicateGroup::hash)
+    .def_readonly("paths", &DuplicateGroup::paths)
+    .def_property_readonly("reclaimable", &DuplicateGroup::reclaimable, "Bytes freed by keeping one copy");
+
+    py::class_<DuplicateProgress>(m, "DuplicateProgress")
+    .def_readonly("stage", &DuplicateProgress::stage)
+    .def_readonly("files_scanned", &DuplicateProgress::files_scanned)
+    .def_readonly("candidates", &DuplicateProgress::candidates)
+    .def_readonly("files_hashed", &DuplicateProgress::files_hashed)
+    .def_readonly("bytes_hashed", &DuplicateProgress::bytes_hashed)
+    .def_readonly("cache_hits", &DuplicateProgress::cache_hits)
+    .def_readonly("errors", &DuplicateProgress::errors)
+    .def_readonly("groups", &DuplicateProgress::groups)
+    .def_readonly("duplicate_files", &DuplicateProgress::duplicate_files)
+    .def_readonly("reclaimable_bytes", &DuplicateProgress::reclaimable_bytes)
+    .def_readonly("seconds", &DuplicateProgress::seconds)
+    .def_readonly("done", &DuplicateProgress::done)
+    .def_readonly("cancelled", &DuplicateProgress::cancelled);
+
+    // Runs on its own C++ threads; poll progress() until done, then read groups()
+    py::class_<DuplicateFinder, std::shared_ptr<DuplicateFinder>>(m, "DuplicateFinder")
+        .def(py::init<const std::string&, uint64_t, size_t>(),
+             py::arg("path"), py::arg("min_size") = 1, py::arg("threads") = 0)
+        .def("start", &DuplicateFinder::start)
+        .def("cancel", &DuplicateFinder::cancel)
+        .def("wait", &DuplicateFinder::wait, py::call_guard<py::gil_scoped_release>())
+        .def("is_done", &DuplicateFinder::is_done)
+        .def("is_cancelled", &DuplicateFinder::is_cancelled)
+        .def("progress", &DuplicateFinder::progress)
+        .def("groups", &DuplicateFinder::groups, "Groups of identical files, most reclaimable space first",
+             py::arg("limit") = 0);
+
+    py::class_<CopyProgress>(m, "CopyProgress")
+    .def_readonly("bytes_done", &CopyProgress::bytes_done)
+    .def_readonly("bytes_total", &CopyProgress::bytes_total)
+    .def_readonly("files_done", &CopyProgress::files_done)
+    .def_readonly("files_total", &CopyProgress::files_total)
+    .def_readonly("errors", &CopyProgress::errors)
+    .def_readonly("seconds", &CopyProgress::seconds)
+    .def_readonly("bytes_per_second", &CopyProgress::bytes_per_second)
+    .def_readonly("scanning", &CopyProgress::scanning)
+    .def_readonly("done", &CopyProgress::done)
+    .def_readonly("cancelled", &CopyProgress::cancelled);
+
+    py::class_<BatchResult>(m, "BatchResult")
+    .def_readonly("path", &BatchResult::path)
+    .def_readonly("destination", &BatchResult::destination)
+    .def_readonly("ok", &BatchResult::ok)
+    .def_readonly("error", &BatchResult::error);
+
+    // Runs on its own C++ threads; poll progress() while it copies
+    py::class_<CopyJob, std::shared_ptr<CopyJob>>(m, "CopyJob")
+        .def(py::init<const std::string&, const std::string&, size_t>(),
+             py::arg("src"), py::arg("dest"), py::arg("threads") = 0)
+        .def(py::init<const std::vector<std::pair<std::string, std::string>>&, size_t>(),
+             "One job copying many (src, dest) pairs", py::arg("pairs"), py::arg("threads") = 0)
+        .def("start", &CopyJob::start)
+        .def("cancel", &CopyJob::cancel)
+        .def("wait", &CopyJob::wait, py::call_guard<py::gil_scoped_release>())
+        .def("is_done", &CopyJob::is_done)
+        .def("succeeded", &CopyJob::succeeded)
+        .def("progress", &CopyJob::progress)
+        .def("error_messages", &CopyJob::error_messages)
+        .def("results", &CopyJob::results, "Outcome of each (src, dest) pair")
+        .def("item_count", &CopyJob::item_count)
+        .def_property_readonly("src", &CopyJob::source_path)
+        .def_property_readonly("dest", &CopyJob::destination_path);
+
+    py::class_<DeleteProgress>(m, "DeleteProgress")
+    .def_readonly("files_done", &DeleteProgress::files_done)
+    .def_readonly("directories_done", &DeleteProgress::directories_done)
+    .def_readonly("errors", &DeleteProgress::errors)
+    .def_readonly("seconds", &DeleteProgress::seconds)
+    .def_readonly("entries_per_second", &DeleteProgress::entries_per_second)
+    .def_readonly("done", &DeleteProgress::done)
+    .def_readonly("cancelled", &DeleteProgress::cancelled);
+
+    // Runs on its own threads; poll progress() from the UI
+    py::class_<DeleteJob, std::shared_ptr<DeleteJob>>(m, "DeleteJob")
+        .def(py::init<const std::vector<std::string>&, size_t>(), py::arg("paths"), py::arg("threads") = 0)
+        .def("start", &DeleteJob::start)
+        .def("cancel", &DeleteJob::cancel)
+        .def("wait", &DeleteJob::wait, py::call_guard<py::gil_scoped_release>())
+        .def("is_done", &DeleteJob::is_done)
+        .def("succeeded", &DeleteJob::succeeded)
+        .def("progress", &DeleteJob::progress)
+        .def("error_messages", &DeleteJob::error_messages)
+        .def("results", &DeleteJob::results, "Outcome of each path")
+        .def("item_count", &DeleteJob::item_count);
+
+    // wait_changes() blocks without the GIL; call it from a worker thread
+    py::class_<FsWatcher, std::shared_ptr<FsWatcher>>(m, "FsWatcher")
+        .def(py::init<int, int>(), py::arg("debounce_ms") = 100, py::arg("max_delay_ms") = 1000)
+        .def("watch", &FsWatcher::watch, "Replace the set of watched directories", py::arg("dirs"))
+        .def("watched_directories", &FsWatcher::watched_directories)
+        .def("wait_changes", &FsWatcher::wait_changes, "Next debounced batch of changed directories, or [] on timeout",
+             py::arg("timeout_ms"), py::call_guard<py::gil_scoped_release>())
+        .def("close", &FsWatcher::close)
+        .def("is_native", &FsWatcher::is_native);
+
+    py::class_<TextPreview>(m, "TextPreview")
+    .def_readonly("first_line", &TextPreview::first_line)
+    .def_readonly("line_count", &TextPreview::line_count)
+    .def_readonly("binary", &TextPreview::binary)
+    .def_readonly("more", &TextPreview::more)
+    .def_readonly("bytes_read", &TextPreview::bytes_read)
+    .def_readonly("error", &TextPreview::error)
+    // Lines may be cut mid-character; undecodable bytes become U+FFFD
+    .def_property_readonly("text", [](const TextPreview& preview) {
+        return py::reinterpret_steal<py::str>(
+            PyUnicode_DecodeUTF8(preview.text.data(), static_cast<py::ssize_t>(preview.text.size()), "replace"));
+    });
+
+    py::class_<TreeRow>(m, "TreeRow")
+    .def_readonly("name", &TreeRow::name)
+    .def_readonly("path", &TreeRow::path)
+    .def_readonly("depth", &TreeRow::depth)
+    .def_readonly("expanded", &TreeRow::expanded)
+    .def_readonly("loaded", &TreeRow::loaded)
+    .def_readonly("child_count", &TreeRow::child_count);
+
+    py::class_<TreeStats>(m, "TreeStats")
+    .def_readonly("nodes", &TreeStats::nodes)
+    .def_readonly("visible_rows", &TreeStats::visible_rows)
+    .def_readonly("memory_usage", &TreeStats::memory_usage)
+    .def_readonly("memory_budget", &TreeStats::memory_budget)
+    .def_readonly("loads", &TreeStats::loads)
+    .def_readonly("evictions", &TreeStats::evictions)
+    .def_readonly("nodes_evicted", &TreeStats::nodes_evicted);
+
+    // Directories are listed on expand, without the GIL; rows are addressed by visible position
+    py::class_<LazyTree, std::shared_ptr<LazyTree>>(m, "LazyTree")
+        .def(py::init<const std::string&, size_t>(), py::arg("root"), py::arg("memory_budget") = DEFAULT_TREE_BUDGET)
+        .def_property_readonly("root", &LazyTree::root)
+        .def("row_count", &LazyTree::row_count)
+        .def("rows", &LazyTree::rows, "Visible rows from start", py::arg("start"), py::arg("count"))
+        .def("expand", &LazyTree::expand, "Rows added below the row, or -1", py::arg("row"),
+             py::call_guard<py::gil_scoped_release>())
+        .def("collapse", &LazyTree::collapse, "Rows removed below the row, or -1", py::arg("row"))
+        .def("reveal", &LazyTree::reveal, "Expand the ancestors of a directory and return its row, or -1",
+             py::arg("path"), py::call_guard<py::gil_scoped_release>())
+        .def("reload", &LazyTree::reload, "Re-list a loaded directory after it changed", py::arg("path"),
+             py::call_guard<py::gil_scoped_release>())
+        .def("set_memory_budget", &LazyTree::set_memory_budget, py::arg("bytes"))
+        .def("stats", &LazyTree::stats);
+
+    py::class_<JumpCandidate>(m, "JumpCandidate")
+    .def_readonly("path", &JumpCandidate::path)
+    .def_readonly("score", &JumpCandidate::score)
+    .def_readonly("rank", &JumpCandidate::rank)
+    .def_readonly("last_access", &JumpCandidate::last_access);
+
+    py::class_<HistoryManager>(m, "HistoryManager")
+        .def(py::init<size_t>(), py::arg("capacity") = 1000)
         .def("init", &HistoryManager::init)
         .def("push", &HistoryManager::push)
-        .def("go_back", &HistoryManager::go_back)
-        .def("go_forward", &HistoryManager::go_forward)
-        .def("current", &HistoryManager::current);
+        .def("go_back", &HistoryManager::go_back, py::arg("steps") = 1)
+        .def("go_forward", &HistoryManager::go_forward, py::arg("steps") = 1)
+        .def("current", &HistoryManager::current)
+        .def("back_entries", &HistoryManager::back_entries, py::arg("limit") = 50)
+        .def("forward_entries", &HistoryManager::forward_entries, py::arg("limit") = 50)
+        .def("jump", &HistoryManager::jump, "Visited directories matching the keywords, best frecency first",
+             py::arg("query"), py::arg("limit") = 50)
+        .def("forget", &HistoryManager::forget, "Drop a directory from the frecency table")
+        .def("size", &HistoryManager::size, "Directories in the frecency table")
+        .def("save", &HistoryManager::save, "Write the frecency table and back stack to a file")
+        .def("load", &HistoryManager::load, "Replace the history with one saved by an earlier session");
 
-    m.def("list_directory", &list_directory, "Builds a directory tree from the given path");
+    // Listings release the GIL so the UI keeps running while a slow directory is scanned
+    m.def("list_directory", &list_directory, "Builds a directory tree from the given path",
+          py::arg("dir_path"), py::arg("token") = py::none(), py::arg("sort_key") = SortKey::NAME,
+          py::arg("descending") = false, py::arg("mode") = ListingMode::STANDARD,
+          py::call_guard<py::gil_scoped_release>());
+    m.def("list_directory_cached", &list_directory_cached, "Like list_directory, but served from the LRU cache while the directory mtime is unchanged",
+          py::arg("dir_path"), py::arg("token") = py::none(), py::arg("sort_key") = SortKey::NAME,
+          py::arg("descending") = false, py::arg("mode") = ListingMode::STANDARD,
+          py::call_guard<py::gil_scoped_release>());
+    m.def("diff_listings", &diff_listings, "Entries removed, added and changed between two listings of one directory",
+          py::arg("old_listing"), py::arg("new_listing"), py::call_guard<py::gil_scoped_release>());
+    m.def("invalidate_directory", &invalidate_directory, "Drop the cached listing of a directory");
+    m.def("invalidate_path", &invalidate_path, "Drop cached listings affected by a change to the given path");
+    m.def("clear_directory_cache", &clear_directory_cache, "Drop every cached listing");
+    m.def("set_directory_cache_capacity", &set_directory_cache_capacity, "Bound the cache by directory count and total entries",
+          py::arg("max_directories"), py::arg("max_entries") = 1000000);
+    m.def("directory_cache_stats", &directory_cache_stats, "Hit/miss/eviction counters of the listing cache");
+    m.def("set_profiling", [](bool on) { perf_counters().enabled.store(on, std::memory_order_relaxed); },
+          "Turn the listing, sort and preview counters on or off", py::arg("enabled"));
+    m.def("perf_stats", []() { return perf_counters().snapshot(); }, "Backend counters collected while profiling");
+    m.def("reset_perf_stats", []() { perf_counters().reset(); }, "Zero the backend profiling counters");
+    m.def("clear_file_kind_cache", []() { file_kind_cache().clear(); }, "Drop every remembered file kind");
+    // For entries that are not on disk, such as archive members
+    m.def("kind_from_name", [](const std::string& name) {
+        return kind_from_extension(to_lower(name_extension(name)));
+    }, "File kind guessed from the extension of a name", py::arg("name"));
+    m.def("kind_from_content", [](py::bytes data) {
+        std::string_view view(data);
+        return kind_from_content(reinterpret_cast<const unsigned char*>(view.data()), view.size());
+    }, "File kind sniffed from the first bytes of a file", py::arg("data"));
+    m.def("clear_disk_usage_cache", []() { disk_usage_cache().clear(); }, "Drop every cached directory total");
+    m.def("clear_file_hash_cache", []() { file_hash_cache().clear(); }, "Drop every remembered duplicate-search hash");
+    m.def("xxh64", [](py::bytes data, uint64_t seed) {
+        std::string_view view(data);
+        return xxh64(view.data(), view.size(), seed);
+    }, "XXH64 of a byte string, as used by the duplicate finder", py::arg("data"), py::arg("seed") = 0);
     m.def("make_directory_recursive", &make_directory_recursive, "Create directories recursively");
-    m.def("remove_path_recursive", &remove_path_recursive, "Remove file or directory recursively");
-    m.def("rename_path", &rename_path, "Rename/move a path");
-    m.def("copy_path", &copy_path, "Copy file or directory (recursive)");
+    // Slow mutators release the GIL so the job queue can run them on worker threads
+    m.def("remove_path_recursive", &remove_path_recursive, "Remove file or directory recursively",
+          py::call_guard<py::gil_scoped_release>());
+    m.def("rename_path", &rename_path, "Rename/move a path", py::call_guard<py::gil_scoped_release>());
+    m.def("copy_path", &copy_path, "Copy file or directory (recursive)", py::call_guard<py::gil_scoped_release>());
+    // Whole selections in one call, spread over C++ threads; one BatchResult per path, in order
+    m.def("copy_paths", &copy_paths, "Copy paths into a directory",
+          py::arg("srcs"), py::arg("dest_dir"), py::arg("threads") = 0, py::call_guard<py::gil_scoped_release>());
+    m.def("move_paths", &move_paths, "Move paths into a directory, copying across filesystems",
+          py::arg("srcs"), py::arg("dest_dir"), py::arg("threads") = 0, py::call_guard<py::gil_scoped_release>());
+    m.def("remove_paths", &remove_paths, "Remove files or directories recursively",
+          py::arg("paths"), py::arg("threads") = 0, py::call_guard<py::gil_scoped_release>());
+    m.def("trash_paths", &trash_paths, "Rename paths into the trash on their filesystem, emptied in the background",
+          py::arg("paths"), py::arg("threads") = 0, py::call_guard<py::gil_scoped_release>());
+    m.def("trash_directory", &trash_directory, "Trash a path would be renamed into, or \"\" if it has none",
+          py::arg("path"));
+    m.def("wait_trash_purge", &wait_trash_purge, "Wait for the background trash purge; False on timeout",
+          py::arg("timeout_ms"), py::call_guard<py::gil_scoped_release>());
+    m.def("read_text_preview", &read_text_preview, "Read just the lines a preview pane shows, without the GIL",
+          py::arg("path"), py::arg("first_line") = 1, py::arg("max_lines") = 60, py::arg("max_line_bytes") = 512,
+          py::call_guard<py::gil_scoped_release>());
     m.def("touch_file", &touch_file, "Create an empty file or update mtime");
 }
\ No newline at end of file
@@ -47,10 +47,12 @@ def build_executable(backend_filename):
     # We add the backend shared object to the root of the bundle (.)
     add_binary = f"ui/{backend_filename}{sep}."
     
+    # One directory rather than one file: a one-file build unpacks itself into a
+    # temporary directory on every launch, which dominates startup time
     cmd = [
         "pyinstaller",
         "--name", "file_ranger",
-        "--onefile",
+        "--onedir",
         "--clean",
         "--add-binary", f'"{add_binary}"',
         "--hidden-import", "backend",
@@ -61,7 +63,7 @@ def build_executable(backend_filename):
     run_command(full_cmd)
     
     print("\n✅ Build Complete!")
-    dist_path = Path("dist") / ("file_ranger.exe" if platform.system() == "Windows" else "file_ranger")
+    dist_path = Path("dist") / "file_ranger" / ("file_ranger.exe" if platform.system() == "Windows" else "file_ranger")
     print(f"Executable is located at: {dist_path.absolute()}")
 
 if __name__ == "__main__":
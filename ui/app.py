@@ -1,17 +1,39 @@
+import argparse
+import fnmatch
 import os
+import re
+import stat
 import sys
 from pathlib import Path
 from datetime import datetime
+from time import perf_counter
 
+from textual import events, work
 from textual.app import App, ComposeResult
+from textual.binding import Binding
 from textual.containers import Container, Horizontal, Vertical
-from textual.widgets import Header, Footer, Static, OptionList
-from textual.widgets.option_list import Option
+from textual.widgets import Header, Footer, Static, Input
 from textual.reactive import reactive
+from textual.message import Message
+from textual.worker import get_current_worker
 from rich.text import Text
-from rich.syntax import Syntax
 from input_modal import InputModal
+from file_list import FileList
+from tree_pane import TreeList
 from icons import get_icon
+from formatting import human_size, owner_name
+from find_modal import FuzzyFindModal
+from jump_modal import JumpModal
+from duplicates_modal import DuplicatesModal
+from archive import can_browse, list_archive_directory, real_directory, split_archive_path
+from storage import cache_file
+from jobs import (JobQueue, CopyJob, MoveJob, DeleteJob, RenameJob, BatchCopyJob, BatchMoveJob,
+                  BatchDeleteJob, ExtractJob, TrashJob, DONE, CANCELLED)
+from jobs_panel import JobsPanel
+from preview import DEFAULT_PREVIEW_SIZE, PreviewCache, preview_key, render_file_preview
+from profiler import KEY_TO_LISTING, LISTING_CALL, PREVIEW_RENDER, profiler
+from profiler_panel import ProfilerPanel
+from snapshot import SnapshotListing, load_snapshots, save_snapshots
 
 # Try to import the C++ backend
 try:
@@ -20,17 +42,54 @@ except ImportError:
     print("❌ Error: 'backend' module not found.")
     sys.exit(1)
 
+# Order cycled through by the sort keybinding
+SORT_KEYS = (backend.SortKey.NAME, backend.SortKey.SIZE, backend.SortKey.MTIME, backend.SortKey.EXTENSION)
+
+# Rows and bar width of the disk usage breakdown in the preview pane
+DU_ROWS = 30
+DU_BAR_WIDTH = 10
+
+# Delay before a changed content-search query restarts the search, and the result poll interval
+SEARCH_DEBOUNCE = 0.2
+SEARCH_POLL = 0.1
+# Interval between job progress updates in the status bar and jobs panel
+JOB_POLL = 0.25
+
+# Filesystem watcher: burst debounce, longest delay of a batch, and the wait between shutdown checks
+WATCH_DEBOUNCE_MS = 100
+WATCH_MAX_DELAY_MS = 1000
+WATCH_TIMEOUT_MS = 500
+
+# Tree covered by the fuzzy-find index
+INDEX_ROOT = os.environ.get("FILE_RANGER_INDEX_ROOT", str(Path.home()))
+
+# Chrome trace file written from startup, with profiling on for the whole session
+TRACE_FILE = os.environ.get("FILE_RANGER_TRACE")
+# Interval between profiler overlay updates
+PROFILE_POLL = 0.5
+
+# Most frecent directories listed into the cache after startup
+PREWARM_DIRECTORIES = 8
+
+# Memory the directory tree pane may hold before collapsed subtrees are dropped
+TREE_MEMORY_BUDGET = int(os.environ.get("FILE_RANGER_TREE_MEMORY_MB", "64")) * 1024 * 1024
+
 class StatusBar(Static):
     """A custom status bar widget."""
     
     def compose(self) -> ComposeResult:
         yield Static(id="status-path")
+        yield Static(id="status-job")
         yield Static(id="status-info")
 
     def update_status(self, path: str, info: str):
         self.query_one("#status-path").update(f" {path}")
         self.query_one("#status-info").update(f"{info} ")
 
+    def update_job(self, text: str):
+        """Show progress of a background file operation (empty to hide it)."""
+        self.query_one("#status-job").update(f"{text} " if text else "")
+
 class FileManagerApp(App):
     CSS = """
     Screen {
@@ -53,14 +112,46 @@ class FileManagerApp(App):
         color: #666;
     }
 
+    /* Directory tree, shown in place of the parent listing */
+    #tree-pane {
+        width: 20%;
+        height: 100%;
+        background: #1e1e1e;
+        border-right: solid #333;
+        color: #888;
+        display: none;
+    }
+
+    #main-container.tree-view #tree-pane {
+        display: block;
+    }
+
+    #main-container.tree-view #left-pane {
+        display: none;
+    }
+
     /* Middle Pane (Current) */
-    #middle-pane {
+    #middle-column {
         width: 50%;
         height: 100%;
-        background: #262626;
         border-right: solid #333;
     }
 
+    #middle-pane {
+        width: 100%;
+        height: 1fr;
+        background: #262626;
+    }
+
+    /* Content search query, shown while the middle pane lists matches */
+    #search-input {
+        display: none;
+    }
+
+    #middle-column.searching #search-input {
+        display: block;
+    }
+
     /* Right Pane (Preview) */
     #right-pane {
         width: 30%;
@@ -69,20 +160,20 @@ class FileManagerApp(App):
         padding: 0 1;
     }
 
-    /* OptionList Styling */
-    OptionList {
+    /* FileList Styling */
+    FileList {
         background: #3e3e3e;
         border: none;
         scrollbar-gutter: stable;
         color: #000;
     }
     
-    OptionList:focus {
+    FileList:focus {
         border: none;
     }
 
     /* Remove the default highlight to use our custom one */
-    .option-list--highlighted {
+    FileList > .file-list--highlighted {
         background: #3e3e3e;
         color: white;
         text-style: bold;
@@ -98,12 +189,18 @@ class FileManagerApp(App):
     }
 
     #status-path {
-        width: 70%;
+        width: 1fr;
         content-align: left middle;
     }
 
+    #status-job {
+        width: auto;
+        background: #005a9e;
+    }
+
     #status-info {
-        width: 30%;
+        width: auto;
+        min-width: 30%;
         content-align: right middle;
     }
     
@@ -115,6 +212,11 @@ class FileManagerApp(App):
         text-style: bold;
         margin-bottom: 1;
     }
+
+    /* Preview Content fills the pane; previews are rendered for its size */
+    #preview-content {
+        height: 1fr;
+    }
     """
 
     BINDINGS = [
@@ -128,11 +230,29 @@ class FileManagerApp(App):
         ("right", "select_item", "Enter"), 
         ("L", "go_forward", "Forward"),
         ("d", "delete_item", "Delete"),
+        Binding("D", "delete_in_place", "Delete In Place", show=False),
         ("r", "rename_item", "Rename"),
         ("n", "new_file", "New File"),
         ("N", "new_directory", "New Folder"),
         ("c", "copy_item", "Copy"),
+        ("m", "cut_item", "Cut"),
         ("p", "paste_item", "Paste"),
+        ("space", "toggle_mark", "Mark"),
+        ("plus", "mark_pattern", "Mark Pattern"),
+        ("minus", "clear_marks", "Unmark All"),
+        ("s", "cycle_sort", "Sort"),
+        ("S", "reverse_sort", "Reverse Sort"),
+        ("u", "disk_usage", "Disk Usage"),
+        ("F", "find_duplicates", "Duplicates"),
+        ("t", "toggle_tree", "Tree"),
+        ("f", "find_file", "Find"),
+        ("z", "jump_directory", "Jump"),
+        ("/", "content_search", "Search"),
+        ("x", "cancel_job", "Cancel Job"),
+        ("J", "toggle_jobs", "Jobs"),
+        ("i", "toggle_details", "Details"),
+        Binding("T", "toggle_profiler", "Profiler", show=False),
+        Binding("escape", "close_search", "Close Search", show=False),
     ]
 
     # Reactive state for current path
@@ -141,152 +261,514 @@ class FileManagerApp(App):
     # Track the folder we just exited to highlight it in the parent view
     last_exited_path = None
     
-    clipboard_path = None
+    # Paths copied or cut, pasted together
+    clipboard_paths = ()
+    # Paste moves instead of copying when the clipboard was filled by cut
+    clipboard_cut = False
+
+    # Paths marked in the current directory; copy, cut and delete act on all of them
+    marked = frozenset()
+
+    # Listing order, applied by the backend sort
+    sort_key = backend.SortKey.NAME
+    sort_descending = False
+
+    # Detail view: permissions, owner, size and mtime columns in the middle pane
+    detail_view = False
+
+    # Cancellation tokens of the running directory and preview scans
+    scan_token = None
+    preview_token = None
+
+    # Cancellation token of the background index update
+    index_token = None
+
+    # Content search shown in the middle pane instead of the listing
+    search_mode = False
+    search_root = None
+    content_search = None
+    search_timer = None
+    search_debounce = None
+
+    # Directory listed in the preview pane, watched along with the current and parent ones
+    preview_dir = None
+
+    # File (path, mtime, size, matched line, kind) the preview pane is waiting for, if any
+    preview_request = None
+
+    # Timer polling the job queue while it has work
+    job_timer = None
+
+    # Running disk usage scan shown in the preview pane, and its refresh timer
+    du_scanner = None
+    du_timer = None
+
+    # Latest listings of the current and parent directories, saved for the next startup
+    shown_listings = ()
+
+    # Directory tree shown in the left pane instead of the parent listing, once opened
+    directory_tree = None
+
+    # Keypress the running scan answers (profiling only), and the overlay refresh timer
+    scan_key_start = None
+    profile_timer = None
+
+    class DirectoriesChanged(Message):
+        """Posted by the watcher thread with a debounced batch of changed directories."""
+
+        def __init__(self, directories) -> None:
+            super().__init__()
+            self.directories = directories
 
     def compose(self) -> ComposeResult:
         """Create the 3-pane layout."""
         yield StatusBar()
         with Horizontal(id="main-container"):
-            yield OptionList(id="left-pane", disabled=True)
-            yield OptionList(id="middle-pane")
+            yield FileList(self.format_option, id="left-pane", disabled=True)
+            yield TreeList(self.format_tree_row, id="tree-pane")
+            with Vertical(id="middle-column"):
+                yield FileList(self.format_option, id="middle-pane")
+                yield Input(id="search-input", placeholder="Search in files (lowercase ignores case)")
             with Vertical(id="right-pane"):
                 yield Static(id="preview-title", content="")
                 yield Static(id="preview-content", expand=True)
+        yield JobsPanel(id="jobs-panel")
+        yield ProfilerPanel(id="profiler-panel")
         yield Footer()
 
     def on_mount(self) -> None:
         """Initialize the app."""
         self.title = "DSA File Manager"
-        # Initialize C++ History Manager
+        if TRACE_FILE:
+            profiler.open_trace(TRACE_FILE)
+            profiler.enable(True)
+        # Copies, moves, deletes and renames run in the background
+        self.job_queue = JobQueue()
+        self.preview_cache = PreviewCache()
+        # Changes made by other programs reach the panes through the watcher;
+        # created first since the first read of current_path lists the panes
+        self.fs_watcher = backend.FsWatcher(WATCH_DEBOUNCE_MS, WATCH_MAX_DELAY_MS)
+        self.watch_filesystem()
+        # The first frame shows the last session's listings; the first read of current_path
+        # starts the real listing, which replaces them
+        self.show_snapshot(self.current_path)
+        # Navigation history and visited-directory frecency, carried over from the last session
         self.history = backend.HistoryManager()
+        self.history.load(str(cache_file("history.txt")))
         self.history.init(self.current_path)
-        self.refresh_ui()
         self.query_one("#middle-pane").focus()
 
+        self.file_index = backend.FileIndex(str(cache_file("index.bin")))
+        # Index work and cache warming wait for the first frame rather than competing with it
+        self.call_after_refresh(self.start_file_index)
+        self.call_after_refresh(self.prewarm_frecent)
+
+    def start_file_index(self) -> None:
+        """Map the existing index, then bring it up to date in the background."""
+        self.file_index.load()
+        self.index_token = backend.ScanToken()
+        self.update_file_index(self.index_token)
+
+    def prewarm_frecent(self) -> None:
+        """List the directories visited most, so revisiting them is served from the cache."""
+        self.prewarm_listings([c.path for c in self.history.jump("", PREWARM_DIRECTORIES)])
+
+    @work(thread=True, exclusive=True, group="prewarm")
+    def prewarm_listings(self, paths) -> None:
+        """Fill the listing cache for directories likely to be opened next."""
+        worker = get_current_worker()
+        for path in paths:
+            if worker.is_cancelled:
+                return
+            self.get_directory_contents(path)
+
+    def show_snapshot(self, path: str) -> None:
+        """Fill the panes from the snapshot saved by the last session, if it has this directory."""
+        current = Path(path)
+        parent = str(current.parent) if current.parent != current else None
+        snapshots = load_snapshots(path, *([parent] if parent else []))
+        if parent in snapshots:
+            left_list = self.query_one("#left-pane", FileList)
+            left_list.set_entries(snapshots[parent])
+            index = snapshots[parent].find(current.name)
+            if index >= 0:
+                left_list.highlighted = index
+        if path in snapshots and snapshots[path]:
+            middle_list = self.query_one("#middle-pane", FileList)
+            middle_list.set_entries(snapshots[path])
+            middle_list.highlighted = 0
+
+    def on_unmount(self) -> None:
+        self.fs_watcher.close()
+        profiler.close_trace()
+        self.history.save(str(cache_file("history.txt")))
+        save_snapshots(self.shown_listings)
+        if self.index_token is not None:
+            self.index_token.cancel()
+        # A cancelled copy removes its unfinished files
+        self.job_queue.cancel_all()
+        for job in self.job_queue.jobs:
+            if isinstance(job, (CopyJob, ExtractJob)):
+                job.wait()
+
+    async def on_event(self, event: events.Event) -> None:
+        # Keypress latency is measured from when the app receives the key
+        if profiler.enabled and isinstance(event, events.Key) and not event.is_forwarded:
+            profiler.key_pressed(perf_counter())
+        await super().on_event(event)
+
+    @work(thread=True, exclusive=True, group="watch")
+    def watch_filesystem(self) -> None:
+        """Forward batches of filesystem changes to the UI until the app exits."""
+        worker = get_current_worker()
+        while not worker.is_cancelled:
+            changed = self.fs_watcher.wait_changes(WATCH_TIMEOUT_MS)
+            if changed:
+                self.post_message(self.DirectoriesChanged(changed))
+
+    def update_watches(self) -> None:
+        """Watch exactly the directories on screen."""
+        current = Path(self.current_path)
+        dirs = [str(current), str(current.parent)]
+        if self.preview_dir:
+            dirs.append(self.preview_dir)
+        # Inside an archive, the directory holding the archive file is watched instead
+        self.fs_watcher.watch(list(dict.fromkeys(real_directory(d) for d in dirs)))
+
+    def on_file_manager_app_directories_changed(self, message: DirectoriesChanged) -> None:
+        # The watcher already dropped these listings from the cache
+        changed = {Path(d) for d in message.directories}
+        current = Path(self.current_path)
+        if self.tree_shown():
+            self.reload_tree(message.directories)
+        if current in changed or current.parent in changed or Path(real_directory(self.current_path)) in changed:
+            self.refresh_ui()
+        elif self.preview_dir and Path(self.preview_dir) in changed and self.du_scanner is None:
+            node = self.get_selected_node()
+            if node and node.path == self.preview_dir:
+                self.update_preview(node)
+
+    @work(thread=True, exclusive=True, group="index")
+    def update_file_index(self, token) -> None:
+        """Incrementally rebuild the on-disk file index off the UI thread."""
+        self.file_index.update(INDEX_ROOT, token)
+
     def watch_current_path(self, old_path: str, new_path: str) -> None:
+        self.marked = frozenset()
+        self.close_search()
         self.refresh_ui()
 
-    def get_directory_contents(self, path: str):
+    def get_directory_contents(self, path: str, token=None, mode=backend.ListingMode.STANDARD):
         """Helper to get sorted contents using C++ backend"""
         try:
-            node = backend.list_directory(path)
-            # Backend now returns sorted children (directories first, case-insensitive)
-            return node.children
+            # Archives list from their member table, read once per archive version
+            if split_archive_path(path) is not None:
+                return list_archive_directory(path, self.sort_key, self.sort_descending)
+            # Cached listing: unchanged directories are not re-scanned on every keypress.
+            # The listing is a lazy sequence; entries are materialized only when indexed.
+            if not profiler.enabled:
+                return backend.list_directory_cached(path, token, self.sort_key, self.sort_descending, mode)
+            start = perf_counter()
+            contents = backend.list_directory_cached(path, token, self.sort_key, self.sort_descending, mode)
+            profiler.record(LISTING_CALL, perf_counter() - start, path=path, mode=mode.name, entries=len(contents))
+            return contents
         except Exception as e:
             return []
 
+    def names_only_mode(self):
+        """Listing mode for panes that show just names: no stat per entry unless the sort needs one."""
+        if self.sort_key in (backend.SortKey.SIZE, backend.SortKey.MTIME):
+            return backend.ListingMode.STANDARD
+        return backend.ListingMode.FAST
+
     def format_option(self, node, is_selected=False) -> Text:
         """Format a file option with icon and color."""
-        icon = get_icon(node.name, node.is_directory)
+        icon = get_icon(node.name, node.is_directory, node.extension, node.kind)
         
-        if node.is_directory:
+        if self.marked and node.path in self.marked:
+            style = "bold yellow"
+        elif node.is_directory:
             style = "bold blue" if is_selected else "blue"
         else:
             style = "white"
             
+        # Only FULL listings (the middle pane in detail view) carry a mode
+        if self.detail_view and node.mode:
+            size = "-" if node.is_directory else human_size(node.size)
+            mtime = datetime.fromtimestamp(node.mtime).strftime("%Y-%m-%d %H:%M")
+            text = Text(f"{stat.filemode(node.mode)} {owner_name(node.uid):<8.8} {size:>7} {mtime}  ", style="dim")
+            text.append(f"{icon} {node.name}", style=style)
+            if node.link_target:
+                text.append(f" -> {node.link_target}", style="cyan")
+            return text
+
         text = Text(f"{icon} {node.name}", style=style)
         return text
 
+    def format_tree_row(self, row) -> Text:
+        """A directory in the tree pane, indented by depth, with its expand state."""
+        if row.expanded:
+            marker = "▾"
+        elif not row.loaded or row.child_count:
+            marker = "▸"
+        else:
+            marker = " "
+        icon = get_icon(row.name, True, "", backend.FileKind.DIRECTORY)
+        style = "bold white" if row.path == self.current_path else "blue"
+        return Text(f"{'  ' * row.depth}{marker} {icon} {row.name}", style=style)
+
     def refresh_ui(self):
-        path_obj = Path(self.current_path)
-        
-        # Update Status Bar
-        try:
-            current_contents = self.get_directory_contents(self.current_path)
-            item_count = len(current_contents)
-            self.query_one(StatusBar).update_status(self.current_path, f"{item_count} items")
-        except:
-            self.query_one(StatusBar).update_status(self.current_path, "Error")
-            current_contents = []
+        """Start listing the current directory on a worker thread."""
+        # Cancel the scan of the directory we just left, even mid-listing
+        if self.scan_token is not None:
+            self.scan_token.cancel()
+        self.scan_token = backend.ScanToken()
+        self.scan_key_start = profiler.claim_key() if profiler.enabled else None
 
-        # 1. Update Left Pane (Parent)
-        left_list = self.query_one("#left-pane", OptionList)
-        left_list.clear_options()
-        
-        parent_path = path_obj.parent
-        if parent_path != path_obj: # If not root
-            try:
-                parent_contents = self.get_directory_contents(str(parent_path))
-                for node in parent_contents:
-                    left_list.add_option(Option(self.format_option(node), id=node.path))
-                    # Highlight the folder we are currently inside
-                    if node.name == path_obj.name:
-                        left_list.highlighted = left_list.option_count - 1
-            except:
-                pass
-
-        # 2. Update Middle Pane (Current)
-        middle_list = self.query_one("#middle-pane", OptionList)
-        middle_list.clear_options()
-        
-        self.current_contents_map = {} # Map index to node for easy access
-        
-        highlight_index = 0 # Default to top
-        
-        for idx, node in enumerate(current_contents):
-            middle_list.add_option(Option(self.format_option(node), id=node.path))
-            self.current_contents_map[idx] = node
-            
-            # If we just came back from a subdirectory, highlight it
-            if self.last_exited_path and node.path == self.last_exited_path:
-                highlight_index = idx
+        self.query_one(StatusBar).update_status(self.current_path, "Loading...")
+        self.update_watches()
+        # What the panes show now; a new listing of the same directory is applied as a diff
+        previous = (self.query_one("#middle-pane", FileList).entries,
+                    self.query_one("#left-pane", FileList).entries)
+        self.scan_directories(self.current_path, self.last_exited_path, self.scan_token, previous)
 
         # Reset last exited path
         self.last_exited_path = None
 
-        # Set highlight
-        if current_contents:
-            middle_list.highlighted = highlight_index
-            self.update_preview(current_contents[highlight_index])
-        else:
-            self.query_one("#preview-content", Static).update("Empty directory")
-            self.query_one("#preview-title", Static).update("")
+    @work(thread=True, exclusive=True, group="scan")
+    def scan_directories(self, current_path: str, exited_path, token, previous) -> None:
+        """List the current and parent directories off the UI thread."""
+        path_obj = Path(current_path)
+        mode = backend.ListingMode.FULL if self.detail_view else backend.ListingMode.STANDARD
+        current_contents = self.get_directory_contents(current_path, token, mode)
+
+        parent_path = path_obj.parent
+        parent_contents = []
+        if parent_path != path_obj: # If not root
+            parent_contents = self.get_directory_contents(str(parent_path), token, self.names_only_mode())
+
+        diffs = (self.diff_contents(previous[0], current_contents),
+                 self.diff_contents(previous[1], parent_contents))
+        if not token.is_cancelled():
+            self.call_from_thread(self.show_listing, token, current_path, current_contents,
+                                  parent_contents, exited_path, previous, diffs)
+
+    @staticmethod
+    def diff_contents(old, new):
+        """Changes from a listing shown now to a fresh one of the same directory, or None."""
+        if old is new:
+            return None
+        if isinstance(old, backend.DirectoryListing) and isinstance(new, backend.DirectoryListing):
+            diff = backend.diff_listings(old, new)
+            if diff.comparable:
+                return diff
+        return None
+
+    def apply_contents(self, file_list: FileList, previous, contents, diff) -> bool:
+        """Patch a pane with a diff against what it shows; False if it needs set_entries."""
+        if file_list.entries is not previous:
+            return False
+        if contents is previous:
+            return True
+        return diff is not None and file_list.apply_diff(contents, diff.removed, diff.added, diff.changed)
+
+    def show_listing(self, token, current_path: str, current_contents, parent_contents, exited_path,
+                     previous=(None, None), diffs=(None, None)) -> None:
+        if token is not self.scan_token:
+            return
+        path_obj = Path(current_path)
+        self.shown_listings = (current_contents, parent_contents)
+        if self.scan_key_start is not None:
+            profiler.mark_paint(KEY_TO_LISTING, self.scan_key_start)
+            self.scan_key_start = None
+
+        # 1. Update Left Pane (Parent)
+        left_list = self.query_one("#left-pane", FileList)
+        if not self.apply_contents(left_list, previous[1], parent_contents, diffs[1]):
+            left_list.set_entries(parent_contents)
+        if parent_contents:
+            # Highlight the folder we are currently inside
+            parent_index = parent_contents.find(path_obj.name)
+            if parent_index >= 0:
+                left_list.highlighted = parent_index
+
+        if self.tree_shown():
+            self.sync_tree(real_directory(current_path))
+
+        # Search results keep the middle pane until the search is closed
+        if self.search_mode:
+            return
+        self.query_one(StatusBar).update_status(current_path, self.listing_status(len(current_contents)))
+
+        # 2. Update Middle Pane (Current); rows are only formatted once they scroll into view.
+        # A re-listing of the directory already shown is patched in, keeping scroll and selection.
+        middle_list = self.query_one("#middle-pane", FileList)
+        patched = self.apply_contents(middle_list, previous[0], current_contents, diffs[0])
+        # An entry picked while the startup snapshot was shown stays highlighted
+        snapshot_entry = middle_list.highlighted_entry if isinstance(middle_list.entries, SnapshotListing) else None
+        if not patched:
+            middle_list.set_entries(current_contents)
+
+        if not current_contents:
+            self.show_empty_preview(token)
+            return
 
-    def on_option_list_option_highlighted(self, event: OptionList.OptionHighlighted) -> None:
+        # If we just came back from a subdirectory (or made a new entry), highlight it
+        if exited_path and Path(exited_path).parent == path_obj:
+            index = current_contents.find(Path(exited_path).name)
+            if index >= 0 or not patched:
+                middle_list.highlighted = max(0, index)
+        elif not patched:
+            # Set highlight (the Highlighted message updates the preview)
+            index = current_contents.find(snapshot_entry.name) if snapshot_entry else -1
+            middle_list.highlighted = max(0, index)
+
+    def show_empty_preview(self, token) -> None:
+        if token is not self.scan_token:
+            return
+        self.query_one("#preview-content", Static).update("Empty directory")
+        self.query_one("#preview-title", Static).update("")
+
+    def on_file_list_highlighted(self, event: FileList.Highlighted) -> None:
         """When selection changes in the middle pane, update preview"""
-        if event.option_list.id == "middle-pane":
-            if event.option_index is not None and event.option_index in self.current_contents_map:
-                node = self.current_contents_map[event.option_index]
-                self.update_preview(node)
+        if event.file_list.id == "middle-pane":
+            if self.search_mode:
+                self.preview_match(event.entry)
+            else:
+                self.update_preview(event.entry)
 
     def update_preview(self, node):
         title = self.query_one("#preview-title", Static)
         content = self.query_one("#preview-content", Static)
         
         title.update(Text(f"Preview: {node.name}", style="bold yellow"))
+        self.stop_disk_usage()
 
-        if node.is_directory:
-            # Directory Summary
-            try:
-                sub_contents = self.get_directory_contents(node.path)
-                summary = f"\n[bold]Directory Content:[/]\n\n"
-                for i, child in enumerate(sub_contents[:15]): # Show first 15
-                    icon = "📂" if child.is_directory else "📄"
-                    summary += f"{icon} {child.name}\n"
-                if len(sub_contents) > 15:
-                    summary += f"\n... and {len(sub_contents) - 15} more items."
-                content.update(summary)
-            except:
-                content.update("Access Denied")
+        # Drop the listing of the previously highlighted directory
+        if self.preview_token is not None:
+            self.preview_token.cancel()
+            self.preview_token = None
+        self.preview_request = None
+
+        # Follow the previewed directory while it is on screen
+        new_preview_dir = node.path if node.is_directory else None
+        if new_preview_dir != self.preview_dir:
+            self.preview_dir = new_preview_dir
+            self.update_watches()
+
+        if node.is_directory or can_browse(node):
+            # Directory Summary (archives show their top level)
+            self.preview_token = backend.ScanToken()
+            content.update("[italic]Loading...[/]")
+            self.load_directory_preview(node, self.preview_token)
         else:
-            # File Preview
-            try:
-                file_path = Path(node.path)
-                if file_path.suffix.lower() in ['.txt', '.py', '.cpp', '.h', '.md', '.json', '.yml', '.cmake']:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        text = f.read(2000) # Read first 2000 chars
-                    
-                    # Simple syntax highlighting for code
-                    if file_path.suffix in ['.py', '.cpp', '.h']:
-                        lexer = "python" if file_path.suffix == '.py' else "cpp"
-                        syntax = Syntax(text, lexer, theme="monokai", line_numbers=True)
-                        content.update(syntax)
-                    else:
-                        content.update(text)
-                else:
-                    content.update(f"\n[italic]Binary file or unknown format.\nSize: {node.size} bytes[/]")
-            except Exception as e:
-                content.update(f"Error reading file: {e}")
+            self.start_file_preview(node)
+
+    def preview_size(self):
+        """Columns and rows available in the preview pane."""
+        size = self.query_one("#preview-content", Static).content_size
+        if not size.width or not size.height:
+            return DEFAULT_PREVIEW_SIZE
+        return size.width, size.height
+
+    def file_preview_request(self, entry):
+        """What to preview for a middle pane entry; None for directories."""
+        if self.search_mode:
+            # The mtime of a match is looked up on the worker
+            return (entry.path, None, 0, entry.line_number, backend.FileKind.TEXT)
+        if entry.is_directory:
+            return None
+        return (entry.path, entry.mtime, entry.size, None, entry.kind)
+
+    def start_file_preview(self, entry) -> None:
+        """Show a file (or content search match) preview, rendering it off the UI thread unless cached."""
+        request = self.file_preview_request(entry)
+        self.preview_request = request
+        width, height = self.preview_size()
+        path, mtime, _, line, _ = request
+
+        cached = None if mtime is None else self.preview_cache.get(preview_key(path, mtime, width, height, line))
+        content = self.query_one("#preview-content", Static)
+        content.update(cached if cached is not None else "[italic]Loading...[/]")
+
+        # Render the neighbours too, so moving the cursor one step finds them ready
+        middle = self.query_one("#middle-pane", FileList)
+        requests = [request]
+        for index in (middle.highlighted + 1, middle.highlighted - 1):
+            if 0 <= index < len(middle.entries):
+                neighbour = self.file_preview_request(middle.entries[index])
+                if neighbour is not None:
+                    requests.append(neighbour)
+        self.load_file_previews(requests, width, height, show_first=cached is None)
+
+    @work(thread=True, exclusive=True, group="preview")
+    def load_file_previews(self, requests, width: int, height: int, show_first: bool) -> None:
+        """Render previews in order, stopping as soon as the cursor has moved on."""
+        worker = get_current_worker()
+        for position, request in enumerate(requests):
+            if worker.is_cancelled:
+                return
+            path, mtime, size, line, kind = request
+            if mtime is None:
+                try:
+                    info = os.stat(path)
+                    mtime, size = info.st_mtime_ns, info.st_size
+                except OSError:
+                    pass
+            key = preview_key(path, mtime, width, height, line)
+            rendered = self.preview_cache.get(key)
+            if rendered is None:
+                start = perf_counter() if profiler.enabled else None
+                rendered = render_file_preview(path, size, width, height, line, kind)
+                if start is not None:
+                    profiler.record(PREVIEW_RENDER, perf_counter() - start, path=path)
+                if rendered.cacheable:
+                    self.preview_cache.put(key, rendered)
+            if position == 0 and show_first and not worker.is_cancelled:
+                self.call_from_thread(self.show_file_preview, request, rendered)
+
+    def show_file_preview(self, request, rendered) -> None:
+        if request is self.preview_request:
+            self.query_one("#preview-content", Static).update(rendered)
+
+    def refresh_preview(self) -> None:
+        """Preview the highlighted entry again, e.g. after the pane was resized."""
+        entry = self.query_one("#middle-pane", FileList).highlighted_entry
+        if entry is None or self.du_scanner is not None:
+            return
+        if self.search_mode:
+            self.preview_match(entry)
+        else:
+            self.update_preview(entry)
+
+    def on_resize(self, event) -> None:
+        # Previews are rendered for one pane size; wait for the new layout
+        self.call_after_refresh(self.refresh_preview)
+
+    @work(thread=True, exclusive=True, group="preview")
+    def load_directory_preview(self, node, token) -> None:
+        """List the highlighted directory for the preview pane off the UI thread."""
+        try:
+            if split_archive_path(node.path) is not None:
+                sub_contents = list_archive_directory(node.path, self.sort_key, self.sort_descending)
+            else:
+                sub_contents = backend.list_directory_cached(node.path, token, self.sort_key, self.sort_descending,
+                                                             self.names_only_mode())
+        except Exception:
+            summary = "Access Denied"
+        else:
+            summary = f"\n[bold]Directory Content:[/]\n\n"
+            for i, child in enumerate(sub_contents[:15]): # Show first 15
+                icon = "📂" if child.is_directory else "📄"
+                summary += f"{icon} {child.name}\n"
+            if len(sub_contents) > 15:
+                summary += f"\n... and {len(sub_contents) - 15} more items."
+        if not token.is_cancelled():
+            self.call_from_thread(self.show_directory_preview, token, summary)
+
+    def show_directory_preview(self, token, summary: str) -> None:
+        if token is self.preview_token:
+            self.query_one("#preview-content", Static).update(summary)
 
     def action_cursor_down(self):
         self.query_one("#middle-pane").action_cursor_down()
@@ -295,12 +777,17 @@ class FileManagerApp(App):
         self.query_one("#middle-pane").action_cursor_up()
 
     def action_select_item(self):
-        middle_list = self.query_one("#middle-pane", OptionList)
-        idx = middle_list.highlighted
+        if self.search_mode:
+            match = self.query_one("#middle-pane", FileList).highlighted_entry
+            if match:
+                self.navigate_to(str(Path(match.path).parent), highlight=match.path)
+            return
+
+        node = self.get_selected_node()
         
-        if idx is not None and idx in self.current_contents_map:
-            node = self.current_contents_map[idx]
-            if node.is_directory:
+        if node:
+            # Archives open as read-only directories
+            if node.is_directory or can_browse(node):
                 # Push to C++ History
                 self.history.push(node.path)
                 self.current_path = node.path
@@ -308,7 +795,263 @@ class FileManagerApp(App):
                 # For now, just notify. Later: Open file
                 self.notify(f"Selected file: {node.name}")
 
+    def navigate_to(self, path: str, highlight: str = None):
+        """Open a directory (recording it in history), optionally highlighting one of its entries."""
+        self.close_search()
+        self.last_exited_path = highlight
+        self.history.push(path)
+        if path == self.current_path:
+            self.refresh_ui()
+        else:
+            self.current_path = path
+
+    def action_find_file(self):
+        if not self.file_index.is_loaded():
+            self.notify("The file index is still being built", severity="warning")
+            return
+
+        def open_result(result_path: str):
+            if not result_path:
+                return
+            target = Path(result_path)
+            if target.is_dir():
+                self.navigate_to(str(target))
+            elif target.exists():
+                self.navigate_to(str(target.parent), highlight=str(target))
+            else:
+                self.notify(f"No longer exists: {target.name}", severity="warning")
+
+        self.push_screen(FuzzyFindModal(self.file_index), open_result)
+
+    def action_jump_directory(self):
+        def jump(path: str):
+            if not path:
+                return
+            if Path(path).is_dir() or split_archive_path(path) is not None:
+                self.navigate_to(path)
+            else:
+                self.history.forget(path)
+                self.notify(f"No longer exists: {path}", severity="warning")
+
+        self.push_screen(JumpModal(self.history), jump)
+
+    def action_find_duplicates(self):
+        """Look for identical files under the current directory."""
+        if self.refuse_in_archive(self.current_path):
+            return
+        def open_result(result_path: str):
+            if not result_path:
+                return
+            target = Path(result_path)
+            if target.exists():
+                self.navigate_to(str(target.parent), highlight=str(target))
+            else:
+                self.notify(f"No longer exists: {target.name}", severity="warning")
+
+        self.push_screen(DuplicatesModal(self.current_path), open_result)
+
+    def action_content_search(self):
+        """Search inside the files under the current directory; matches replace the listing."""
+        if self.refuse_in_archive(self.current_path):
+            return
+        self.query_one("#middle-column").add_class("searching")
+        self.query_one("#search-input", Input).focus()
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        # Clearing the query on close must not start another search
+        if event.input.id != "search-input" or not self.query_one("#middle-column").has_class("searching"):
+            return
+        # Restart once typing pauses; the running search is cancelled at that point
+        if self.search_debounce is not None:
+            self.search_debounce.stop()
+        query = event.value
+        self.search_debounce = self.set_timer(SEARCH_DEBOUNCE, lambda: self.start_content_search(query))
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        if event.input.id == "search-input":
+            self.query_one("#middle-pane").focus()
+
+    def start_content_search(self, query: str):
+        self.stop_content_search()
+        self.search_mode = True
+        self.search_root = self.current_path
+        middle_list = self.query_one("#middle-pane", FileList)
+        middle_list.formatter = self.format_match
+        middle_list.set_entries([])
+        if not query:
+            self.query_one(StatusBar).update_status(self.current_path, "Search: type a query")
+            return
+
+        # Smart case, as in ripgrep: an all-lowercase query ignores case
+        self.content_search = backend.ContentSearch(self.current_path, query, query.islower())
+        self.content_search.start()
+        self.refresh_content_search()
+        self.search_timer = self.set_interval(SEARCH_POLL, self.refresh_content_search)
+
+    def stop_content_search(self):
+        if self.search_timer is not None:
+            self.search_timer.stop()
+            self.search_timer = None
+        if self.content_search is not None:
+            self.content_search.cancel()
+            self.content_search = None
+
+    def refresh_content_search(self):
+        search = self.content_search
+        if search is None:
+            return
+        done = search.is_done()
+        batch = search.take_results()
+        if batch:
+            middle_list = self.query_one("#middle-pane", FileList)
+            middle_list.extend(batch)
+            if middle_list.highlighted is None:
+                middle_list.highlighted = 0
+
+        if not done:
+            state = f"searching {search.file_count()} files..."
+        elif search.is_truncated():
+            state = "first matches only"
+        else:
+            state = f"{search.file_count()} files searched"
+        self.query_one(StatusBar).update_status(
+            self.current_path, f"{search.match_count()} matches in {search.matched_file_count()} files | {state}")
+
+        if done and self.search_timer is not None:
+            self.search_timer.stop()
+            self.search_timer = None
+
+    def close_search(self):
+        """Leave the results view; returns False if no search was open."""
+        column = self.query_one("#middle-column")
+        if not self.search_mode and not column.has_class("searching"):
+            return False
+        if self.search_debounce is not None:
+            self.search_debounce.stop()
+            self.search_debounce = None
+        self.stop_content_search()
+        column.remove_class("searching")
+        self.query_one("#search-input", Input).value = ""
+        self.query_one("#middle-pane", FileList).formatter = self.format_option
+        self.query_one("#middle-pane").focus()
+        self.search_mode = False
+        return True
+
+    def action_close_search(self):
+        if self.close_search():
+            self.refresh_ui()
+
+    def format_match(self, match) -> Text:
+        """Format a content search match as path:line: text."""
+        text = Text(os.path.relpath(match.path, self.search_root), style="blue")
+        text.append(f":{match.line_number}: ", style="green")
+        text.append(match.line.strip(), style="white")
+        return text
+
+    def preview_match(self, match):
+        """Show the lines around a content search match."""
+        self.stop_disk_usage()
+        self.query_one("#preview-title", Static).update(
+            Text(f"{Path(match.path).name}:{match.line_number}", style="bold yellow"))
+        if self.preview_token is not None:
+            self.preview_token.cancel()
+            self.preview_token = None
+        self.start_file_preview(match)
+
+    def action_disk_usage(self):
+        """Show a live breakdown of what fills the highlighted (or current) directory."""
+        node = self.get_selected_node()
+        target = node.path if node and node.is_directory else self.current_path
+        if self.refuse_in_archive(target):
+            return
+        self.stop_disk_usage()
+        self.preview_request = None
+
+        self.du_scanner = backend.DiskUsageScanner(target)
+        self.du_scanner.start()
+        self.query_one("#preview-title", Static).update(
+            Text(f"Disk usage: {Path(target).name or target}", style="bold yellow"))
+        self.refresh_disk_usage()
+        self.du_timer = self.set_interval(0.25, self.refresh_disk_usage)
+
+    def stop_disk_usage(self):
+        if self.du_timer is not None:
+            self.du_timer.stop()
+            self.du_timer = None
+        if self.du_scanner is not None:
+            self.du_scanner.cancel()
+            self.du_scanner = None
+
+    def refresh_disk_usage(self):
+        scanner = self.du_scanner
+        if scanner is None:
+            return
+        done = scanner.is_done()
+        entries = scanner.snapshot()
+        total = sum(entry.bytes for entry in entries)
+
+        state = "done" if done else "scanning..."
+        reused = scanner.reused_files()
+        if reused:
+            # Sizes of files in unchanged directories come from an earlier scan
+            state += f", {reused} sizes from the last scan"
+        lines = Text(f"{human_size(total)} total, {scanner.total_files()} files ({state})\n\n", style="bold")
+        for entry in entries[:DU_ROWS]:
+            share = entry.bytes / total if total else 0
+            bar = "█" * round(share * DU_BAR_WIDTH)
+            style = "blue" if entry.is_directory else "white"
+            if not entry.complete:
+                style += " italic"
+            lines.append(f"{human_size(entry.bytes):>7} {bar:<{DU_BAR_WIDTH}} ", style="green")
+            lines.append(f"{entry.name}\n", style=style)
+        if len(entries) > DU_ROWS:
+            lines.append(f"\n... and {len(entries) - DU_ROWS} more items.")
+        self.query_one("#preview-content", Static).update(lines)
+
+        if done and self.du_timer is not None:
+            self.du_timer.stop()
+            self.du_timer = None
+
+    def listing_status(self, count: int) -> str:
+        marked = f" | {len(self.marked)} marked" if self.marked else ""
+        return f"{count} items | {self.sort_label()}{marked}"
+
+    def sort_label(self) -> str:
+        arrow = "↓" if self.sort_descending else "↑"
+        return f"{self.sort_key.name.lower()} {arrow}"
+
+    def resort(self):
+        # Keep the highlight on the same entry; cached listings are re-sorted, not re-read
+        node = self.get_selected_node()
+        if node:
+            self.last_exited_path = node.path
+        self.notify(f"Sort: {self.sort_label()}")
+        self.refresh_ui()
+
+    def action_toggle_details(self):
+        """Show or hide the permission, owner, size and mtime columns."""
+        self.detail_view = not self.detail_view
+        # The FULL listing replaces the shown one; keep the highlight on the same entry
+        node = self.get_selected_node()
+        if node:
+            self.last_exited_path = node.path
+        # A cached FULL listing also serves the plain view, so it may come back unchanged
+        self.query_one("#middle-pane", FileList).refresh_rows()
+        self.refresh_ui()
+
+    def action_cycle_sort(self):
+        keys = list(SORT_KEYS)
+        self.sort_key = keys[(keys.index(self.sort_key) + 1) % len(keys)]
+        self.resort()
+
+    def action_reverse_sort(self):
+        self.sort_descending = not self.sort_descending
+        self.resort()
+
     def action_go_back(self):
+        if self.search_mode:
+            self.action_close_search()
+            return
         # Use C++ History
         prev_path = self.history.go_back()
         if prev_path:
@@ -321,51 +1064,275 @@ class FileManagerApp(App):
         if next_path:
             self.current_path = next_path
 
-    def action_copy_item(self):
+    def selected_paths(self):
+        """Marked paths in name order, or else the highlighted entry's."""
+        if self.search_mode:
+            return []
+        if self.marked:
+            return sorted(self.marked)
         node = self.get_selected_node()
-        if node:
-            self.clipboard_path = node.path
-            self.notify(f"Copied to clipboard: {node.name}")
+        return [node.path] if node else []
+
+    def set_marks(self, marked) -> None:
+        self.marked = frozenset(marked)
+        middle_list = self.query_one("#middle-pane", FileList)
+        middle_list.refresh_rows()
+        self.query_one(StatusBar).update_status(self.current_path, self.listing_status(middle_list.option_count))
+
+    def action_toggle_mark(self):
+        node = self.get_selected_node()
+        if not node:
+            return
+        middle_list = self.query_one("#middle-pane", FileList)
+        self.marked = self.marked ^ {node.path}
+        middle_list.refresh_row(middle_list.highlighted)
+        self.query_one(StatusBar).update_status(self.current_path, self.listing_status(middle_list.option_count))
+        middle_list.action_cursor_down()
+
+    def action_mark_pattern(self):
+        def mark(pattern: str):
+            if not pattern or self.search_mode:
+                return
+            # "/regex/" is searched for in the name; anything else is a shell glob on the whole name
+            try:
+                if len(pattern) > 1 and pattern.startswith("/") and pattern.endswith("/"):
+                    match = re.compile(pattern[1:-1]).search
+                else:
+                    match = re.compile(fnmatch.translate(pattern)).match
+            except re.error as e:
+                self.notify(f"Invalid pattern: {e}", severity="error")
+                return
+
+            entries = self.query_one("#middle-pane", FileList).entries
+            # Names come straight from the listing, without building an entry per row
+            if isinstance(entries, backend.DirectoryListing):
+                names = (entries.name(i) for i in range(len(entries)))
+            else:
+                names = (entry.name for entry in entries)
+            matched = [os.path.join(self.current_path, name) for name in names if match(name)]
+            self.set_marks(self.marked.union(matched))
+            self.notify(f"Marked {len(matched)} items")
+
+        self.push_screen(InputModal("Mark names matching (glob, or /regex/):"), mark)
+
+    def action_clear_marks(self):
+        if self.marked:
+            self.set_marks(())
+
+    def action_copy_item(self):
+        paths = self.selected_paths()
+        if paths:
+            self.clipboard_paths = paths
+            self.clipboard_cut = False
+            self.notify(f"Copied to clipboard: {self.describe(paths)}")
+
+    def action_cut_item(self):
+        paths = self.selected_paths()
+        if paths and not self.refuse_in_archive(self.current_path):
+            self.clipboard_paths = paths
+            self.clipboard_cut = True
+            self.notify(f"Cut to clipboard: {self.describe(paths)}")
+
+    @staticmethod
+    def describe(paths) -> str:
+        return Path(paths[0]).name if len(paths) == 1 else f"{len(paths)} items"
 
     def action_paste_item(self):
-        if not self.clipboard_path:
+        if not self.clipboard_paths:
             self.notify("Clipboard is empty", severity="warning")
             return
+        if self.refuse_in_archive(self.current_path):
+            return
 
-        src = Path(self.clipboard_path)
-        dest = Path(self.current_path) / src.name
-        
-        if backend.copy_path(str(src), str(dest)):
-            self.notify(f"Pasted: {src.name}")
-            self.refresh_ui()
+        # Members are streamed out of their archive, without unpacking the rest of it
+        if split_archive_path(str(Path(self.clipboard_paths[0]).parent)) is not None:
+            self.submit_job(ExtractJob(list(self.clipboard_paths), self.current_path))
+            return
+        # A selection goes to the backend in one call, and the panes refresh once when it is done
+        if len(self.clipboard_paths) > 1:
+            job_type = BatchMoveJob if self.clipboard_cut else BatchCopyJob
+            job = job_type(list(self.clipboard_paths), self.current_path)
+        else:
+            src = Path(self.clipboard_paths[0])
+            dest = Path(self.current_path) / src.name
+            job_type = MoveJob if self.clipboard_cut else CopyJob
+            job = job_type(str(src), str(dest))
+        self.submit_job(job)
+        if self.clipboard_cut:
+            # A moved item is gone from its old place; it can only be pasted once
+            self.clipboard_paths = ()
+            self.clipboard_cut = False
+
+    def submit_job(self, job):
+        """Queue a file operation; progress shows in the status bar and jobs panel."""
+        self.job_queue.submit(job)
+        self.refresh_jobs()
+        if self.job_timer is None:
+            self.job_timer = self.set_interval(JOB_POLL, self.refresh_jobs)
+
+    def refresh_jobs(self):
+        finished = self.job_queue.poll()
+        active = self.job_queue.active
+        running = self.job_queue.running
+
+        status = self.query_one(StatusBar)
+        if running:
+            job = running[0]
+            more = f" (+{len(active) - 1} more)" if len(active) > 1 else ""
+            status.update_job(f"{job.kind.capitalize()} {job.name}: {job.progress_text()}{more}")
         else:
-            self.notify(f"Failed to paste: {src.name}", severity="error")
+            status.update_job("")
+        self.query_one(JobsPanel).update_jobs(self.job_queue.jobs)
+
+        for job in finished:
+            self.report_job(job)
+        if finished:
+            self.refresh_touched(set().union(*(job.touched_dirs() for job in finished)),
+                                 highlight=finished[-1].dest)
+
+        if not active and self.job_timer is not None:
+            self.job_timer.stop()
+            self.job_timer = None
+
+    def report_job(self, job):
+        if job.state == DONE:
+            self.notify(f"{job.kind.capitalize()} done: {job.name} ({job.elapsed:.1f}s)")
+        elif job.state == CANCELLED:
+            self.notify(f"{job.kind.capitalize()} cancelled: {job.name}", severity="warning")
+        else:
+            detail = f": {job.error}" if job.error else ""
+            self.notify(f"{job.kind.capitalize()} failed: {job.name}{detail}", severity="error")
+
+    def refresh_touched(self, dirs, highlight: str = None):
+        """Re-list the panes only if a finished job changed a directory they show."""
+        current = Path(self.current_path)
+        if not any(Path(d) in (current, current.parent) for d in dirs):
+            return
+        if self.search_mode:
+            return
+        if self.tree_shown():
+            self.reload_tree(dirs)
+        # Highlight the new item; otherwise the patched listing keeps the selection
+        if highlight and Path(highlight).parent == current:
+            self.last_exited_path = highlight
+        self.refresh_ui()
+
+    def action_cancel_job(self):
+        job = self.job_queue.cancel_latest()
+        if job is None:
+            self.notify("No job can be cancelled", severity="warning")
+        else:
+            self.notify(f"Cancelling {job.kind}: {job.name}")
+            self.refresh_jobs()
+
+    def action_toggle_profiler(self):
+        """Show or hide the latency overlay; profiling runs only while it is shown (or tracing)."""
+        panel = self.query_one(ProfilerPanel)
+        panel.display = not panel.display
+        if panel.display:
+            if not profiler.enabled:
+                profiler.reset()
+                profiler.enable(True)
+            panel.start(backend.directory_cache_stats(), self.preview_cache)
+            panel.update_stats()
+            self.profile_timer = self.set_interval(PROFILE_POLL, panel.update_stats)
+        else:
+            self.profile_timer.stop()
+            self.profile_timer = None
+            if not TRACE_FILE:
+                profiler.enable(False)
+
+    def tree_shown(self) -> bool:
+        return self.query_one("#main-container").has_class("tree-view")
+
+    def action_toggle_tree(self):
+        """Switch the left pane between the parent listing and the directory tree."""
+        container = self.query_one("#main-container")
+        container.toggle_class("tree-view")
+        tree_list = self.query_one("#tree-pane", TreeList)
+        if not self.tree_shown():
+            self.query_one("#middle-pane").focus()
+            return
+        if self.directory_tree is None:
+            self.directory_tree = backend.LazyTree(Path(self.current_path).anchor or os.sep, TREE_MEMORY_BUDGET)
+            tree_list.set_tree(self.directory_tree)
+        tree_list.focus()
+        self.sync_tree(self.current_path)
+
+    @work(thread=True, exclusive=True, group="tree-sync")
+    def sync_tree(self, path: str) -> None:
+        """Expand the tree down to the current directory, listing any ancestors not loaded yet."""
+        row = self.directory_tree.reveal(path)
+        self.call_from_thread(self.show_tree_row, path, row)
+
+    def show_tree_row(self, path: str, row: int) -> None:
+        tree_list = self.query_one("#tree-pane", TreeList)
+        tree_list.rows_changed()
+        if row >= 0 and path == self.current_path:
+            tree_list.highlighted = row
+
+    @work(thread=True, group="tree-reload")
+    def reload_tree(self, directories) -> None:
+        """Re-list changed directories the tree has loaded."""
+        if any([self.directory_tree.reload(d) for d in directories]):
+            self.call_from_thread(self.query_one("#tree-pane", TreeList).rows_changed)
+
+    def on_tree_list_opened(self, message: TreeList.Opened) -> None:
+        if Path(message.path).is_dir():
+            self.navigate_to(message.path)
+        else:
+            self.reload_tree([str(Path(message.path).parent)])
+
+    def action_toggle_jobs(self):
+        panel = self.query_one(JobsPanel)
+        panel.display = not panel.display
+        panel.update_jobs(self.job_queue.jobs)
+
+    def refuse_in_archive(self, path: str) -> bool:
+        """Archives are browsed read-only; True (after saying so) if path is inside one."""
+        if split_archive_path(path) is None:
+            return False
+        self.notify("Not available inside an archive", severity="warning")
+        return True
 
     def get_selected_node(self):
-        middle_list = self.query_one("#middle-pane", OptionList)
-        idx = middle_list.highlighted
-        if idx is not None and idx in self.current_contents_map:
-            return self.current_contents_map[idx]
-        return None
+        # Search matches are not listing entries; file operations need the listing back
+        if self.search_mode:
+            return None
+        return self.query_one("#middle-pane", FileList).highlighted_entry
 
     def action_delete_item(self):
-        node = self.get_selected_node()
-        if not node:
+        """Delete through the trash: one rename per item, however large; the trash empties in the background."""
+        self.confirm_delete(in_place=False)
+
+    def action_delete_in_place(self):
+        """Delete by unlinking every entry now, with progress; for paths the trash cannot take."""
+        self.confirm_delete(in_place=True)
+
+    def confirm_delete(self, in_place: bool):
+        paths = self.selected_paths()
+        if not paths or self.refuse_in_archive(self.current_path):
             return
 
         def check_confirm(confirm_str: str):
-            if confirm_str.lower() == "y":
-                if backend.remove_path_recursive(node.path):
-                    self.notify(f"Deleted: {node.name}")
-                    self.refresh_ui()
-                else:
-                    self.notify(f"Failed to delete: {node.name}", severity="error")
+            if confirm_str.lower() != "y":
+                return
+            if not in_place:
+                self.submit_job(TrashJob(paths))
+            elif len(paths) > 1:
+                self.submit_job(BatchDeleteJob(paths))
+            else:
+                self.submit_job(DeleteJob(paths[0]))
+            if self.marked:
+                self.set_marks(())
 
-        self.push_screen(InputModal(f"Delete '{node.name}'? (y/n)"), check_confirm)
+        what = f"'{Path(paths[0]).name}'" if len(paths) == 1 else f"{len(paths)} marked items"
+        how = " in place" if in_place else ""
+        self.push_screen(InputModal(f"Delete {what}{how}? (y/n)"), check_confirm)
 
     def action_rename_item(self):
         node = self.get_selected_node()
-        if not node:
+        if not node or self.refuse_in_archive(self.current_path):
             return
 
         def do_rename(new_name: str):
@@ -373,15 +1340,14 @@ class FileManagerApp(App):
                 return
             
             new_path = str(Path(node.path).parent / new_name)
-            if backend.rename_path(node.path, new_path):
-                self.notify(f"Renamed to: {new_name}")
-                self.refresh_ui()
-            else:
-                self.notify(f"Failed to rename to: {new_name}", severity="error")
+            self.submit_job(RenameJob(node.path, new_path))
 
         self.push_screen(InputModal(f"Rename '{node.name}' to:", node.name), do_rename)
 
     def action_new_file(self):
+        if self.refuse_in_archive(self.current_path):
+            return
+
         def do_create_file(name: str):
             if not name:
                 return
@@ -395,6 +1361,9 @@ class FileManagerApp(App):
         self.push_screen(InputModal("New File Name:"), do_create_file)
 
     def action_new_directory(self):
+        if self.refuse_in_archive(self.current_path):
+            return
+
         def do_create_dir(name: str):
             if not name:
                 return
@@ -407,6 +1376,19 @@ class FileManagerApp(App):
 
         self.push_screen(InputModal("New Folder Name:"), do_create_dir)
 
-if __name__ == "__main__":
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="file_ranger", description="Terminal file manager.")
+    parser.add_argument("--batch", metavar="OPS",
+                        help="run the operations in a JSON Lines file (- for stdin) without the TUI, "
+                             "printing one JSON result per operation")
+    parser.add_argument("--jobs", type=int, default=0, help="operations run at once in batch mode")
+    args = parser.parse_args(argv)
+    if args.batch:
+        from batch import run_batch_file
+        return run_batch_file(args.batch, args.jobs)
     app = FileManagerApp()
-    app.run()
\ No newline at end of file
+    app.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
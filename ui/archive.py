@@ -0,0 +1,390 @@
+import gzip
+import os
+import re
+import stat
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import backend
+
+# Archives whose member tables (and open handles) are kept for listings and previews
+ARCHIVE_CACHE_SIZE = 8
+
+# Buffer used when streaming a member out of an archive
+EXTRACT_CHUNK = 1024 * 1024
+
+# Longest suffix first: "x.tar.gz" is a tar archive, "x.gz" a single compressed file
+FORMAT_SUFFIXES = (
+    (".tar.gz", "tar"), (".tar.bz2", "tar"), (".tar.xz", "tar"), (".tgz", "tar"), (".tbz2", "tar"),
+    (".txz", "tar"), (".tar", "tar"), (".zip", "zip"), (".jar", "zip"), (".whl", "zip"), (".gz", "gzip"),
+)
+
+ExtractResult = namedtuple("ExtractResult", "path destination ok error")
+
+def archive_format(name: str) -> Optional[str]:
+    """"zip", "tar" or "gzip" for names this module can open, else None."""
+    lower = name.lower()
+    for suffix, kind in FORMAT_SUFFIXES:
+        if lower.endswith(suffix):
+            return kind
+    return None
+
+def split_archive_path(path: str) -> Optional[Tuple[str, str]]:
+    """(archive file, member) for a path inside an archive; the member of the archive root is ""."""
+    # Paths without an archive name in them are ruled out without touching the disk
+    if not any(suffix in path.lower() for suffix, _ in FORMAT_SUFFIXES):
+        return None
+    parts = path.split(os.sep)
+    for index in range(1, len(parts)):
+        if archive_format(parts[index]) is None:
+            continue
+        archive = os.sep.join(parts[:index + 1]) or os.sep
+        if os.path.isfile(archive):
+            return archive, "/".join(part for part in parts[index + 1:] if part)
+    return None
+
+def real_directory(path: str) -> str:
+    """The directory on disk holding a path, which for a path in an archive is the archive's."""
+    location = split_archive_path(path)
+    return os.path.dirname(location[0]) if location else path
+
+def can_browse(node) -> bool:
+    """True for archive files on disk, which open as directories."""
+    return not node.is_directory and not isinstance(node, ArchiveEntry) and archive_format(node.name) is not None
+
+class ArchiveEntry:
+    """An archive member, with the fields the panes and preview read from listing entries."""
+
+    __slots__ = ("name", "path", "member", "is_directory", "size", "mtime", "kind", "extension", "mode", "uid",
+                 "gid", "link_target", "info")
+
+    def __init__(self, archive: str, member: str, is_directory: bool, size: int = 0, mtime: float = 0.0,
+                 mode: int = 0, uid: int = 0, gid: int = 0, link_target: str = "", info=None):
+        self.name = member.rsplit("/", 1)[-1]
+        self.path = os.path.join(archive, *member.split("/"))
+        self.member = member
+        self.is_directory = is_directory
+        self.size = size
+        self.mtime = mtime
+        self.mode = mode or (stat.S_IFDIR | 0o755 if is_directory else stat.S_IFREG | 0o644)
+        self.uid = uid
+        self.gid = gid
+        self.link_target = link_target
+        # ZipInfo or TarInfo, which any handle on the same archive can read the member with
+        self.info = info
+        dot = self.name.rfind(".")
+        self.extension = self.name[dot:].lower() if dot > 0 else ""
+        if is_directory:
+            self.kind = backend.FileKind.DIRECTORY
+        elif size == 0 and not link_target:
+            self.kind = backend.FileKind.EMPTY
+        else:
+            self.kind = backend.kind_from_name(self.name)
+
+class ArchiveListing(list):
+    """Members of one directory inside an archive, in display order."""
+
+    def __init__(self, path: str, entries):
+        super().__init__(entries)
+        self.path = path
+
+    def find(self, name: str) -> int:
+        for index, entry in enumerate(self):
+            if entry.name == name:
+                return index
+        return -1
+
+def member_name(name: str) -> Optional[str]:
+    """A member name without leading "./" or "/"; None for names that would escape the archive."""
+    parts = [part for part in name.replace("\\", "/").split("/") if part and part != "."]
+    if not parts or ".." in parts:
+        return None
+    return "/".join(parts)
+
+def open_archive(path: str, kind: str):
+    """A handle for reading members; tar archives are opened seekable so members can be read out of order."""
+    if kind == "zip":
+        return zipfile.ZipFile(path)
+    if kind == "tar":
+        return tarfile.open(path, "r:*")
+    return None
+
+class ArchiveIndex:
+    """Members of one archive by directory, read from the zip central directory or the tar headers alone."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = archive_format(path)
+        st = os.stat(path)
+        self.key = (st.st_mtime_ns, st.st_size)
+        self.members: Dict[str, ArchiveEntry] = {}
+        self.children: Dict[str, Dict[str, ArchiveEntry]] = {"": {}}
+        # Previews share the handle; streaming extraction opens its own
+        self.lock = threading.Lock()
+        self.handle = open_archive(path, self.format)
+        try:
+            if self.format == "zip":
+                self.read_zip(self.handle)
+            elif self.format == "tar":
+                self.read_tar(self.handle)
+            else:
+                self.read_gzip(st)
+        except Exception:
+            self.close()
+            raise
+
+    def read_zip(self, archive: zipfile.ZipFile) -> None:
+        for info in archive.infolist():
+            name = member_name(info.filename)
+            if name is None:
+                continue
+            # Unix permissions are in the high bits when the archive was made on Unix
+            mode = info.external_attr >> 16 if info.create_system == 3 else 0
+            mtime = datetime(*info.date_time).timestamp()
+            self.add(ArchiveEntry(self.path, name, info.is_dir(), info.file_size, mtime, mode, info=info))
+
+    def read_tar(self, archive: tarfile.TarFile) -> None:
+        # Uncompressed tars are read header by header, seeking over member data
+        for info in archive:
+            name = member_name(info.name)
+            if name is None:
+                continue
+            if info.isdir():
+                file_type = stat.S_IFDIR
+            elif info.issym():
+                file_type = stat.S_IFLNK
+            elif info.isreg() or info.islnk():
+                file_type = stat.S_IFREG
+            else:
+                continue
+            self.add(ArchiveEntry(self.path, name, info.isdir(), info.size, float(info.mtime),
+                                  file_type | (info.mode & 0o7777), info.uid, info.gid,
+                                  info.linkname if info.issym() else "", info))
+
+    def read_gzip(self, st) -> None:
+        """A single compressed file; its size (modulo 4 GiB) is the trailer's last four bytes."""
+        size = 0
+        with open(self.path, "rb") as f:
+            if st.st_size >= 4:
+                f.seek(-4, os.SEEK_END)
+                size = int.from_bytes(f.read(4), "little")
+        name = os.path.basename(self.path)[:-len(".gz")] or "data"
+        self.add(ArchiveEntry(self.path, name, False, size, st.st_mtime))
+
+    def add(self, entry: ArchiveEntry) -> None:
+        self.members[entry.member] = entry
+        parent, _, name = entry.member.rpartition("/")
+        self.children.setdefault(parent, {})[name] = entry
+        if entry.is_directory:
+            self.children.setdefault(entry.member, {})
+        # Many archives leave out directory entries; make the ones their members imply
+        if parent and parent not in self.members:
+            self.add(ArchiveEntry(self.path, parent, True, mtime=entry.mtime))
+
+    def listing(self, member: str, sort_key=backend.SortKey.NAME, descending: bool = False) -> ArchiveListing:
+        children = self.children.get(member)
+        if children is None:
+            raise NotADirectoryError(f"{member} is not a directory in {self.path}")
+        path = os.path.join(self.path, *member.split("/")) if member else self.path
+        return ArchiveListing(path, sort_entries(children.values(), sort_key, descending))
+
+    def read(self, entry: ArchiveEntry, limit: int) -> bytes:
+        """Up to limit bytes from the start of a member, decompressing only those."""
+        with self.lock:
+            with self.open_member(self.handle, entry) as f:
+                return f.read(limit)
+
+    def open_member(self, handle, entry: ArchiveEntry):
+        if self.format == "zip":
+            return handle.open(entry.info)
+        if self.format == "tar":
+            member = handle.extractfile(entry.info)
+            if member is None:
+                raise OSError(f"cannot read {entry.name}")
+            return member
+        return gzip.open(self.path, "rb")
+
+    def close(self) -> None:
+        if self.handle is not None:
+            with self.lock:
+                self.handle.close()
+
+_indexes: "OrderedDict[str, ArchiveIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def archive_index(path: str) -> ArchiveIndex:
+    """The member table of an archive, read again only after the archive changed."""
+    st = os.stat(path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is not None and index.key == (st.st_mtime_ns, st.st_size):
+            _indexes.move_to_end(path)
+            return index
+        # Built under the lock, so a listing and a preview of a new archive read it once
+        if index is not None:
+            index.close()
+        index = ArchiveIndex(path)
+        _indexes[path] = index
+        while len(_indexes) > ARCHIVE_CACHE_SIZE:
+            _indexes.popitem(last=False)[1].close()
+        return index
+
+def list_archive_directory(path: str, sort_key=backend.SortKey.NAME, descending: bool = False) -> ArchiveListing:
+    """Listing of a directory inside an archive (or of its root); raises OSError if there is none."""
+    location = split_archive_path(path)
+    if location is None:
+        raise FileNotFoundError(path)
+    archive, member = location
+    try:
+        return archive_index(archive).listing(member, sort_key, descending)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+        raise OSError(f"cannot read {os.path.basename(archive)}: {e}") from e
+
+def read_member(path: str, limit: int) -> Tuple[ArchiveEntry, bytes]:
+    """A member and up to limit bytes of its content, for previews."""
+    archive, member = split_archive_path(path)
+    index = archive_index(archive)
+    entry = index.members[member]
+    return entry, index.read(entry, limit)
+
+def natural_key(name: str):
+    """Runs of digits compare by value, as in the backend sort: "file2" before "file10"."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name.lower())]
+
+def sort_entries(entries, sort_key, descending: bool) -> List[ArchiveEntry]:
+    """Directories first, then the sort key, then natural name order, as listings are sorted."""
+    def key(entry: ArchiveEntry):
+        if sort_key == backend.SortKey.SIZE:
+            primary = entry.size
+        elif sort_key == backend.SortKey.MTIME:
+            primary = entry.mtime
+        elif sort_key == backend.SortKey.EXTENSION:
+            primary = entry.extension
+        else:
+            primary = 0
+        return primary, natural_key(entry.name), entry.name
+
+    directories = sorted((e for e in entries if e.is_directory), key=key, reverse=descending)
+    files = sorted((e for e in entries if not e.is_directory), key=key, reverse=descending)
+    return directories + files
+
+class ExtractProgress:
+    """Bytes streamed so far; written by the extracting thread, read by the UI."""
+
+    def __init__(self):
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.files_done = 0
+        self.files_total = 0
+
+def extract_paths(paths: List[str], dest_dir: str, cancelled: threading.Event,
+                  progress: ExtractProgress) -> List[ExtractResult]:
+    """Stream members (directories with everything under them) into dest_dir, one buffer at a time."""
+    plans = []
+    for path in paths:
+        try:
+            archive, member = split_archive_path(path)
+            index = archive_index(archive)
+            entry = index.members[member]
+        except KeyError:
+            plans.append((path, None, [], "not found in the archive"))
+            continue
+        except (OSError, TypeError) as e:
+            plans.append((path, None, [], str(e)))
+            continue
+        prefix = entry.member + "/"
+        members = [entry] + ([m for m in index.members.values() if m.member.startswith(prefix)]
+                             if entry.is_directory else [])
+        plans.append((path, index, members, ""))
+        files = [m for m in members if not m.is_directory]
+        progress.files_total += len(files)
+        progress.bytes_total += sum(m.size for m in files if not stat.S_ISLNK(m.mode))
+
+    results = []
+    for path, index, members, error in plans:
+        destination = os.path.join(dest_dir, os.path.basename(path))
+        if index is not None and not cancelled.is_set():
+            try:
+                extract_members(index, members, destination, cancelled, progress)
+            except (OSError, zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+                error = str(e)
+        if cancelled.is_set() and not error:
+            error = "cancelled"
+        results.append(ExtractResult(path, destination, not error, error))
+    return results
+
+def inside(root: str, path: str) -> bool:
+    """True if path, with symlinks resolved, is root or lies under it."""
+    real_root = os.path.realpath(root)
+    real = os.path.realpath(path)
+    return real == real_root or real.startswith(real_root.rstrip(os.sep) + os.sep)
+
+def extract_members(index: ArchiveIndex, members: List[ArchiveEntry], destination: str,
+                    cancelled: threading.Event, progress: ExtractProgress) -> None:
+    top = members[0].member
+    handle = open_archive(index.path, index.format)
+    # Symlinks are made last, so no member is written through one the archive itself planted
+    links = []
+    try:
+        for entry in members:
+            if cancelled.is_set():
+                return
+            relative = entry.member[len(top):].lstrip("/")
+            target = os.path.join(destination, *relative.split("/")) if relative else destination
+            if relative and not inside(destination, os.path.dirname(target)):
+                raise OSError(f"{entry.member}: leads outside {destination} through a symbolic link")
+            if entry.is_directory:
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if stat.S_ISLNK(entry.mode):
+                links.append((entry, target))
+                continue
+            stream_member(index, handle, entry, target, cancelled, progress)
+            progress.files_done += 1
+        for entry, target in links:
+            if cancelled.is_set():
+                return
+            if not inside(destination, os.path.dirname(target)):
+                raise OSError(f"{entry.member}: leads outside {destination} through a symbolic link")
+            link_target = entry.link_target
+            if index.format == "zip":
+                with index.open_member(handle, entry) as f:
+                    link_target = f.read(4096).decode("utf-8", "replace")
+            if os.path.isdir(target) and not os.path.islink(target):
+                raise OSError(f"{entry.member}: a symbolic link in place of an extracted directory")
+            if os.path.lexists(target):
+                os.unlink(target)
+            os.symlink(link_target, target)
+            progress.files_done += 1
+    finally:
+        if handle is not None:
+            handle.close()
+
+def stream_member(index: ArchiveIndex, handle, entry: ArchiveEntry, target: str, cancelled: threading.Event,
+                  progress: ExtractProgress) -> None:
+    """Copy one member through a hidden ".part" file, renamed into place once complete."""
+    part = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.part")
+    placed = False
+    try:
+        complete = False
+        with index.open_member(handle, entry) as source, open(part, "wb") as out:
+            while not cancelled.is_set():
+                chunk = source.read(EXTRACT_CHUNK)
+                if not chunk:
+                    complete = True
+                    break
+                out.write(chunk)
+                progress.bytes_done += len(chunk)
+        if complete:
+            os.chmod(part, stat.S_IMODE(entry.mode) or 0o644)
+            os.utime(part, (entry.mtime, entry.mtime))
+            os.replace(part, target)
+            placed = True
+    finally:
+        if not placed and os.path.exists(part):
+            os.unlink(part)
@@ -0,0 +1,198 @@
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import backend
+from jobs import conflicts
+
+# Operations run at once when --jobs is not given; each backend call also has its own threads
+DEFAULT_BATCH_JOBS = min(8, os.cpu_count() or 4)
+
+SORT_KEYS = {key.name.lower(): key for key in (backend.SortKey.NAME, backend.SortKey.SIZE,
+                                                backend.SortKey.MTIME, backend.SortKey.EXTENSION)}
+
+class BatchError(Exception):
+    """An operation that cannot be run as written."""
+
+def absolute(path) -> str:
+    if not isinstance(path, str) or not path:
+        raise BatchError(f"expected a path, got {path!r}")
+    return os.path.abspath(path)
+
+class Operation:
+    """One line of the batch file, with the paths it reads and writes for ordering."""
+
+    def __init__(self, index: int, spec):
+        self.index = index
+        self.spec = spec if isinstance(spec, dict) else {}
+        self.id = self.spec.get("id", index)
+        self.op = self.spec.get("op")
+        self.reads: List[str] = []
+        self.writes: List[str] = []
+        self.error = ""
+        self.depends_on: List["Operation"] = []
+        try:
+            if not isinstance(spec, dict):
+                raise BatchError("expected a JSON object")
+            self.plan()
+        except BatchError as e:
+            self.error = str(e)
+
+    def sources(self) -> List[str]:
+        srcs = self.spec.get("srcs", [self.spec["src"]] if "src" in self.spec else None)
+        if not isinstance(srcs, list) or not srcs:
+            raise BatchError(f"{self.op} needs src or srcs")
+        return [absolute(src) for src in srcs]
+
+    def plan(self) -> None:
+        spec = self.spec
+        if self.op == "list":
+            self.path = absolute(spec.get("path"))
+            self.reads = [self.path]
+        elif self.op in ("copy", "move"):
+            self.srcs = self.sources()
+            self.dest = absolute(spec.get("dest"))
+            targets = [os.path.join(self.dest, os.path.basename(src.rstrip(os.sep))) for src in self.srcs]
+            self.reads = self.srcs if self.op == "copy" else []
+            self.writes = targets + (self.srcs if self.op == "move" else [])
+        elif self.op == "rename":
+            self.src = absolute(spec.get("src"))
+            self.dest = absolute(spec.get("dest"))
+            self.writes = [self.src, self.dest]
+        elif self.op in ("delete", "trash"):
+            self.srcs = self.sources() if "src" in spec or "srcs" in spec else [absolute(spec.get("path"))]
+            self.writes = self.srcs
+        elif self.op == "mkdir":
+            self.path = absolute(spec.get("path"))
+            self.writes = [self.path]
+        else:
+            raise BatchError(f"unknown op {self.op!r}")
+
+    def conflicts_with(self, earlier: "Operation") -> bool:
+        """Whether this operation must wait for an earlier one, by the same rule as the job queue."""
+        return conflicts(self, earlier)
+
+    def run(self) -> dict:
+        """Run the operation through the backend; the fields that go into its result line."""
+        spec = self.spec
+        if self.op == "list":
+            sort_key = SORT_KEYS.get(str(spec.get("sort", "name")).lower())
+            if sort_key is None:
+                raise BatchError(f"unknown sort key {spec.get('sort')!r}")
+            listing = backend.list_directory(self.path, None, sort_key, bool(spec.get("descending", False)))
+            if not listing.is_directory:
+                raise BatchError(f"not a directory: {self.path}")
+            limit = spec.get("limit")
+            entries = listing[:limit] if isinstance(limit, int) else listing[:]
+            return {"ok": True, "count": len(listing),
+                    "entries": [{"name": e.name, "is_directory": e.is_directory, "size": e.size,
+                                 "mtime": e.mtime, "kind": e.kind.name.lower()} for e in entries]}
+        if self.op in ("copy", "move", "delete", "trash"):
+            if self.op == "copy":
+                results = backend.copy_paths(self.srcs, self.dest)
+            elif self.op == "move":
+                results = backend.move_paths(self.srcs, self.dest)
+            elif self.op == "delete":
+                results = backend.remove_paths(self.srcs)
+            else:
+                results = backend.trash_paths(self.srcs)
+            items = [{"path": r.path, "destination": r.destination, "ok": r.ok, "error": r.error} for r in results]
+            return {"ok": all(r.ok for r in results), "results": items}
+        if self.op == "rename":
+            if not backend.rename_path(self.src, self.dest):
+                return {"ok": False, "error": f"cannot rename {self.src} to {self.dest}"}
+            return {"ok": True}
+        if os.path.isdir(self.path):
+            if spec.get("exist_ok", True):
+                return {"ok": True}
+            return {"ok": False, "error": f"already exists: {self.path}"}
+        if not backend.make_directory_recursive(self.path):
+            return {"ok": False, "error": f"cannot create: {self.path}"}
+        return {"ok": True}
+
+class BatchRunner:
+    """Runs operations on a thread pool, each as soon as the earlier ones it conflicts with are done."""
+
+    def __init__(self, operations: List[Operation], jobs: int = 0):
+        self.operations = operations
+        self.jobs = jobs or DEFAULT_BATCH_JOBS
+        self.started = time.perf_counter()
+        self.done = {op.index: threading.Event() for op in operations}
+        for position, op in enumerate(operations):
+            op.depends_on = [earlier for earlier in operations[:position] if op.conflicts_with(earlier)]
+
+    def execute(self, op: Operation) -> dict:
+        try:
+            for dependency in op.depends_on:
+                self.done[dependency.index].wait()
+            result = {"id": op.id, "op": op.op}
+            start = time.perf_counter()
+            if op.error:
+                result.update(ok=False, error=op.error)
+            else:
+                # Whatever goes wrong is reported on this operation's line, not raised out of the batch
+                try:
+                    result.update(op.run())
+                except Exception as e:
+                    result.update(ok=False, error=str(e) or type(e).__name__)
+            end = time.perf_counter()
+            result.update(start=round(start - self.started, 6), seconds=round(end - start, 6),
+                          waited_for=[dependency.id for dependency in op.depends_on])
+            return result
+        finally:
+            self.done[op.index].set()
+
+    def run(self, out) -> int:
+        """Write one JSON line per operation, in input order, then a summary; the number that failed."""
+        failed = 0
+        # Workers take operations in file order, so every dependency is already running or done
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = [pool.submit(self.execute, op) for op in self.operations]
+            for future in futures:
+                result = future.result()
+                failed += not result.get("ok")
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+        out.write(json.dumps({"summary": True, "ops": len(self.operations), "failed": failed,
+                              "seconds": round(time.perf_counter() - self.started, 6)}) + "\n")
+        return failed
+
+def read_operations(lines) -> List[Operation]:
+    operations = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            spec = json.loads(line)
+        except ValueError as e:
+            spec = {"op": None}
+            operation = Operation(len(operations), spec)
+            operation.error = f"invalid JSON: {e}"
+            operations.append(operation)
+            continue
+        operations.append(Operation(len(operations), spec))
+    return operations
+
+def run_batch_file(path: str, jobs: int = 0, out=None) -> int:
+    """Run the operations of a JSON Lines file (- for stdin); exit status 1 if any failed."""
+    out = out or sys.stdout
+    try:
+        if path == "-":
+            operations = read_operations(sys.stdin)
+        else:
+            with open(path, encoding="utf-8") as f:
+                operations = read_operations(f)
+    except (OSError, ValueError) as e:
+        # ValueError covers input that is not UTF-8
+        print(f"Cannot read {path}: {e}", file=sys.stderr)
+        return 2
+    failed = BatchRunner(operations, jobs).run(out)
+    # Trashed items are purged before the process exits, as the TUI's session would have
+    while not backend.wait_trash_purge(1000):
+        pass
+    return 1 if failed else 0
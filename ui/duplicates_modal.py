@@ -0,0 +1,101 @@
+from pathlib import Path
+
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.screen import ModalScreen
+from textual.widgets import Label, OptionList
+from textual.widgets.option_list import Option
+from textual.containers import Vertical
+from rich.text import Text
+
+import backend
+from formatting import human_size
+
+# Interval between progress updates while the search runs
+DUPLICATES_POLL = 0.2
+# Groups listed, most reclaimable space first; the totals cover all of them
+DUPLICATE_GROUPS_SHOWN = 500
+
+class DuplicatesModal(ModalScreen[str]):
+    """A modal screen listing groups of identical files under a directory."""
+
+    CSS = """
+    DuplicatesModal {
+        align: center middle;
+    }
+
+    #dialog {
+        padding: 1 2;
+        width: 100;
+        height: 80%;
+        border: thick $background 80%;
+        background: $surface;
+    }
+
+    Label {
+        width: 100%;
+        text-align: center;
+    }
+
+    #results {
+        height: 1fr;
+        margin-top: 1;
+    }
+    """
+
+    BINDINGS = [
+        Binding("escape", "dismiss_empty", "Close", show=False),
+    ]
+
+    def __init__(self, root: str):
+        super().__init__()
+        self.root = root
+        self.finder = backend.DuplicateFinder(root)
+        self.timer = None
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="dialog"):
+            yield Label(f"Duplicate files under {self.root}")
+            yield Label("", id="summary")
+            yield OptionList(id="results")
+
+    def on_mount(self) -> None:
+        self.finder.start()
+        self.timer = self.set_interval(DUPLICATES_POLL, self.refresh_results)
+        self.refresh_results()
+
+    def on_unmount(self) -> None:
+        self.finder.cancel()
+
+    def refresh_results(self) -> None:
+        progress = self.finder.progress()
+        summary = self.query_one("#summary", Label)
+        if not progress.done:
+            summary.update(f"{progress.stage.capitalize()}: {progress.files_scanned:,} files, "
+                           f"{progress.candidates:,} share a size, {progress.files_hashed:,} hashed "
+                           f"({human_size(progress.bytes_hashed)})")
+            return
+
+        self.timer.stop()
+        cached = f", {progress.cache_hits:,} hashes reused" if progress.cache_hits else ""
+        summary.update(f"{progress.groups:,} groups, {progress.duplicate_files:,} extra copies, "
+                       f"{human_size(progress.reclaimable_bytes)} reclaimable "
+                       f"({progress.seconds:.1f}s{cached})")
+
+        results = self.query_one("#results", OptionList)
+        options = []
+        for group in self.finder.groups(DUPLICATE_GROUPS_SHOWN):
+            options.append(Option(Text(f"{len(group.paths)} × {human_size(group.size)}  "
+                                       f"{human_size(group.reclaimable)} reclaimable", style="bold yellow"),
+                                  disabled=True))
+            options.extend(Option(f"  {path}", id=path) for path in group.paths)
+        results.add_options(options)
+        if options:
+            results.focus()
+            results.highlighted = 1
+
+    def action_dismiss_empty(self) -> None:
+        self.dismiss("")
+
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected) -> None:
+        self.dismiss(event.option.id)
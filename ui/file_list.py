@@ -0,0 +1,271 @@
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, Optional, Sequence
+
+from rich.segment import Segment
+from rich.text import Text
+from textual import events
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.message import Message
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+from profiler import ROW_FETCH, ROW_FORMAT, profiler
+
+# Rows formatted above and below the viewport so small scrolls hit the cache
+OVERSCAN = 16
+
+# Larger diffs replace the whole list instead of being patched in
+MAX_PATCH = 1000
+
+class FileList(ScrollView, can_focus=True):
+    """A virtual list that formats only the rows on screen."""
+
+    DEFAULT_CSS = """
+    FileList {
+        overflow-x: hidden;
+        overflow-y: auto;
+    }
+
+    FileList > .file-list--highlighted {
+        text-style: bold;
+    }
+    """
+
+    COMPONENT_CLASSES = {"file-list--highlighted"}
+
+    BINDINGS = [
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("pagedown", "page_down", "Page Down", show=False),
+        Binding("pageup", "page_up", "Page Up", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+    ]
+
+    highlighted = reactive(None)
+
+    class Highlighted(Message):
+        """Posted when the highlighted row changes."""
+
+        def __init__(self, file_list: "FileList", index: int, entry) -> None:
+            super().__init__()
+            self.file_list = file_list
+            self.index = index
+            self.entry = entry
+
+        @property
+        def control(self) -> "FileList":
+            return self.file_list
+
+    def __init__(self, formatter: Callable[[object], Text], *, id: Optional[str] = None,
+                 disabled: bool = False) -> None:
+        super().__init__(id=id, disabled=disabled)
+        self.formatter = formatter
+        self.entries: Sequence = []
+        # Formatted rows near the viewport, keyed by row index
+        self._row_cache: Dict[int, Text] = {}
+
+    @property
+    def option_count(self) -> int:
+        return len(self.entries)
+
+    @property
+    def highlighted_entry(self):
+        if self.highlighted is None or self.highlighted >= len(self.entries):
+            return None
+        return self.entries[self.highlighted]
+
+    def set_entries(self, entries: Sequence) -> None:
+        """Replace the listing; nothing is formatted until it is drawn."""
+        self.entries = entries
+        self._row_cache.clear()
+        self._update_virtual_size()
+        self.scroll_to(y=0, animate=False)
+        self.highlighted = None
+        self.refresh()
+
+    def extend(self, entries: Sequence) -> None:
+        """Append entries to a list built with set_entries([])."""
+        if not isinstance(self.entries, list):
+            self.entries = list(self.entries)
+        self.entries.extend(entries)
+        self._update_virtual_size()
+        self.refresh()
+
+    def apply_diff(self, entries: Sequence, removed: Sequence[int], added: Sequence[int],
+                   changed: Sequence[int]) -> bool:
+        """Swap in a new listing of the same directory, keeping scroll position and
+        selection and re-formatting only the rows that changed. Returns False (and
+        does nothing) if the diff is too large to be worth patching."""
+        if len(removed) + len(added) > MAX_PATCH:
+            return False
+
+        def shift(index: int) -> Optional[int]:
+            """New position of the entry at an old position, or None if it was removed."""
+            before = bisect_left(removed, index)
+            if before < len(removed) and removed[before] == index:
+                return None
+            position = index - before
+            for inserted in added:
+                if inserted > position:
+                    break
+                position += 1
+            return position
+
+        old_top = int(self.scroll_offset.y)
+        old_highlighted = self.highlighted
+        changed_rows = set(changed)
+
+        row_cache = {}
+        for index, text in self._row_cache.items():
+            new_index = shift(index)
+            if new_index is not None and new_index not in changed_rows:
+                row_cache[new_index] = text
+        self._row_cache = row_cache
+        self.entries = entries
+        self._update_virtual_size()
+
+        # Keep the first visible entry in place, or the row where it was
+        new_top = shift(old_top)
+        self.scroll_to(y=old_top if new_top is None else new_top, animate=False)
+
+        if old_highlighted is not None:
+            new_highlighted = shift(old_highlighted)
+            if new_highlighted is None or new_highlighted in changed_rows:
+                # The entry is gone or different: highlight its neighbour and re-preview
+                self.highlighted = None
+                self.highlighted = min(old_highlighted if new_highlighted is None else new_highlighted,
+                                       len(entries) - 1) if entries else None
+            else:
+                # Same entry at a (possibly) new position: no Highlighted message needed
+                self.set_reactive(FileList.highlighted, new_highlighted)
+                self.scroll_to_row(new_highlighted)
+        self.refresh()
+        return True
+
+    def clear(self) -> None:
+        self.set_entries([])
+
+    def refresh_rows(self) -> None:
+        """Re-format the visible rows, e.g. after the formatter's output changed."""
+        self._row_cache.clear()
+        self.refresh()
+
+    def reload_entries(self) -> None:
+        """Re-read a listing that changed in place, keeping the scroll position."""
+        self._row_cache.clear()
+        self._update_virtual_size()
+        if self.highlighted is not None and self.highlighted >= len(self.entries):
+            self.highlighted = len(self.entries) - 1 if self.entries else None
+        self.refresh()
+
+    def refresh_row(self, index: int) -> None:
+        """Re-format one row, e.g. after its mark changed."""
+        self._row_cache.pop(index, None)
+        self.refresh()
+
+    def _update_virtual_size(self) -> None:
+        self.virtual_size = Size(0, len(self.entries))
+
+    def _format_window(self, row: int) -> None:
+        """Format the viewport plus overscan around row, dropping rows outside it."""
+        top = max(0, int(self.scroll_offset.y) - OVERSCAN)
+        bottom = min(len(self.entries), int(self.scroll_offset.y) + self.size.height + OVERSCAN)
+        if not top <= row < bottom:
+            top, bottom = row, row + 1
+
+        self._row_cache = {idx: text for idx, text in self._row_cache.items() if top <= idx < bottom}
+        if profiler.enabled:
+            self._format_window_profiled(top, bottom)
+            return
+        for idx in range(top, bottom):
+            if idx not in self._row_cache:
+                self._row_cache[idx] = self.formatter(self.entries[idx])
+
+    def _format_window_profiled(self, top: int, bottom: int) -> None:
+        """_format_window's loop, timing entry lookups (the backend conversion) apart from formatting."""
+        fetch = formatting = 0.0
+        rows = 0
+        for idx in range(top, bottom):
+            if idx not in self._row_cache:
+                start = perf_counter()
+                entry = self.entries[idx]
+                fetched = perf_counter()
+                self._row_cache[idx] = self.formatter(entry)
+                fetch += fetched - start
+                formatting += perf_counter() - fetched
+                rows += 1
+        if rows:
+            profiler.record(ROW_FETCH, fetch, rows=rows)
+            profiler.record(ROW_FORMAT, formatting, rows=rows)
+
+    def render_line(self, y: int) -> Strip:
+        if profiler.paint_marks:
+            profiler.painted()
+        row = int(self.scroll_offset.y) + y
+        width = self.scrollable_content_region.width
+        base_style = self.rich_style
+
+        if row >= len(self.entries):
+            return Strip([Segment(" " * width, base_style)], width)
+
+        if row not in self._row_cache:
+            self._format_window(row)
+
+        text = self._row_cache[row]
+        segments = list(text.render(self.app.console, end=""))
+        strip = Strip(segments).crop_extend(0, width, None)
+        if row == self.highlighted:
+            strip = strip.apply_style(self.get_component_rich_style("file-list--highlighted"))
+        return strip.apply_style(base_style)
+
+    def watch_highlighted(self, old_index: Optional[int], new_index: Optional[int]) -> None:
+        if new_index is None:
+            return
+        self.scroll_to_row(new_index)
+        self.refresh()
+        self.post_message(self.Highlighted(self, new_index, self.entries[new_index]))
+
+    def validate_highlighted(self, index: Optional[int]) -> Optional[int]:
+        if index is None or not self.entries:
+            return None
+        return max(0, min(index, len(self.entries) - 1))
+
+    def scroll_to_row(self, row: int) -> None:
+        height = self.scrollable_content_region.height
+        if row < self.scroll_offset.y:
+            self.scroll_to(y=row, animate=False)
+        elif height and row >= self.scroll_offset.y + height:
+            self.scroll_to(y=row - height + 1, animate=False)
+
+    def on_click(self, event: events.Click) -> None:
+        row = int(self.scroll_offset.y) + event.y
+        if row < len(self.entries):
+            self.highlighted = row
+
+    def action_cursor_down(self) -> None:
+        if self.entries:
+            self.highlighted = 0 if self.highlighted is None else self.highlighted + 1
+
+    def action_cursor_up(self) -> None:
+        if self.entries:
+            self.highlighted = 0 if self.highlighted is None else self.highlighted - 1
+
+    def action_page_down(self) -> None:
+        if self.entries:
+            self.highlighted = (self.highlighted or 0) + self.scrollable_content_region.height
+
+    def action_page_up(self) -> None:
+        if self.entries:
+            self.highlighted = (self.highlighted or 0) - self.scrollable_content_region.height
+
+    def action_first(self) -> None:
+        if self.entries:
+            self.highlighted = 0
+
+    def action_last(self) -> None:
+        if self.entries:
+            self.highlighted = len(self.entries) - 1
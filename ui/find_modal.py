@@ -0,0 +1,104 @@
+from textual import work
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.screen import ModalScreen
+from textual.widgets import Input, Label, OptionList
+from textual.widgets.option_list import Option
+from textual.containers import Vertical
+from rich.text import Text
+
+from icons import get_icon
+
+# Matches shown in the result list
+RESULT_LIMIT = 50
+
+class FuzzyFindModal(ModalScreen[str]):
+    """A modal screen for fuzzy-finding a path in the file index."""
+
+    CSS = """
+    FuzzyFindModal {
+        align: center middle;
+    }
+
+    #dialog {
+        padding: 1 2;
+        width: 90;
+        height: 80%;
+        border: thick $background 80%;
+        background: $surface;
+    }
+
+    Label {
+        margin-bottom: 1;
+        width: 100%;
+        text-align: center;
+    }
+
+    Input {
+        width: 100%;
+    }
+
+    #results {
+        height: 1fr;
+        margin-top: 1;
+    }
+    """
+
+    BINDINGS = [
+        Binding("escape", "dismiss_empty", "Close", show=False),
+        Binding("down", "cursor_down", show=False),
+        Binding("up", "cursor_up", show=False),
+    ]
+
+    def __init__(self, file_index, prompt: str = "Find file:"):
+        super().__init__()
+        self.file_index = file_index
+        self.prompt = prompt
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="dialog"):
+            yield Label(self.prompt)
+            yield Input(id="input", placeholder=f"{self.file_index.size()} indexed entries")
+            yield OptionList(id="results")
+
+    def on_mount(self) -> None:
+        self.query_one(Input).focus()
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        self.search(event.value)
+
+    @work(thread=True, exclusive=True)
+    def search(self, query: str) -> None:
+        """Query the index off the UI thread; a newer keystroke replaces this search."""
+        results = self.file_index.search(query, RESULT_LIMIT) if query.strip() else []
+        self.app.call_from_thread(self.show_results, query, results)
+
+    def show_results(self, query: str, results) -> None:
+        if query != self.query_one(Input).value:
+            return
+        result_list = self.query_one("#results", OptionList)
+        result_list.clear_options()
+        result_list.add_options(
+            Option(Text(f"{get_icon(r.name, r.is_directory)} {r.path}"), id=r.path) for r in results
+        )
+        if results:
+            result_list.highlighted = 0
+
+    def action_cursor_down(self) -> None:
+        self.query_one("#results", OptionList).action_cursor_down()
+
+    def action_cursor_up(self) -> None:
+        self.query_one("#results", OptionList).action_cursor_up()
+
+    def action_dismiss_empty(self) -> None:
+        self.dismiss("")
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        result_list = self.query_one("#results", OptionList)
+        if result_list.highlighted is None:
+            self.dismiss("")
+            return
+        self.dismiss(result_list.get_option_at_index(result_list.highlighted).id)
+
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected) -> None:
+        self.dismiss(event.option.id)
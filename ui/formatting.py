@@ -0,0 +1,30 @@
+# Small text helpers shared by the panes
+
+try:
+    import pwd
+except ImportError:  # Windows has no user database
+    pwd = None
+
+SIZE_UNITS = ["B", "K", "M", "G", "T", "P"]
+
+def human_size(num_bytes: float) -> str:
+    """Format a byte count the way `du -h` does (e.g. 4.2M)."""
+    for unit in SIZE_UNITS:
+        if abs(num_bytes) < 1024 or unit == SIZE_UNITS[-1]:
+            if unit == "B":
+                return f"{int(num_bytes)}{unit}"
+            return f"{num_bytes:.1f}{unit}"
+        num_bytes /= 1024
+
+_owner_names = {}
+
+def owner_name(uid: int) -> str:
+    """User name for a uid, looked up once per uid."""
+    name = _owner_names.get(uid)
+    if name is None:
+        try:
+            name = pwd.getpwuid(uid).pw_name if pwd else str(uid)
+        except KeyError:
+            name = str(uid)
+        _owner_names[uid] = name
+    return name
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 # Simple icon mapping based on file extensions
 
@@ -65,7 +66,19 @@ ICON_MAP = {
 DEFAULT_FILE_ICON = ""
 DEFAULT_DIR_ICON = ""
 
-def get_icon(name: str, is_directory: bool) -> str:
+# Fallbacks by detected content, for extensions the map does not know (or files without one)
+KIND_ICONS = {
+    "TEXT": ICON_MAP[".txt"],
+    "EXECUTABLE": ICON_MAP[".sh"],
+    "IMAGE": ICON_MAP[".png"],
+    "AUDIO": "",
+    "VIDEO": "",
+    "ARCHIVE": ICON_MAP[".zip"],
+    "DOCUMENT": ICON_MAP[".pdf"],
+}
+
+def get_icon(name: str, is_directory: bool, extension: Optional[str] = None, kind=None) -> str:
+    """Icon for an entry; listings pass the backend's extension and kind so no path parsing is needed."""
     if is_directory:
         return DEFAULT_DIR_ICON
     
@@ -74,5 +87,9 @@ def get_icon(name: str, is_directory: bool) -> str:
         return ICON_MAP[name]
         
     # Check extension
-    ext = Path(name).suffix.lower()
-    return ICON_MAP.get(ext, DEFAULT_FILE_ICON)
+    if extension is None:
+        extension = Path(name).suffix.lower()
+    icon = ICON_MAP.get(extension)
+    if icon is None and kind is not None:
+        icon = KIND_ICONS.get(kind.name)
+    return icon or DEFAULT_FILE_ICON
@@ -0,0 +1,482 @@
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Set
+
+import backend
+from archive import ExtractProgress, extract_paths
+from formatting import human_size
+
+# Jobs allowed to run at once on any one device
+DEFAULT_PER_DEVICE = int(os.environ.get("FILE_RANGER_JOBS_PER_DEVICE", "2"))
+
+# Finished jobs kept for the jobs panel
+FINISHED_HISTORY = 10
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+def device_of(path: str):
+    """Device id of a path, or of its nearest existing parent."""
+    for candidate in (Path(path), *Path(path).parents):
+        try:
+            return os.stat(candidate).st_dev
+        except OSError:
+            continue
+    return path
+
+def overlaps(a: str, b: str) -> bool:
+    """True if one path is the other or lies under it."""
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+def conflicts(later, earlier) -> bool:
+    """Whether `later` must wait for `earlier`: either writes what the other reads or writes."""
+    return (any(overlaps(w, p) for w in earlier.writes for p in later.reads + later.writes) or
+            any(overlaps(w, p) for w in later.writes for p in earlier.reads))
+
+class Job:
+    """A queued file operation; subclasses run it and report progress."""
+
+    kind = "job"
+    cancellable = True
+    # Copies only read their sources; every other job changes them
+    keeps_sources = False
+
+    def __init__(self, src: str, dest: Optional[str] = None):
+        self.src = src
+        self.dest = dest
+        self.state = QUEUED
+        self.error = ""
+        self.started_at = None
+        self.finished_at = None
+        # Set once the queue has handed the finished job back to its owner
+        self.reported = False
+        # Devices are looked up once, before anything moves
+        self.devices = {device_of(str(Path(src).parent))}
+        if dest is not None:
+            self.devices.add(device_of(str(Path(dest).parent)))
+        self.set_paths([src], [] if dest is None else [dest])
+
+    def set_paths(self, srcs: List[str], targets: List[str]) -> None:
+        """Record what the job reads and writes, so the queue runs it after earlier jobs on the same paths."""
+        srcs = [os.path.abspath(src) for src in srcs]
+        self.reads = srcs if self.keeps_sources else []
+        self.writes = [os.path.abspath(target) for target in targets] + ([] if self.keeps_sources else srcs)
+
+    @property
+    def name(self) -> str:
+        return Path(self.src).name
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def touched_dirs(self) -> Set[str]:
+        """Directories whose listing this job changes."""
+        dirs = {str(Path(self.src).parent)}
+        if self.dest is not None:
+            dirs.add(str(Path(self.dest).parent))
+        return dirs
+
+    def start(self) -> None:
+        self.state = RUNNING
+        self.started_at = time.monotonic()
+
+    def finish(self, state: str, error: str = "") -> None:
+        self.state = state
+        self.error = error
+        self.finished_at = time.monotonic()
+
+    def poll(self) -> bool:
+        """Update the job state; True once it has finished."""
+        return self.finished
+
+    def cancel(self) -> bool:
+        """Stop the job; False if it can no longer be stopped."""
+        if self.state == QUEUED:
+            self.finish(CANCELLED)
+            return True
+        return False
+
+    def progress_text(self) -> str:
+        if self.finished and self.started_at is not None:
+            return f"{self.state} in {self.elapsed:.1f}s"
+        return self.state
+
+class ThreadJob(Job):
+    """A job made of one blocking backend call, run on its own thread."""
+
+    cancellable = False
+
+    def __init__(self, src: str, dest: Optional[str] = None):
+        super().__init__(src, dest)
+        self._thread = None
+        self._result = None
+
+    def run(self) -> bool:
+        raise NotImplementedError
+
+    def start(self) -> None:
+        super().start()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            self._result = (self.run(), "")
+        except Exception as e:
+            self._result = (False, str(e))
+
+    def poll(self) -> bool:
+        if self.state == RUNNING and self._result is not None:
+            ok, error = self._result
+            self.finish(DONE if ok else FAILED, error)
+        return self.finished
+
+    def progress_text(self) -> str:
+        if self.state == RUNNING:
+            return f"{self.elapsed:.1f}s"
+        return super().progress_text()
+
+class RenameJob(ThreadJob):
+    kind = "rename"
+
+    def run(self) -> bool:
+        return backend.rename_path(self.src, self.dest)
+
+class DeleteJob(Job):
+    """Deletes a file or tree in place with the backend delete engine."""
+
+    kind = "delete"
+
+    def __init__(self, src: str):
+        super().__init__(src)
+        self.srcs = [src]
+        self._engine = None
+
+    def start(self) -> None:
+        super().start()
+        self._engine = backend.DeleteJob(self.srcs)
+        self._engine.start()
+
+    def poll(self) -> bool:
+        if self.state == RUNNING and self._engine.is_done():
+            if self._engine.progress().cancelled:
+                self.finish(CANCELLED)
+            elif self._engine.succeeded():
+                self.finish(DONE)
+            else:
+                errors = self._engine.error_messages()
+                self.finish(FAILED, errors[0] if errors else "")
+        return self.finished
+
+    def cancel(self) -> bool:
+        if self.state == RUNNING:
+            self._engine.cancel()
+            return True
+        return super().cancel()
+
+    def progress_text(self) -> str:
+        if self._engine is None or self.state != RUNNING:
+            return super().progress_text()
+        progress = self._engine.progress()
+        return (f"{progress.files_done:,} files, {progress.directories_done:,} directories, "
+                f"{progress.entries_per_second:,.0f}/s")
+
+class CopyJob(Job):
+    """Copies a file or tree with the backend copy engine."""
+
+    kind = "copy"
+    keeps_sources = True
+
+    def __init__(self, src: str, dest: str):
+        super().__init__(src, dest)
+        self._engine = None
+
+    def start(self) -> None:
+        super().start()
+        self._engine = backend.CopyJob(self.src, self.dest)
+        self._engine.start()
+
+    def poll(self) -> bool:
+        if self.state == RUNNING and self._engine.is_done():
+            progress = self._engine.progress()
+            if progress.cancelled:
+                self.finish(CANCELLED)
+            elif self._engine.succeeded():
+                self.finish(DONE)
+            else:
+                errors = self._engine.error_messages()
+                self.finish(FAILED, errors[0] if errors else "")
+        return self.finished
+
+    def cancel(self) -> bool:
+        if self.state == RUNNING:
+            self._engine.cancel()
+            return True
+        return super().cancel()
+
+    def wait(self) -> None:
+        if self._engine is not None:
+            self._engine.wait()
+
+    def progress_text(self) -> str:
+        if self._engine is None or self.state != RUNNING:
+            return super().progress_text()
+        progress = self._engine.progress()
+        # Totals keep growing until the source has been walked
+        more = "+" if progress.scanning else ""
+        return (f"{human_size(progress.bytes_done)}/{human_size(progress.bytes_total)}{more}, "
+                f"{progress.files_done}/{progress.files_total}{more} files, "
+                f"{human_size(progress.bytes_per_second)}/s")
+
+class MoveJob(CopyJob):
+    """A rename on one device; a copy followed by a delete across devices."""
+
+    kind = "move"
+    keeps_sources = False
+
+    def __init__(self, src: str, dest: str):
+        super().__init__(src, dest)
+        self._step = None
+
+    def start(self) -> None:
+        if len(self.devices) == 1:
+            Job.start(self)
+            self._step = RenameJob(self.src, self.dest)
+            self._step.start()
+        else:
+            super().start()
+
+    def poll(self) -> bool:
+        if self.state != RUNNING:
+            return self.finished
+        if self._step is None:
+            # Copy phase; the source is only removed once every file arrived
+            if super().poll() and self.state == DONE:
+                self.state = RUNNING
+                self.finished_at = None
+                self._step = DeleteJob(self.src)
+                self._step.start()
+            return self.finished
+        if self._step.poll():
+            self.finish(self._step.state, self._step.error)
+        return self.finished
+
+    def cancel(self) -> bool:
+        if self._step is not None:
+            return False
+        return super().cancel()
+
+    def progress_text(self) -> str:
+        if self._step is not None and self.state == RUNNING:
+            return f"{self._step.kind} {self._step.progress_text()}"
+        return super().progress_text()
+
+def failure_summary(results) -> str:
+    """One line for a batch with failed items, naming the first failure."""
+    failed = [result for result in results if not result.ok]
+    if not failed:
+        return ""
+    first = failed[0]
+    return f"{len(failed)} of {len(results)} failed, {Path(first.path).name}: {first.error}"
+
+class BatchMixin:
+    """For jobs over a whole selection: every source lands in the directory `dest`."""
+
+    def set_sources(self, srcs: List[str]) -> None:
+        self.srcs = list(srcs)
+        parents = {str(Path(src).parent) for src in self.srcs}
+        self.devices = {device_of(parent) for parent in parents}
+        if self.dest is not None:
+            self.devices.add(device_of(self.dest))
+        targets = [] if self.dest is None else [os.path.join(self.dest, Path(src).name) for src in self.srcs]
+        self.set_paths(self.srcs, targets)
+
+    @property
+    def name(self) -> str:
+        return f"{len(self.srcs)} items"
+
+    def touched_dirs(self) -> Set[str]:
+        dirs = {str(Path(src).parent) for src in self.srcs}
+        if self.dest is not None:
+            dirs.add(self.dest)
+        return dirs
+
+class BatchJob(BatchMixin, ThreadJob):
+    """One backend call for the whole selection, which fails if any item did."""
+
+    def __init__(self, srcs: List[str], dest: Optional[str] = None):
+        super().__init__(srcs[0], dest)
+        self.set_sources(srcs)
+        self.results = []
+
+    def run_batch(self) -> list:
+        raise NotImplementedError
+
+    def run(self) -> bool:
+        self.results = self.run_batch()
+        return all(result.ok for result in self.results)
+
+    def poll(self) -> bool:
+        if super().poll() and self.state == FAILED and not self.error:
+            self.error = failure_summary(self.results)
+        return self.finished
+
+class BatchDeleteJob(BatchMixin, DeleteJob):
+    """Deletes the whole selection as one backend job, sharing one pool and one progress."""
+
+    def __init__(self, srcs: List[str]):
+        super().__init__(srcs[0])
+        self.set_sources(srcs)
+
+    def poll(self) -> bool:
+        if super().poll() and self.state == FAILED:
+            self.error = failure_summary(self._engine.results()) or self.error
+        return self.finished
+
+class TrashJob(BatchJob):
+    """Deletes by renaming into the trash on each path's filesystem; the trash empties in the background."""
+
+    kind = "delete"
+
+    @property
+    def name(self) -> str:
+        return Path(self.srcs[0]).name if len(self.srcs) == 1 else super().name
+
+    def run_batch(self) -> list:
+        return backend.trash_paths(self.srcs)
+
+class BatchMoveJob(BatchJob):
+    kind = "move"
+
+    def run_batch(self) -> list:
+        return backend.move_paths(self.srcs, self.dest)
+
+class BatchCopyJob(BatchMixin, CopyJob):
+    """Copies the whole selection as one backend job, so its files share one pool and one progress."""
+
+    def __init__(self, srcs: List[str], dest: str):
+        super().__init__(srcs[0], dest)
+        self.set_sources(srcs)
+
+    def start(self) -> None:
+        Job.start(self)
+        self._engine = backend.CopyJob([(src, os.path.join(self.dest, Path(src).name)) for src in self.srcs])
+        self._engine.start()
+
+    def poll(self) -> bool:
+        if super().poll() and self.state == FAILED:
+            self.error = failure_summary(self._engine.results()) or self.error
+        return self.finished
+
+class ExtractJob(BatchMixin, ThreadJob):
+    """Streams archive members into a directory, without unpacking the rest of the archive."""
+
+    kind = "extract"
+    cancellable = True
+    keeps_sources = True
+
+    def __init__(self, srcs: List[str], dest: str):
+        super().__init__(srcs[0], dest)
+        self.set_sources(srcs)
+        self.results = []
+        self._cancelled = threading.Event()
+        self._progress = ExtractProgress()
+
+    @property
+    def name(self) -> str:
+        return Path(self.srcs[0]).name if len(self.srcs) == 1 else super().name
+
+    def run(self) -> bool:
+        self.results = extract_paths(self.srcs, self.dest, self._cancelled, self._progress)
+        return all(result.ok for result in self.results)
+
+    def poll(self) -> bool:
+        if self.state == RUNNING and self._result is not None and self._cancelled.is_set():
+            self.finish(CANCELLED)
+        elif super().poll() and self.state == FAILED and not self.error:
+            self.error = failure_summary(self.results)
+        return self.finished
+
+    def cancel(self) -> bool:
+        if self.state == RUNNING:
+            self._cancelled.set()
+            return True
+        return super().cancel()
+
+    def wait(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+
+    def progress_text(self) -> str:
+        if self.state != RUNNING:
+            return super().progress_text()
+        progress = self._progress
+        return (f"{human_size(progress.bytes_done)}/{human_size(progress.bytes_total)}, "
+                f"{progress.files_done}/{progress.files_total} files")
+
+class JobQueue:
+    """Runs queued jobs in order, at most `per_device` at a time per device, each after earlier jobs on its paths."""
+
+    def __init__(self, per_device: int = DEFAULT_PER_DEVICE):
+        self.per_device = max(1, per_device)
+        self.jobs: List[Job] = []
+
+    @property
+    def active(self) -> List[Job]:
+        return [job for job in self.jobs if not job.finished]
+
+    @property
+    def running(self) -> List[Job]:
+        return [job for job in self.jobs if job.state == RUNNING]
+
+    def submit(self, job: Job) -> Job:
+        self.jobs.append(job)
+        self._start_ready()
+        return job
+
+    def _start_ready(self) -> None:
+        busy = Counter(device for job in self.running for device in job.devices)
+        for position, job in enumerate(self.jobs):
+            if (job.state == QUEUED and all(busy[device] < self.per_device for device in job.devices) and
+                    not any(conflicts(job, earlier) for earlier in self.jobs[:position] if not earlier.finished)):
+                job.start()
+                busy.update(job.devices)
+
+    def poll(self) -> List[Job]:
+        """Advance running jobs and start queued ones; returns the jobs that just finished."""
+        for job in self.running:
+            job.poll()
+        # Includes jobs cancelled while still queued
+        finished = [job for job in self.jobs if job.finished and not job.reported]
+        for job in finished:
+            job.reported = True
+        self._start_ready()
+
+        done = [job for job in self.jobs if job.finished]
+        for job in done[:-FINISHED_HISTORY]:
+            self.jobs.remove(job)
+        return finished
+
+    def cancel_latest(self) -> Optional[Job]:
+        """Cancel the most recently queued job that can still be stopped."""
+        for job in reversed(self.active):
+            if job.cancel():
+                return job
+        return None
+
+    def cancel_all(self) -> None:
+        for job in self.active:
+            job.cancel()
@@ -0,0 +1,44 @@
+from typing import Sequence
+
+from rich.text import Text
+from textual.widgets import Static
+
+from jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING
+
+STATE_STYLES = {
+    QUEUED: ("○", "dim"),
+    RUNNING: ("●", "yellow"),
+    DONE: ("✔", "green"),
+    FAILED: ("✘", "red"),
+    CANCELLED: ("–", "dim"),
+}
+
+class JobsPanel(Static):
+    """Lists queued, running and recently finished file operations."""
+
+    DEFAULT_CSS = """
+    JobsPanel {
+        dock: bottom;
+        height: auto;
+        max-height: 12;
+        padding: 0 1;
+        background: #1e1e1e;
+        border-top: solid #333;
+        display: none;
+    }
+    """
+
+    def update_jobs(self, jobs: Sequence) -> None:
+        if not jobs:
+            self.update(Text("No jobs", style="dim italic"))
+            return
+        lines = Text()
+        for job in jobs:
+            icon, style = STATE_STYLES[job.state]
+            lines.append(f"{icon} ", style=style)
+            lines.append(f"{job.kind:<7}", style="bold")
+            lines.append(f"{job.name}  ", style="white")
+            detail = job.error if job.state == FAILED and job.error else job.progress_text()
+            lines.append(f"{detail}\n", style=style)
+        lines.rstrip()
+        self.update(lines)
@@ -0,0 +1,112 @@
+import time
+
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.screen import ModalScreen
+from textual.widgets import Input, Label, OptionList
+from textual.widgets.option_list import Option
+from textual.containers import Vertical
+from rich.text import Text
+
+# Directories shown in the result list
+RESULT_LIMIT = 50
+
+def last_visit(timestamp: int) -> str:
+    """How long ago, e.g. "5m" or "3d"."""
+    age = max(0, int(time.time()) - timestamp)
+    for unit, seconds in (("d", 86400), ("h", 3600), ("m", 60)):
+        if age >= seconds:
+            return f"{age // seconds}{unit}"
+    return "now"
+
+class JumpModal(ModalScreen[str]):
+    """A modal screen for jumping to a previously visited directory, ranked by frecency."""
+
+    CSS = """
+    JumpModal {
+        align: center middle;
+    }
+
+    #dialog {
+        padding: 1 2;
+        width: 90;
+        height: 80%;
+        border: thick $background 80%;
+        background: $surface;
+    }
+
+    Label {
+        margin-bottom: 1;
+        width: 100%;
+        text-align: center;
+    }
+
+    Input {
+        width: 100%;
+    }
+
+    #results {
+        height: 1fr;
+        margin-top: 1;
+    }
+    """
+
+    BINDINGS = [
+        Binding("escape", "dismiss_empty", "Close", show=False),
+        Binding("down", "cursor_down", show=False),
+        Binding("up", "cursor_up", show=False),
+    ]
+
+    def __init__(self, history, prompt: str = "Jump to directory:"):
+        super().__init__()
+        self.history = history
+        self.prompt = prompt
+        self.prewarmed = None
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="dialog"):
+            yield Label(self.prompt)
+            yield Input(id="input", placeholder=f"{self.history.size()} visited directories")
+            yield OptionList(id="results")
+
+    def on_mount(self) -> None:
+        self.query_one(Input).focus()
+        self.show_results("")
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        self.show_results(event.value)
+
+    def show_results(self, query: str) -> None:
+        """Rank on the UI thread: matching even thousands of directories takes about a millisecond."""
+        results = self.history.jump(query, RESULT_LIMIT)
+        result_list = self.query_one("#results", OptionList)
+        result_list.clear_options()
+        result_list.add_options(
+            Option(Text.assemble(f"📂 {r.path}", (f"  {r.score:.0f} · {last_visit(r.last_access)}", "dim")), id=r.path)
+            for r in results
+        )
+        if results:
+            result_list.highlighted = 0
+            # The likeliest target is listed ahead of time, so the jump lands on a cached listing
+            if results[0].path != self.prewarmed:
+                self.prewarmed = results[0].path
+                self.app.prewarm_listings([self.prewarmed])
+
+    def action_cursor_down(self) -> None:
+        self.query_one("#results", OptionList).action_cursor_down()
+
+    def action_cursor_up(self) -> None:
+        self.query_one("#results", OptionList).action_cursor_up()
+
+    def action_dismiss_empty(self) -> None:
+        self.dismiss("")
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        result_list = self.query_one("#results", OptionList)
+        if result_list.highlighted is None:
+            self.dismiss("")
+            return
+        self.dismiss(result_list.get_option_at_index(result_list.highlighted).id)
+
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected) -> None:
+        self.dismiss(event.option.id)
@@ -0,0 +1,138 @@
+import io
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from rich.console import Console
+from rich.measure import Measurement
+from rich.segment import Segment
+from rich.text import Text
+
+import backend
+from archive import read_member, split_archive_path
+
+# Rendered previews kept for revisits and prefetched neighbours
+PREVIEW_CACHE_SIZE = 64
+
+# Lines of context shown above a match in the preview pane
+MATCH_CONTEXT = 5
+
+# Pane size assumed before the layout has been measured
+DEFAULT_PREVIEW_SIZE = (80, 60)
+
+PREVIEW_THEME = "monokai"
+
+# Kinds the listing already identified as not text: summarised without opening the file
+SUMMARY_KINDS = {
+    backend.FileKind.BINARY: "Binary file",
+    backend.FileKind.EXECUTABLE: "Executable",
+    backend.FileKind.IMAGE: "Image",
+    backend.FileKind.AUDIO: "Audio file",
+    backend.FileKind.VIDEO: "Video",
+    backend.FileKind.ARCHIVE: "Archive",
+    backend.FileKind.DOCUMENT: "Document",
+}
+
+class RenderedPreview:
+    """Preview lines rendered ahead of time; drawing them only copies segments."""
+
+    def __init__(self, lines, width: int, cacheable: bool = True):
+        self.lines = lines
+        self.width = width
+        # Read errors are retried on the next visit instead of being remembered
+        self.cacheable = cacheable
+
+    def __rich_console__(self, console, options):
+        new_line = Segment.line()
+        for line in self.lines:
+            yield from line
+            yield new_line
+
+    def __rich_measure__(self, console, options):
+        return Measurement(self.width, self.width)
+
+class PreviewCache:
+    """LRU of rendered previews keyed by path, mtime, pane size and matched line."""
+
+    def __init__(self, capacity: int = PREVIEW_CACHE_SIZE):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Filled from preview workers, read from the UI thread
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[RenderedPreview]:
+        with self._lock:
+            rendered = self._items.get(key)
+            if rendered is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return rendered
+
+    def put(self, key, rendered: RenderedPreview) -> None:
+        with self._lock:
+            self._items[key] = rendered
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+def preview_key(path: str, mtime, width: int, height: int, line: Optional[int] = None):
+    return (path, mtime, width, height, line)
+
+def render_file_preview(path: str, size: int, width: int, height: int, line: Optional[int] = None,
+                        kind=None) -> RenderedPreview:
+    """Read just the lines that fit the pane and highlight them; safe to call off the UI thread."""
+    if kind in SUMMARY_KINDS:
+        renderable = Text.from_markup(f"\n[italic]{SUMMARY_KINDS[kind]}.\nSize: {size} bytes[/]")
+        return render_lines(renderable, width, height)
+    if kind == backend.FileKind.EMPTY:
+        return render_lines(Text("Empty file", style="italic"), width, height)
+    location = split_archive_path(path)
+    if location is not None and location[1]:
+        return render_member_preview(path, size, width, height)
+
+    first_line = max(1, line - MATCH_CONTEXT) if line else 1
+    # A column is at most 4 bytes of UTF-8
+    preview = backend.read_text_preview(path, first_line, height, width * 4)
+    if preview.error:
+        renderable = Text(f"Error reading file: {preview.error}")
+    elif preview.binary:
+        renderable = Text.from_markup(f"\n[italic]Binary file or unknown format.\nSize: {size} bytes[/]")
+    else:
+        renderable = highlight_text(path, preview.text, first_line, line)
+
+    return render_lines(renderable, width, height, cacheable=not preview.error)
+
+def highlight_text(path: str, text: str, first_line: int = 1, line: Optional[int] = None):
+    # Pygments (behind Syntax) is imported by the first preview, on a worker, not at startup
+    from rich.syntax import Syntax
+    lexer = Syntax.guess_lexer(path)
+    if lexer == "default" and not line:
+        return Text(text)
+    return Syntax(text, lexer, theme=PREVIEW_THEME, line_numbers=True,
+                  start_line=first_line, highlight_lines={line} if line else None)
+
+def render_member_preview(path: str, size: int, width: int, height: int) -> RenderedPreview:
+    """Decompress only as much of an archive member as the pane shows."""
+    try:
+        _, data = read_member(path, width * 4 * height)
+    except Exception as e:
+        return render_lines(Text(f"Error reading archive member: {e}"), width, height, cacheable=False)
+    if backend.kind_from_content(data[:4096]) != backend.FileKind.TEXT:
+        renderable = Text.from_markup(f"\n[italic]Binary file or unknown format.\nSize: {size} bytes[/]")
+    else:
+        text = "\n".join(data.decode("utf-8", "replace").splitlines()[:height])
+        renderable = highlight_text(path, text)
+    return render_lines(renderable, width, height)
+
+def render_lines(renderable, width: int, height: int, cacheable: bool = True) -> RenderedPreview:
+    console = Console(file=io.StringIO(), width=width, force_terminal=True, color_system="truecolor")
+    lines = console.render_lines(renderable, console.options.update(width=width, height=None), pad=False)
+    return RenderedPreview(lines[:height], width, cacheable)
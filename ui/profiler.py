@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Optional
+
+import backend
+
+# Samples kept per stage for the percentiles
+PROFILE_SAMPLES = 1000
+
+# Stages timed in the UI, in overlay order
+KEY_TO_PAINT = "key→paint"
+KEY_TO_LISTING = "key→listing"
+LISTING_CALL = "listing call"
+ROW_FETCH = "row fetch"
+ROW_FORMAT = "row format"
+PREVIEW_RENDER = "preview render"
+STAGES = (KEY_TO_PAINT, KEY_TO_LISTING, LISTING_CALL, ROW_FETCH, ROW_FORMAT, PREVIEW_RENDER)
+
+# A listing started this soon after a keypress is counted as that key's response
+KEY_CLAIM_WINDOW = 0.25
+
+def percentile(sorted_samples, fraction: float) -> float:
+    index = min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))
+    return sorted_samples[index]
+
+class Profiler:
+    """Stage timings of the UI hot paths. While disabled, callers check `enabled` and skip
+    the clock entirely; `record` is never reached."""
+
+    def __init__(self):
+        self.enabled = False
+        self._samples = {stage: deque(maxlen=PROFILE_SAMPLES) for stage in STAGES}
+        # Start of the newest keypress, until a listing claims it
+        self.last_key: Optional[float] = None
+        # (stage, start) pairs completed by the next repaint of a list pane
+        self.paint_marks = []
+        self._trace = None
+        self._trace_lock = threading.Lock()
+        self._trace_start = perf_counter()
+
+    def enable(self, on: bool) -> None:
+        self.enabled = on
+        backend.set_profiling(on)
+        if not on:
+            self.last_key = None
+            self.paint_marks.clear()
+
+    def reset(self) -> None:
+        for samples in self._samples.values():
+            samples.clear()
+        backend.reset_perf_stats()
+
+    def record(self, stage: str, seconds: float, **args) -> None:
+        """Add one timing; safe to call from worker threads."""
+        self._samples[stage].append(seconds)
+        if self._trace is not None:
+            self._write_event(stage, perf_counter() - seconds, seconds, args)
+
+    def summary(self, stage: str):
+        """(count, p50, p99) of a stage's recent samples in seconds, or None if it has none."""
+        samples = sorted(self._samples[stage])
+        if not samples:
+            return None
+        return len(samples), percentile(samples, 0.5), percentile(samples, 0.99)
+
+    def key_pressed(self, start: float) -> None:
+        self.last_key = start
+        self.mark_paint(KEY_TO_PAINT, start)
+
+    def claim_key(self) -> Optional[float]:
+        """Start of the keypress a listing being started answers, if there is one."""
+        start, self.last_key = self.last_key, None
+        if start is None or perf_counter() - start > KEY_CLAIM_WINDOW:
+            return None
+        return start
+
+    def mark_paint(self, stage: str, start: float) -> None:
+        """Time `stage` from `start` to the next repaint of a list pane (UI thread only)."""
+        self.paint_marks.append((stage, start))
+
+    def painted(self) -> None:
+        now = perf_counter()
+        marks, self.paint_marks = self.paint_marks, []
+        for stage, start in marks:
+            self.record(stage, now - start)
+
+    def open_trace(self, path: str) -> None:
+        """Write every recorded timing to a Chrome trace file (chrome://tracing, Perfetto)."""
+        self._trace = open(path, "w", encoding="utf-8")
+        self._trace.write("[\n")
+
+    def close_trace(self) -> None:
+        with self._trace_lock:
+            if self._trace is not None:
+                # Every event is followed by a comma, so the array ends with a closing marker
+                end = {"name": "trace end", "ph": "i", "s": "g", "ts": round((perf_counter() - self._trace_start) * 1e6, 1),
+                       "pid": os.getpid(), "tid": threading.get_ident()}
+                self._trace.write(json.dumps(end) + "\n]\n")
+                self._trace.close()
+                self._trace = None
+
+    def _write_event(self, stage: str, start: float, seconds: float, args) -> None:
+        event = {
+            "name": stage,
+            "ph": "X",
+            "ts": round((start - self._trace_start) * 1e6, 1),
+            "dur": round(seconds * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._trace_lock:
+            if self._trace is not None:
+                self._trace.write(json.dumps(event, ensure_ascii=False) + ",\n")
+
+# Shared by the app and its widgets
+profiler = Profiler()
@@ -0,0 +1,83 @@
+from rich.table import Table
+from rich.text import Text
+from textual.widgets import Static
+
+import backend
+from profiler import STAGES, profiler
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms"
+
+def rate(part: int, whole: int) -> str:
+    return f"{part / whole:.0%}" if whole else "-"
+
+class ProfilerPanel(Static):
+    """Latency percentiles of the UI stages and the backend counters since profiling started."""
+
+    DEFAULT_CSS = """
+    ProfilerPanel {
+        dock: right;
+        width: 46;
+        height: auto;
+        padding: 0 1;
+        background: #1e1e1e;
+        border-left: solid #333;
+        display: none;
+    }
+    """
+
+    def start(self, directory_stats, preview_cache) -> None:
+        """Remember the cache counters at this point; the panel shows what happened since."""
+        self.directory_base = directory_stats
+        self.preview_cache = preview_cache
+        self.preview_base = (preview_cache.hits, preview_cache.misses)
+
+    def update_stats(self) -> None:
+        stages = Table.grid(padding=(0, 1))
+        stages.add_column(style="bold")
+        stages.add_column(justify="right")
+        stages.add_column(justify="right")
+        stages.add_column(justify="right", style="dim")
+        stages.add_row("stage", "p50", "p99", "n")
+        for stage in STAGES:
+            summary = profiler.summary(stage)
+            if summary is None:
+                stages.add_row(stage, "-", "-", "0")
+            else:
+                count, p50, p99 = summary
+                stages.add_row(stage, ms(p50), ms(p99), str(count))
+
+        stats = backend.perf_stats()
+        directory = backend.directory_cache_stats()
+        hits = directory.hits - self.directory_base.hits
+        misses = directory.misses - self.directory_base.misses
+        preview_hits = self.preview_cache.hits - self.preview_base[0]
+        preview_misses = self.preview_cache.misses - self.preview_base[1]
+
+        counters = Table.grid(padding=(0, 1))
+        counters.add_column(style="bold")
+        counters.add_column()
+        if stats.listings:
+            scan_seconds = stats.listing_ns / 1e9
+            counters.add_row("scan", f"{ms(scan_seconds / stats.listings)} avg, {stats.listings} listings")
+            counters.add_row("entries/s", f"{stats.entries_listed / scan_seconds:,.0f}" if scan_seconds else "-")
+            counters.add_row("syscalls", f"{stats.listing_syscalls / stats.listings:,.0f} per listing")
+        else:
+            counters.add_row("scan", "-")
+        if stats.sorts:
+            counters.add_row("sort", f"{ms(stats.sort_ns / 1e9 / stats.sorts)} avg, {stats.entries_sorted:,} entries")
+        if stats.previews:
+            counters.add_row("preview read", f"{ms(stats.preview_ns / 1e9 / stats.previews)} avg, "
+                                             f"{stats.preview_bytes // stats.previews:,} B")
+        counters.add_row("listing cache", f"{rate(hits, hits + misses)} of {hits + misses}")
+        counters.add_row("kind cache", f"{rate(stats.kind_cache_hits, stats.kind_cache_hits + stats.kind_sniffs)} "
+                                       f"of {stats.kind_cache_hits + stats.kind_sniffs}")
+        counters.add_row("preview cache", f"{rate(preview_hits, preview_hits + preview_misses)} "
+                                          f"of {preview_hits + preview_misses}")
+
+        grid = Table.grid()
+        grid.add_row(Text("Profiler", style="bold yellow"))
+        grid.add_row(stages)
+        grid.add_row("")
+        grid.add_row(counters)
+        self.update(grid)
@@ -0,0 +1,93 @@
+import json
+import os
+from typing import Dict
+
+import backend
+from storage import cache_file
+
+# Listings of the most recently shown directories are kept for the next startup
+SNAPSHOT_DIRECTORIES = 16
+# Rows kept per directory: enough to fill the panes until the real listing arrives
+SNAPSHOT_ROWS = 1000
+
+SNAPSHOT_FILE = "snapshot.json"
+
+class SnapshotEntry:
+    """A listing row restored from the snapshot, with the fields the panes and preview read."""
+
+    __slots__ = ("name", "path", "is_directory", "size", "mtime", "kind", "extension")
+
+    # Only FULL listings carry these; snapshot rows never show in the detail view
+    mode = 0
+    uid = 0
+    gid = 0
+    link_target = ""
+
+    def __init__(self, directory: str, row):
+        self.name, self.is_directory, self.size, self.mtime, kind = row
+        self.path = os.path.join(directory, self.name)
+        self.kind = backend.FileKind(kind)
+        dot = self.name.rfind(".")
+        self.extension = self.name[dot:].lower() if dot > 0 else ""
+
+class SnapshotListing(list):
+    """Rows of a directory as last seen, shown until the directory has been listed again."""
+
+    def __init__(self, directory: str, rows):
+        super().__init__(SnapshotEntry(directory, row) for row in rows)
+        self.path = directory
+
+    def find(self, name: str) -> int:
+        for index, entry in enumerate(self):
+            if entry.name == name:
+                return index
+        return -1
+
+def _read() -> Dict[str, list]:
+    try:
+        with open(cache_file(SNAPSHOT_FILE), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def load_snapshots(*directories: str) -> Dict[str, SnapshotListing]:
+    """Snapshots of the given directories that were saved by an earlier session."""
+    saved = _read()
+    snapshots = {}
+    for directory in directories:
+        rows = saved.get(directory)
+        if rows is None:
+            continue
+        try:
+            snapshots[directory] = SnapshotListing(directory, rows)
+        except (TypeError, ValueError):
+            pass
+    return snapshots
+
+def save_snapshots(listings) -> None:
+    """Store the given DirectoryListings (in name order) ahead of the older snapshots."""
+    rows_by_path = {}
+    for listing in listings:
+        if not isinstance(listing, backend.DirectoryListing) or not listing.is_directory:
+            continue
+        ordered = listing.sorted(backend.SortKey.NAME)
+        rows_by_path[listing.path] = [
+            [node.name, node.is_directory, node.size, node.mtime, int(node.kind)]
+            for node in ordered[:SNAPSHOT_ROWS]
+        ]
+    if not rows_by_path:
+        return
+    for path, rows in _read().items():
+        if len(rows_by_path) >= SNAPSHOT_DIRECTORIES:
+            break
+        rows_by_path.setdefault(path, rows)
+
+    target = cache_file(SNAPSHOT_FILE)
+    temporary = target.with_suffix(".tmp")
+    try:
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(rows_by_path, f, separators=(",", ":"))
+        os.replace(temporary, target)
+    except OSError:
+        pass
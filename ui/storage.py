@@ -0,0 +1,13 @@
+import os
+from pathlib import Path
+
+from platformdirs import user_cache_dir
+
+# Everything File Ranger persists between runs lives under one per-user directory
+APP_NAME = "file_ranger"
+
+def cache_file(name: str) -> Path:
+    """Path of a file in the per-user cache directory (created on demand)."""
+    directory = Path(os.environ.get("FILE_RANGER_CACHE_DIR") or user_cache_dir(APP_NAME))
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / name
@@ -0,0 +1,99 @@
+from collections.abc import Sequence
+
+from textual import work
+from textual.binding import Binding
+from textual.message import Message
+
+from file_list import FileList
+
+class TreeRows(Sequence):
+    """The visible rows of a backend LazyTree, fetched only as the list draws them."""
+
+    def __init__(self, tree) -> None:
+        self.tree = tree
+
+    def __len__(self) -> int:
+        return self.tree.row_count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            rows = self.tree.rows(start, max(0, stop - start))
+            return rows[::step]
+        if index < 0:
+            index += len(self)
+        rows = self.tree.rows(index, 1) if index >= 0 else []
+        if not rows:
+            raise IndexError(index)
+        return rows[0]
+
+class TreeList(FileList):
+    """The left pane as an expandable directory tree; subtrees are listed when expanded."""
+
+    BINDINGS = [
+        Binding("j", "cursor_down", "Down", show=False),
+        Binding("k", "cursor_up", "Up", show=False),
+        Binding("right,l", "expand", "Expand", show=False),
+        Binding("left,h", "collapse", "Collapse", show=False),
+        Binding("space", "toggle", "Toggle", show=False),
+        Binding("enter", "open", "Open", show=False),
+    ]
+
+    tree = None
+
+    class Opened(Message):
+        """Posted when a directory is chosen in the tree."""
+
+        def __init__(self, tree_list: "TreeList", path: str) -> None:
+            super().__init__()
+            self.tree_list = tree_list
+            self.path = path
+
+        @property
+        def control(self) -> "TreeList":
+            return self.tree_list
+
+    def set_tree(self, tree) -> None:
+        self.tree = tree
+        self.set_entries(TreeRows(tree))
+
+    def rows_changed(self) -> None:
+        """Rows were added or removed in place; keep the scroll position and re-draw."""
+        self.reload_entries()
+
+    @work(thread=True, exclusive=True, group="tree-expand")
+    def expand_row(self, row: int) -> None:
+        """Listing a directory can be slow; the backend lists it without the GIL."""
+        if self.tree.expand(row) > 0:
+            self.app.call_from_thread(self.rows_changed)
+
+    def action_expand(self) -> None:
+        entry = self.highlighted_entry
+        if entry is not None and not entry.expanded:
+            self.expand_row(self.highlighted)
+
+    def action_collapse(self) -> None:
+        entry = self.highlighted_entry
+        if entry is None:
+            return
+        if entry.expanded:
+            if self.tree.collapse(self.highlighted) > 0:
+                self.rows_changed()
+            return
+        # On a collapsed row, move up to its parent
+        for row in range(self.highlighted - 1, -1, -1):
+            if self.entries[row].depth < entry.depth:
+                self.highlighted = row
+                return
+
+    def action_toggle(self) -> None:
+        entry = self.highlighted_entry
+        if entry is not None and entry.expanded:
+            self.action_collapse()
+        else:
+            self.action_expand()
+
+    def action_open(self) -> None:
+        entry = self.highlighted_entry
+        if entry is not None:
+            self.post_message(self.Opened(self, entry.path))